@@ -0,0 +1,60 @@
+"""
+Synthetic inputs and timing shared by the benchmark scripts (no shapefile or network needed).
+
+Heavy modules are imported inside the functions, so scripts that measure
+startup or peak memory in a fresh process only pay for what they use.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+# Contiguous US, in GEOMETRY_CRS degrees
+EXTENT = (-124.0, 25.0, -67.0, 49.0)
+
+
+def synthetic_areas(count, seed=0):
+    """Return ``count`` Voronoi polygons tiling ``EXTENT``, densified to ~0.02° vertices."""
+    import geopandas as gpd
+    import numpy as np
+    import shapely
+
+    rng = np.random.default_rng(seed)
+    seeds = shapely.multipoints(np.column_stack([rng.uniform(EXTENT[0], EXTENT[2], count),
+                                                 rng.uniform(EXTENT[1], EXTENT[3], count)]))
+    cells = shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=shapely.box(*EXTENT)))
+    cells = shapely.segmentize(shapely.clip_by_rect(cells, *EXTENT), 0.02)
+    cells = shapely.set_precision(cells, 10 ** -main.COORD_PRECISION)
+    keys = [f"K{i:06d}" for i in range(len(cells))]
+    return gpd.GeoDataFrame({'STUSPS': keys, 'NAME': [f"Area {key}" for key in keys]},
+                            geometry=cells, crs=main.GEOMETRY_CRS)
+
+
+def synthetic_statistics(keys, seed=1):
+    """A statistics frame with every ``stat_dtypes()`` column for ``keys``."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    frame = {'STUSPS': keys}
+    for name, dtype in main.stat_dtypes().items():
+        if dtype == 'float64':
+            frame[name] = rng.uniform(0, 100, len(keys)).round(1)
+        elif dtype == 'int64':
+            frame[name] = rng.integers(0, 1_000_000, len(keys))
+        else:
+            frame[name] = 'n/a'
+    return pd.DataFrame(frame)
+
+
+def best_of(fn, repeat):
+    """Best wall time in seconds of ``repeat`` calls to ``fn()``."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
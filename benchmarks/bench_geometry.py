@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: size, encode time and client parse time of the geometry payload.
+
+Compares ``gdf.to_json()`` with main.py's ``geometry_payload()`` formats
+(GeoJSON, TopoJSON, binary int32/float32 typed arrays) on synthetic Voronoi
+areas over the contiguous US, snapped to ``COORD_PRECISION`` (no shapefile or
+network needed). Parse time is the page's decode step to GeoJSON features
+(``JSON.parse``, plus ``topojsonFeatures`` / ``binaryFeatures``), measured
+with Node.js when it is on the PATH.
+
+Usage:
+    python benchmarks/bench_geometry.py [--areas 50 3200 30000] [--repeat 5]
+"""
+
+import argparse
+import base64
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+from _synthetic import synthetic_areas  # noqa: E402
+
+# Decodes one payload file repeatedly and prints the best time in ms
+NODE_PARSE_JS = """
+const fs = require('fs');
+const [path, kind, repeat] = process.argv.slice(2);
+const raw = fs.readFileSync(path);
+const text = raw.toString('utf8');
+const buffer = raw.buffer.slice(raw.byteOffset, raw.byteOffset + raw.length);
+let best = Infinity;
+for (let i = 0; i < Number(repeat); i++) {
+    const start = process.hrtime.bigint();
+    const features = kind === 'binary' ? binaryFeatures(buffer)
+        : kind === 'topojson' ? topojsonFeatures(JSON.parse(text), 'states') : JSON.parse(text);
+    best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+    if (features.features.length === 0) throw new Error('no features');
+}
+console.log(best);
+"""
+
+
+def payloads(gdf, topojson_max_rows):
+    """``{label: (kind, encode function)}`` for every format measured."""
+    cases = {
+        'gdf.to_json()': ('json', lambda: gdf[['STUSPS', 'geometry']].to_json().encode('utf-8')),
+        'geojson': ('json', lambda: main.geometry_payload(gdf, 'geojson')),
+        'topojson': ('topojson', lambda: main.geometry_payload(gdf, 'topojson')),
+        'binary int32': ('binary', lambda: main.geometry_payload(gdf, 'binary', encoding='int32')),
+        'binary float32': ('binary', lambda: main.geometry_payload(gdf, 'binary', encoding='float32')),
+    }
+    if len(gdf) > topojson_max_rows:
+        del cases['topojson']
+    return cases
+
+
+def node_parse_ms(script, data, kind, repeat):
+    with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as f:
+        f.write(data)
+    try:
+        result = subprocess.run(['node', script, f.name, kind, str(repeat)],
+                                check=True, capture_output=True, text=True)
+    finally:
+        os.unlink(f.name)
+    return float(result.stdout)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--areas', type=int, nargs='+', default=[50, 3_200, 30_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--topojson-max-rows', type=int, default=3_200,
+                        help="Skip TopoJSON (pure-Python arc building) above this many areas")
+    args = parser.parse_args(argv)
+
+    node = shutil.which('node')
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "parse.js")
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write(main.TOPOJSON_DECODER_JS + main.BINARY_GEOMETRY_DECODER_JS + NODE_PARSE_JS)
+        if not node:
+            print("⚠️  node not found: parse times skipped")
+        print(f"{'areas':>8} {'format':<16} {'encode (s)':>11} {'raw (KB)':>10} {'gzip (KB)':>10} "
+              f"{'base64 (KB)':>12} {'parse (ms)':>11}")
+        for areas in args.areas:
+            gdf = synthetic_areas(areas)[['STUSPS', 'geometry']]
+            for label, (kind, encode) in payloads(gdf, args.topojson_max_rows).items():
+                start = time.perf_counter()
+                data = encode()
+                seconds = time.perf_counter() - start
+                inline = len(base64.b64encode(data)) if kind == 'binary' else len(data)
+                parse = f"{node_parse_ms(script, data, kind, args.repeat):>11.1f}" if node else f"{'-':>11}"
+                print(f"{len(gdf):>8,} {label:<16} {seconds:>11.3f} {len(data) / 1e3:>10.0f} "
+                      f"{len(gzip.compress(data, 6)) / 1e3:>10.0f} {inline / 1e3:>12.0f} {parse}")
+
+
+if __name__ == "__main__":
+    main_cli()
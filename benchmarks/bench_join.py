@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: attaching statistics to geometry rows at state, county and tract scale.
+
+Compares the original per-column ``Series.map(lambda ...)`` + ``iterrows()``
+approach with the vectorized ``join_statistics()`` + ``state_records()`` path
+from main.py on synthetic frames (no shapefile or network needed).
+
+Usage:
+    python benchmarks/bench_join.py [--rows 50 3200 85000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+from _synthetic import best_of  # noqa: E402
+
+
+def synthetic_frames(rows, seed=0):
+    """Return (geometry-like frame, stats frame, stats dict) with ``rows`` keys."""
+    rng = np.random.default_rng(seed)
+    keys = [f"K{i:06d}" for i in range(rows)]
+    geo = pd.DataFrame({'STUSPS': keys, 'NAME': [f"Area {i}" for i in range(rows)]})
+    stats_df = pd.DataFrame({
+        'STUSPS': keys,
+        'severity': rng.integers(20, 101, rows),
+        'category': rng.choice(['Lenient', 'Moderate', 'Severe', 'Very Severe'], rows),
+        'death_penalty': rng.choice(['Active', 'Abolished', 'Moratorium'], rows),
+        'murder_rate': rng.uniform(1, 20, rows).round(1),
+        'gun_death_rate': rng.uniform(3, 30, rows).round(1),
+        'traffic_fatality_rate': rng.uniform(5, 25, rows).round(1),
+        'population': rng.integers(1_000, 40_000_000, rows),
+        'incarceration_rate': rng.integers(300, 1_100, rows),
+        'notes': 'synthetic',
+    }).astype(main.stat_dtypes())
+    stats = stats_df.set_index('STUSPS').to_dict('index')
+    # Shuffle so the join cannot rely on matching order
+    geo = geo.sample(frac=1, random_state=seed).reset_index(drop=True)
+    return geo, stats_df, stats
+
+
+def legacy_join(geo, stats):
+    """The pre-vectorization implementation, kept here for comparison."""
+    gdf = geo.copy()
+    for col in main.stat_dtypes():
+        gdf[col] = gdf['STUSPS'].map(lambda x: stats.get(x, {}).get(col, 'N/A'))
+    records = {}
+    for _, row in gdf.iterrows():
+        records[row['STUSPS']] = {
+            'name': row['NAME'],
+            'abbr': row['STUSPS'],
+            'severity': int(row['severity']),
+            'category': row['category'],
+            'death_penalty': row['death_penalty'],
+            'murder_rate': float(row['murder_rate']),
+            'gun_death_rate': float(row['gun_death_rate']),
+            'traffic_fatality_rate': float(row['traffic_fatality_rate']),
+            'population': int(row['population']),
+            'incarceration_rate': int(row['incarceration_rate']),
+            'notes': row['notes'],
+        }
+    return records
+
+
+def vectorized_join(geo, stats_df):
+    return main.state_records(main.join_statistics(geo, stats_df))
+
+
+def run(rows_list, repeat, legacy_max_rows):
+    results = []
+    for rows in rows_list:
+        geo, stats_df, stats = synthetic_frames(rows)
+        vec_time = best_of(lambda: vectorized_join(geo, stats_df), repeat)
+        legacy_time = None
+        if rows <= legacy_max_rows:
+            legacy_time = best_of(lambda: legacy_join(geo, stats), repeat)
+            assert legacy_join(geo, stats) == vectorized_join(geo, stats_df), \
+                "vectorized join diverged from legacy output"
+        results.append({'rows': rows, 'vectorized_s': vec_time, 'legacy_s': legacy_time})
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 3_200, 85_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000,
+                        help="Skip the slow legacy path above this many rows")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for r in run(args.rows, args.repeat, args.legacy_max_rows):
+        legacy = f"{r['legacy_s']:.4f}" if r['legacy_s'] is not None else "skipped"
+        speedup = f"{r['legacy_s'] / r['vectorized_s']:.1f}x" if r['legacy_s'] else "-"
+        print(f"{r['rows']:>10,} {legacy:>12} {r['vectorized_s']:>15.4f} {speedup:>9}")
+
+
+if __name__ == "__main__":
+    main_cli()
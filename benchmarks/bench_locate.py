@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: point-to-area lookup throughput at state and county scale.
+
+Compares a ``geopandas.sjoin`` point-in-polygon join with
+``GeometryLocator.locate()`` from main.py (single-threaded and with worker
+threads) on synthetic Voronoi areas over the contiguous US (no shapefile or
+network needed).
+
+Usage:
+    python benchmarks/bench_locate.py [--areas 50 3200] [--points 1000000] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+from _synthetic import EXTENT, best_of, synthetic_areas  # noqa: E402
+
+
+def synthetic_points(count, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(EXTENT[0], EXTENT[2], count), rng.uniform(EXTENT[1], EXTENT[3], count)
+
+
+def sjoin_locate(gdf, lons, lats):
+    """Point-in-polygon with a plain spatial join, for comparison."""
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(lons, lats), crs=gdf.crs)
+    joined = gpd.sjoin(points, gdf, predicate='intersects', how='left')
+    joined = joined[~joined.index.duplicated()]
+    return joined['STUSPS'].to_numpy()
+
+
+def run(areas_list, points, workers, repeat):
+    lons, lats = synthetic_points(points)
+    results = []
+    for areas in areas_list:
+        gdf = synthetic_areas(areas)
+        start = time.perf_counter()
+        locator = main.GeometryLocator(gdf)
+        build_time = time.perf_counter() - start
+        results.append({
+            'areas': len(gdf),
+            'build_s': build_time,
+            'sjoin_s': best_of(lambda: sjoin_locate(gdf, lons, lats), repeat),
+            'locate_s': best_of(lambda: locator.locate(lons, lats), repeat),
+            'parallel_s': best_of(lambda: locator.locate(lons, lats, workers=workers), repeat),
+        })
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--areas', type=int, nargs='+', default=[50, 3_200])
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{args.points:,} points, {args.workers} worker thread(s)")
+    print(f"{'areas':>8} {'build (s)':>10} {'sjoin (s)':>10} {'locate (s)':>11} "
+          f"{'parallel (s)':>13} {'Mpts/s':>8}")
+    for r in run(args.areas, args.points, args.workers, args.repeat):
+        best = min(r['locate_s'], r['parallel_s'])
+        print(f"{r['areas']:>8,} {r['build_s']:>10.3f} {r['sjoin_s']:>10.3f} {r['locate_s']:>11.3f} "
+              f"{r['parallel_s']:>13.3f} {args.points / best / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
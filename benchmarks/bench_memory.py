@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of writing the inline page at state to tract scale.
+
+Compares the original output path (``gdf.to_json()`` parsed back with
+``json.loads``, embedded in the figure, re-serialized by ``fig.to_json()``,
+interpolated into one f-string and written with a single ``f.write``) with
+main.py's streaming path (``geometry_payload()`` bytes, ``write_inline_html()``
+writing each payload straight to the file). Each run happens in a fresh
+process on synthetic polygons (no shapefile or network needed); the peak RSS
+growth over the prepared input is reported.
+
+Usage:
+    python benchmarks/bench_memory.py [--rows 50 3000 30000] [--vertices 64]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+from _synthetic import synthetic_statistics  # noqa: E402
+
+CASES = ('legacy', 'streaming')
+
+
+def synthetic_frame(rows, vertices, seed=0):
+    """Return ``rows`` random round polygons with every statistics column filled in."""
+    import geopandas as gpd
+    import numpy as np
+    import shapely
+
+    rng = np.random.default_rng(seed)
+    centers = shapely.points(rng.uniform(-124, -70, rows), rng.uniform(25, 48, rows))
+    radius = rng.uniform(0.01, 0.5, rows)
+    geometry = shapely.set_precision(shapely.buffer(centers, radius, quad_segs=max(vertices // 4, 1)),
+                                     10 ** -main.COORD_PRECISION)
+    frame = synthetic_statistics([f"K{i:06d}" for i in range(rows)], seed)
+    frame.insert(1, 'NAME', [f"Area {i}" for i in range(rows)])
+    return gpd.GeoDataFrame(frame, geometry=geometry, crs=main.GEOMETRY_CRS)
+
+
+def legacy_write(gdf, path):
+    """The original output path, kept here for comparison."""
+    averages = main.statistics_averages(gdf)
+    geojson = json.loads(gdf[['STUSPS', 'geometry']].to_json())
+    fig = main.build_figure(gdf, 'severity', averages)
+    fig.update_traces(geojson=geojson)
+    stats_json = json.dumps({'usAverages': averages, 'stateData': main.state_records(gdf)})
+    html = f"""<!DOCTYPE html>
+<html><head><style>{main.PAGE_CSS}</style></head>
+<body>{main.PAGE_BODY}<script>{main.APP_JS}
+initMap({fig.to_json()}, null, {stats_json});
+</script></body></html>
+"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def streaming_write(gdf, path):
+    averages = main.statistics_averages(gdf)
+    geometry_json = main.geometry_payload(gdf, 'geojson')
+    figure_json = main.build_figure(gdf, 'severity', averages).to_json().encode('utf-8')
+    stats_json = main.json_object({'usAverages': averages, 'stateData': main.state_records(gdf)})
+    main.write_inline_html(path, figure_json, geometry_json, stats_json)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(case, rows, vertices):
+    """Run one case in this process and return its measurements."""
+    gdf = synthetic_frame(rows, vertices)
+    write = legacy_write if case == 'legacy' else streaming_write
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.html")
+        # Warm up imports and caches on a small slice so they don't count as growth
+        write(gdf.iloc[:10], path)
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        write(gdf, path)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+    peak = peak_rss_mb()
+    return {'case': case, 'rows': rows, 'seconds': seconds, 'output_mb': size / 1e6,
+            'peak_mb': peak, 'growth_mb': peak - baseline}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 3_000, 30_000])
+    parser.add_argument('--vertices', type=int, default=64, help="Approximate vertices per polygon")
+    parser.add_argument('--case', choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # Child process: one measurement, printed as JSON for the parent
+        print(json.dumps(run_case(args.case, args.rows[0], args.vertices)))
+        return
+
+    print(f"{'rows':>8} {'case':>10} {'output (MB)':>12} {'time (s)':>9} {'peak RSS (MB)':>14} {'growth (MB)':>12}")
+    for rows in args.rows:
+        for case in CASES:
+            output = subprocess.run([sys.executable, __file__, '--case', case, '--rows', str(rows),
+                                     '--vertices', str(args.vertices)],
+                                    check=True, capture_output=True, text=True).stdout
+            r = json.loads(output.splitlines()[-1])
+            print(f"{rows:>8,} {case:>10} {r['output_mb']:>12.1f} {r['seconds']:>9.2f} "
+                  f"{r['peak_mb']:>14.0f} {r['growth_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
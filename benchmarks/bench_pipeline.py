@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark: every stage of the map pipeline, on the 50 states and synthetic sets.
+
+Runs cold ``build_map()`` builds in a fresh temporary directory, so nothing
+is reused from an earlier build. That is the same path as ``python main.py
+build``: stage keys, the GeoParquet store, statistics join, zoom cameras,
+figure, geometry payload, precompression and the inline or split write. For
+each ``BuildReport`` stage it reports wall/CPU time, peak RSS and bytes. Each
+dataset runs in its own process. The real 50 states use the Census shapefile
+(already extracted or in the download cache, downloaded if missing; skipped
+when unavailable). Synthetic Voronoi areas over the contiguous US at 3k / 30k
+/ 100k features are generated locally and read from a shapefile as the
+``geometry/states`` stage, then passed to ``build_map(geometry=...)``.
+
+Precompression (brotli at quality 11) dominates the write stage at 30k
+features and above; ``--no-precompress`` leaves it out for quicker runs.
+
+Results are saved as ``benchmarks/results/pipeline-<commit>.json``; compare
+two commits with ``--compare``:
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 3000 30000 100000] [--no-states] [--repeat 3]
+    python benchmarks/bench_pipeline.py --output-mode split --no-precompress
+    python benchmarks/bench_pipeline.py --compare HEAD~1       # or a results file
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import main  # noqa: E402
+from _synthetic import synthetic_areas, synthetic_statistics  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+VERSIONED = ('geopandas', 'shapely', 'pandas', 'numpy', 'plotly', 'pyarrow', 'orjson', 'brotli')
+
+
+def prepare_dataset(name, tmp):
+    """
+    Lay out a dataset's inputs in ``tmp``.
+
+    ``states`` copies the extracted Census shapefile into ``tmp/data``, where
+    the build looks for it, so no download happens; a synthetic set is written
+    as ``tmp/areas/areas.shp`` plus a one-year statistics dataset.
+
+    Returns:
+        Tuple of (shapefile path in ``tmp``, extra ``build_map`` options).
+    """
+    if name == 'states':
+        shapefile = main.download_shapefile()
+        target_dir = os.path.join(tmp, main.SHAPEFILE_DIR)
+        os.makedirs(target_dir)
+        for suffix in (*main.SHAPEFILE_PARTS, '.sha256'):
+            shutil.copy2(os.path.splitext(shapefile)[0] + suffix, target_dir)
+        return os.path.join(target_dir, os.path.basename(shapefile)), {}
+
+    gdf = synthetic_areas(int(name))
+    area_dir = os.path.join(tmp, "areas")
+    os.makedirs(area_dir)
+    shapefile = os.path.join(area_dir, "areas.shp")
+    gdf.to_file(shapefile)
+    dataset = os.path.join(area_dir, "statistics.csv")
+    synthetic_statistics(gdf['STUSPS'].tolist()).assign(year=2023).to_csv(dataset, index=False)
+    return shapefile, {'stats_dataset': dataset}
+
+
+def load_synthetic(shapefile, report):
+    """Read a synthetic shapefile as the ``geometry/states`` stage; returns ``build_map``'s ``geometry``."""
+    with report.stage('geometry'):
+        with report.stage('states') as stage:
+            gdf = main.gpd.read_file(shapefile).to_crs(main.GEOMETRY_CRS)
+            stage['bytes'] = sum(os.path.getsize(os.path.splitext(shapefile)[0] + suffix)
+                                 for suffix in main.SHAPEFILE_PARTS)
+    return {'states': gdf, 'detail': {}, 'key': main.stage_key('bench', main.shapefile_fingerprint(shapefile))}
+
+
+def clean_build(tmp):
+    """Remove the geometry store and every build output in ``tmp`` so the next build starts cold."""
+    for name in (main.GEOMETRY_STORE_DIR, main.SPLIT_OUTPUT_DIR, main.MANIFEST_NAME):
+        path = os.path.join(tmp, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    for name in os.listdir(tmp):
+        if name.startswith("us_law_severity_map_interactive.html"):
+            os.remove(os.path.join(tmp, name))
+
+
+def run_dataset(name, repeat, options, topojson_max_rows):
+    """Benchmark one dataset in this process: best wall/CPU time per stage over ``repeat`` cold builds."""
+    import geopandas as gpd
+    import shapely
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shapefile, extra = prepare_dataset(name, tmp)
+        frame = gpd.read_file(shapefile)
+        if name == 'states':
+            frame = frame[frame['STUSPS'].isin(main.US_STATES)]
+        if options['geometry_format'] == 'topojson' and len(frame) > topojson_max_rows:
+            options = {**options, 'geometry_format': 'geojson'}
+        # main.py's data/ and output paths are relative, so build inside tmp
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            best = {}
+            for _ in range(repeat):
+                clean_build(tmp)
+                report = main.BuildReport()
+                geometry = None if name == 'states' else load_synthetic(shapefile, report)
+                result = main.build_map(report=report, geometry=geometry, **options, **extra)
+                for record in report.stages:
+                    kept = best.setdefault(record['name'], dict(record))
+                    for field in ('seconds', 'cpu_seconds'):
+                        kept[field] = min(kept[field], record[field])
+                    kept['peak_rss_bytes'] = record.get('peak_rss_bytes')
+        finally:
+            os.chdir(cwd)
+    return {
+        'dataset': name,
+        'features': len(frame),
+        'vertices': int(shapely.get_num_coordinates(frame.geometry.values).sum()),
+        'options': options,
+        'bytes': result['bytes'],
+        'stages': list(best.values()),
+    }
+
+
+def git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata():
+    """Commit, environment and library versions the results were measured with."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {}
+    for name in VERSIONED:
+        try:
+            versions[name] = version(name)
+        except PackageNotFoundError:
+            pass
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--', 'main.py')),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versions': versions,
+    }
+
+
+def results_path(ref):
+    """A results file path, or the saved results of git ref ``ref``."""
+    if os.path.exists(ref):
+        return ref
+    commit = git('rev-parse', '--short', ref)
+    if commit is None:
+        raise SystemExit(f"❌ {ref} is neither a results file nor a git ref")
+    return os.path.join(RESULTS_DIR, f"pipeline-{commit}.json")
+
+
+def print_results(results, baseline=None, threshold=0.1):
+    """Print each dataset's stages, with the time ratio to ``baseline`` when given."""
+    previous = {(dataset['dataset'], stage['name']): stage
+                for dataset in (baseline or {}).get('datasets', []) for stage in dataset.get('stages', [])}
+    previous_options = {dataset['dataset']: dataset.get('options')
+                        for dataset in (baseline or {}).get('datasets', [])}
+    for dataset in results['datasets']:
+        if 'error' in dataset:
+            print(f"\n⚠️  {dataset['dataset']}: {dataset['error']}")
+            continue
+        print(f"\n{dataset['dataset']}: {dataset['features']:,} features, {dataset['vertices']:,} vertices, "
+              f"{dataset['options']['output_mode']} {dataset['options']['geometry_format']}")
+        if previous_options.get(dataset['dataset'], dataset['options']) != dataset['options']:
+            print(f"    ⚠️  baseline built with {previous_options[dataset['dataset']]}")
+        print(f"    {'stage':<20} {'wall (s)':>9} {'cpu (s)':>9} {'peak RSS (MB)':>14} {'bytes':>13}"
+              f"{'  vs baseline' if baseline else ''}")
+        for stage in dataset['stages']:
+            peak = stage.get('peak_rss_bytes')
+            peak = '-' if peak is None else f"{peak / 2 ** 20:.0f}"
+            size = f"{stage['bytes']:,}" if 'bytes' in stage else ''
+            line = (f"    {stage['name']:<20} {stage['seconds']:>9.3f} {stage['cpu_seconds']:>9.3f} "
+                    f"{peak:>14} {size:>13}")
+            old = previous.get((dataset['dataset'], stage['name']))
+            if old and old['seconds'] > 0:
+                ratio = stage['seconds'] / old['seconds']
+                flag = " ⚠️" if ratio > 1 + threshold else " ✓" if ratio < 1 - threshold else ""
+                line += f"  {ratio:>6.2f}x{flag}"
+            print(line)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[3_000, 30_000, 100_000],
+                        help="Synthetic feature counts")
+    parser.add_argument('--no-states', dest='states', action='store_false',
+                        help="Skip the real 50-state dataset")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Cold builds per dataset; the best time per stage is kept (default: 1)")
+    parser.add_argument('--output-mode', choices=main.OUTPUT_MODES, default='inline')
+    parser.add_argument('--geometry-format', choices=main.GEOMETRY_FORMATS, default='topojson')
+    parser.add_argument('--topojson-max-rows', type=int, default=3_200,
+                        help="Use GeoJSON instead of TopoJSON (pure-Python arc building) above this many features")
+    parser.add_argument('--no-precompress', dest='precompress', action='store_false',
+                        help="Skip the .gz/.br siblings, as with 'main.py build --no-precompress'")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument('--compare', metavar='REF',
+                        help="Results file or git ref to compare stage times with")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Flag stages more than this fraction slower/faster (default: 0.1)")
+    parser.add_argument('--dataset', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    options = {'output_mode': args.output_mode, 'geometry_format': args.geometry_format,
+               'precompress': args.precompress, 'detail_levels': {}}
+    if args.dataset:
+        # Child process: one dataset, printed as JSON for the parent
+        print(json.dumps(run_dataset(args.dataset, args.repeat, options, args.topojson_max_rows)))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(results_path(args.compare), encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {**run_metadata(), 'datasets': []}
+    for name in (['states'] if args.states else []) + [str(size) for size in args.sizes]:
+        print(f"⏱️  {name}...", flush=True)
+        command = [sys.executable, __file__, '--dataset', name, '--repeat', str(args.repeat),
+                   '--output-mode', args.output_mode, '--geometry-format', args.geometry_format,
+                   '--topojson-max-rows', str(args.topojson_max_rows)]
+        if not args.precompress:
+            command.append('--no-precompress')
+        child = subprocess.run(command, capture_output=True, text=True)
+        if child.returncode != 0:
+            error = (child.stderr.strip().splitlines() or ['failed'])[-1]
+            results['datasets'].append({'dataset': name, 'error': error})
+            continue
+        results['datasets'].append(json.loads(child.stdout.splitlines()[-1]))
+
+    if baseline:
+        print(f"\nBaseline: {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print_results(results, baseline, args.threshold)
+
+    suffix = '-dirty' if results['dirty'] else ''
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{results['commit'] or 'unknown'}{suffix}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📈 Results saved to {os.path.relpath(output)}")
+
+
+if __name__ == "__main__":
+    main_cli()
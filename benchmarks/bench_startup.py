@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CLI startup time and the import cost behind it.
+
+Times ``import main``, ``main.py --help`` and (with ``--build``) an
+up-to-date ``main.py build`` in fresh interpreters, next to importing the
+scientific stack main.py used to load eagerly. ``python -X importtime``
+then reports the heaviest modules ``import main`` still pulls in.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10]
+    python benchmarks/bench_startup.py --build --output-mode split   # after one build
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MAIN = os.path.join(ROOT, "main.py")
+EAGER_IMPORTS = "import geopandas, numpy, pandas, plotly.graph_objects, shapely, requests"
+
+
+def best_of(command, repeat):
+    """Best wall time of ``command`` over ``repeat`` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def import_times(statement):
+    """``(module, self_us, cumulative_us, depth)`` rows of ``python -X importtime -c statement``."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT,
+                            check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Heaviest imports to list")
+    parser.add_argument('--build', nargs=argparse.REMAINDER,
+                        help="Also time 'main.py build' with these options (run a build first)")
+    args = parser.parse_args(argv)
+
+    commands = {
+        'python -c pass': [sys.executable, '-c', 'pass'],
+        'import main': [sys.executable, '-c', 'import main'],
+        'main.py --help': [sys.executable, MAIN, '--help'],
+        'eager imports': [sys.executable, '-c', EAGER_IMPORTS],
+    }
+    if args.build is not None:
+        commands['main.py build (up to date)'] = [sys.executable, MAIN, 'build', *args.build]
+    print(f"{'command':<28} {'best of ' + str(args.repeat) + ' (s)':>16}")
+    for label, command in commands.items():
+        print(f"{label:<28} {best_of(command, args.repeat):>16.3f}")
+
+    # Output is post-order: main's imports are the nested rows just before it
+    rows = import_times('import main')
+    end = next(i for i, row in enumerate(rows) if row[0] == 'main' and row[3] == 0)
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    print(f"\nimport main: {rows[end][2] / 1000:.1f} ms cumulative; heaviest imports:")
+    for name, self_us, cumulative_us, depth in sorted(rows[start:end + 1], key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: click-to-zoom camera per area at state, county and tract scale.
+
+Compares the original ``get_state_bounds()`` (one boolean filter over the
+frame per area) with the vectorized ``compute_views()`` from main.py on
+synthetic polygons (no shapefile or network needed).
+
+Usage:
+    python benchmarks/bench_views.py [--rows 50 3200 30000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+from _synthetic import best_of  # noqa: E402
+
+
+def synthetic_areas(rows, seed=0):
+    """Return a GeoDataFrame of ``rows`` random boxes over the contiguous US."""
+    rng = np.random.default_rng(seed)
+    west = rng.uniform(-124, -70, rows)
+    south = rng.uniform(25, 48, rows)
+    size = rng.uniform(0.05, 8, rows)
+    return gpd.GeoDataFrame(
+        {'STUSPS': [f"K{i:06d}" for i in range(rows)]},
+        geometry=shapely.box(west, south, west + size, south + size / 2),
+        crs=main.GEOMETRY_CRS,
+    )
+
+
+def legacy_views(gdf):
+    """The pre-vectorization lookup, kept here for comparison."""
+    views = {}
+    for abbr in gdf['STUSPS']:
+        state_geom = gdf[gdf['STUSPS'] == abbr].geometry.values[0]
+        bounds = state_geom.bounds
+        center_lon = (bounds[0] + bounds[2]) / 2
+        center_lat = (bounds[1] + bounds[3]) / 2
+        max_range = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+        if max_range > 20:
+            zoom = 3.5
+        elif max_range > 10:
+            zoom = 4.5
+        elif max_range > 5:
+            zoom = 5.5
+        else:
+            zoom = 6.5
+        views[abbr] = (center_lat, center_lon, zoom)
+    return views
+
+
+def vectorized_views(gdf):
+    return main.views_payload(main.compute_views(gdf))
+
+
+def run(rows_list, repeat, legacy_max_rows):
+    results = []
+    for rows in rows_list:
+        gdf = synthetic_areas(rows)
+        vec_time = best_of(lambda: vectorized_views(gdf), repeat)
+        legacy_time = None
+        if rows <= legacy_max_rows:
+            legacy_time = best_of(lambda: legacy_views(gdf), repeat)
+        results.append({'rows': rows, 'vectorized_s': vec_time, 'legacy_s': legacy_time})
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 3_200, 30_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max-rows', type=int, default=5_000,
+                        help="Skip the slow legacy path above this many rows")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for r in run(args.rows, args.repeat, args.legacy_max_rows):
+        legacy = f"{r['legacy_s']:.4f}" if r['legacy_s'] is not None else "skipped"
+        speedup = f"{r['legacy_s'] / r['vectorized_s']:.1f}x" if r['legacy_s'] else "-"
+        print(f"{r['rows']:>10,} {legacy:>12} {r['vectorized_s']:>15.4f} {speedup:>9}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -5,456 +5,3717 @@ Displays a modern, interactive choropleth map showing law severity and crime sta
 Features: click-to-zoom with statistics panel, simplified hover, comprehensive data.
 """
 
-import geopandas as gpd
-import plotly.graph_objects as go
-import requests
+import base64
+import collections
+import importlib
+import re
+import sys
 import zipfile
 import os
 import json
+import hashlib
+import gzip
+import struct
+import mimetypes
+import posixpath
+import shutil
+import tempfile
+import functools
+import time
+import io
+import contextlib
 from pathlib import Path
 
-# URLs for US Census Bureau shapefiles (20m resolution)
-SHAPEFILE_URL = "https://www2.census.gov/geo/tiger/GENZ2022/shp/cb_2022_us_state_20m.zip"
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # optional: without it payloads are serialized with json
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: downloads go to a private temp file and aren't resumed
+    fcntl = None
+
+
+class _LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    geopandas alone pulls in pandas, shapely and pyproj; importing the
+    scientific stack up front cost most of a second on every run, including
+    ``--help`` and up-to-date builds. The first access imports the module and
+    rebinds the global ``alias`` to it, so later lookups are plain globals.
+    """
+
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+
+gpd = _LazyModule('geopandas', 'gpd')
+np = _LazyModule('numpy', 'np')
+pd = _LazyModule('pandas', 'pd')
+go = _LazyModule('plotly.graph_objects', 'go')
+shapely = _LazyModule('shapely', 'shapely')
+requests = _LazyModule('requests', 'requests')
+# Only `serve` needs it, and importing it costs ~50 ms of every run's startup
+asyncio = _LazyModule('asyncio', 'asyncio')
+
+# URLs for US Census Bureau shapefiles (20m resolution for the national view;
+# 5m and 500k are used for zoomed-in level-of-detail geometry)
+SHAPEFILE_URL_TEMPLATE = "https://www2.census.gov/geo/tiger/GENZ2022/shp/cb_2022_us_state_{resolution}.zip"
+SHAPEFILE_NAME_TEMPLATE = "cb_2022_us_state_{resolution}"
+SHAPEFILE_RESOLUTION = "20m"
+SHAPEFILE_URL = SHAPEFILE_URL_TEMPLATE.format(resolution=SHAPEFILE_RESOLUTION)
 SHAPEFILE_DIR = "data"
-SHAPEFILE_NAME = "cb_2022_us_state_20m"
+SHAPEFILE_NAME = SHAPEFILE_NAME_TEMPLATE.format(resolution=SHAPEFILE_RESOLUTION)
+
+# Shared download cache. Point US_LAW_MAP_CACHE_DIR at a volume shared by CI
+# runners / pods so the Census archive is only fetched once.
+CACHE_DIR = os.environ.get("US_LAW_MAP_CACHE_DIR", os.path.join(SHAPEFILE_DIR, "cache"))
+# Optional pinned checksum of the archive; when unset the first verified
+# download is trusted and recorded in the cache index.
+SHAPEFILE_SHA256 = os.environ.get("US_LAW_MAP_SHAPEFILE_SHA256") or None
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj')
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Preprocessed (filtered + reprojected) geometry, stored as GeoParquet
+GEOMETRY_STORE_DIR = os.path.join(SHAPEFILE_DIR, "store")
+GEOMETRY_CRS = "EPSG:4326"
+STATE_COLUMNS = ['STATEFP', 'STUSPS', 'NAME', 'geometry']
+
+# Incremental builds: each stage of a map build (simplified geometry, joined
+# frame, geometry payload, figure JSON) is cached in the geometry store under a
+# key hashed from its inputs, and every output records the key it was built
+# from. Input digests are memoized by size and mtime in DIGEST_INDEX_NAME, so
+# an unchanged input is never re-read. Bump BUILD_CACHE_VERSION when a stage's
+# code changes what it produces.
+BUILD_CACHE_VERSION = 2
+DIGEST_INDEX_NAME = "digests.json"
+
+# Geometry simplification for the embedded GeoJSON. Tolerance is in degrees
+# (0.005 ~ 500 m); coordinates are snapped to a 10^-COORD_PRECISION grid.
+SIMPLIFY_TOLERANCE = 0.005
+COORD_PRECISION = 4
+
+# Geometry encoding embedded in the page: "topojson" (shared arcs, decoded in
+# the browser), plain "geojson", or "binary" typed arrays (quantized int32 or
+# float32 coordinates, see ``encode_binary_geometry``)
+GEOMETRY_FORMATS = ('topojson', 'geojson', 'binary')
+BINARY_ENCODINGS = ('int32', 'float32')
+BINARY_GEOMETRY_VERSION = 1
+WEBAPP_TOPOJSON_PATH = os.path.join("webapp", "public", "us-states.topo.json")
+WEBAPP_VIEWS_PATH = os.path.join("webapp", "public", "state-views.json")
+
+# Click-to-zoom camera, fitted to each area's bounding box: the map viewport
+# in px (the figure minus its margins), the share of it the area may fill and
+# the zoom clamp. Mapbox GL renders 512 px per world tile at zoom 0.
+VIEWPORT_SIZE = (1580, 750)
+VIEW_PADDING = 0.7
+VIEW_ZOOM_RANGE = (2.5, 12.0)
+VIEW_FIELDS = ('lon', 'lat', 'zoom')
+
+# Output layout: one standalone HTML file, or an HTML shell plus
+# content-hashed assets that a CDN can cache forever
+OUTPUT_MODES = ('inline', 'split')
+SPLIT_OUTPUT_DIR = "dist"
+HTML_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_NAME = "asset-manifest.json"
+
+# Precompressed siblings written next to every artifact: encoding -> suffix
+PRECOMPRESS_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+# Minimal TopoJSON -> GeoJSON decoder used by the generated page. Handles
+# quantized, delta-encoded arcs and Polygon/MultiPolygon geometries.
+TOPOJSON_DECODER_JS = """
+function topojsonFeatures(topology, name) {
+    const scale = topology.transform.scale, translate = topology.transform.translate;
+    const arcs = topology.arcs.map(function(arc) {
+        let x = 0, y = 0;
+        return arc.map(function(p) {
+            x += p[0];
+            y += p[1];
+            return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+        });
+    });
+    function ring(refs) {
+        const coords = [];
+        refs.forEach(function(ref) {
+            const arc = ref >= 0 ? arcs[ref] : arcs[~ref].slice().reverse();
+            (coords.length ? arc.slice(1) : arc).forEach(function(p) { coords.push(p); });
+        });
+        return coords;
+    }
+    function polygon(rings) { return rings.map(ring); }
+    return {
+        type: 'FeatureCollection',
+        features: topology.objects[name].geometries.map(function(g) {
+            return {
+                type: 'Feature',
+                id: g.id,
+                properties: g.properties || {},
+                geometry: {
+                    type: g.type,
+                    coordinates: g.type === 'Polygon' ? polygon(g.arcs) : g.arcs.map(polygon)
+                }
+            };
+        })
+    };
+}
+"""
+
+# Decoder for the "binary" geometry format (``encode_binary_geometry``): the
+# typed arrays are viewed in place over the ArrayBuffer (base64 when inlined).
+# Typed arrays use the platform byte order, little-endian on every browser
+# target.
+BINARY_GEOMETRY_DECODER_JS = """
+function binaryFeatures(buffer) {
+    if (typeof buffer === 'string') {
+        const text = atob(buffer);
+        const bytes = new Uint8Array(text.length);
+        for (let i = 0; i < text.length; i++) {
+            bytes[i] = text.charCodeAt(i);
+        }
+        buffer = bytes.buffer;
+    }
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const counts = header.counts;
+    let offset = 4 + headerLength;
+    function view(Type, length) {
+        const array = new Type(buffer, offset, length);
+        offset += length * 4;
+        return array;
+    }
+    const featureOffsets = view(Uint32Array, counts.features + 1);
+    const polygonOffsets = view(Uint32Array, counts.polygons + 1);
+    const ringOffsets = view(Uint32Array, counts.rings + 1);
+    const quantized = header.encoding === 'int32';
+    const values = view(quantized ? Int32Array : Float32Array, counts.points * 2);
+    const sx = header.scale[0], sy = header.scale[1], tx = header.translate[0], ty = header.translate[1];
+    // Quantized coordinates are deltas from the previous point, across rings
+    const points = new Array(counts.points);
+    let x = 0, y = 0;
+    for (let i = 0; i < counts.points; i++) {
+        if (quantized) {
+            x += values[2 * i];
+            y += values[2 * i + 1];
+            points[i] = [x * sx + tx, y * sy + ty];
+        } else {
+            points[i] = [values[2 * i], values[2 * i + 1]];
+        }
+    }
+    function polygon(p) {
+        const rings = [];
+        for (let r = polygonOffsets[p]; r < polygonOffsets[p + 1]; r++) {
+            rings.push(points.slice(ringOffsets[r], ringOffsets[r + 1]));
+        }
+        return rings;
+    }
+    return {
+        type: 'FeatureCollection',
+        features: header.ids.map(function(id, f) {
+            const parts = [];
+            for (let p = featureOffsets[f]; p < featureOffsets[f + 1]; p++) {
+                parts.push(polygon(p));
+            }
+            const properties = {};
+            properties[header.key] = id;
+            return {
+                type: 'Feature',
+                id: id,
+                properties: properties,
+                geometry: parts.length === 1 ? {type: 'Polygon', coordinates: parts[0]}
+                    : {type: 'MultiPolygon', coordinates: parts}
+            };
+        })
+    };
+}
+"""
+
+# Level-of-detail geometry (split output): per-state shards swapped in by the
+# page once the map zoom reaches ``min_zoom``
+DETAIL_LEVELS = {
+    '5m': {'min_zoom': 5.0, 'tolerance': 0.001, 'precision': 5},
+    '500k': {'min_zoom': 7.0, 'tolerance': 0.0002, 'precision': 5},
+}
+
+# Batch rendering (--batch): every metric x year x level variant is a split
+# build in BATCH_OUTPUT_DIR/<metric>-<year>-<level>/, rendered by a process
+# pool that shares the geometry loaded once by the parent
+BATCH_OUTPUT_DIR = os.path.join(SPLIT_OUTPUT_DIR, "variants")
+BATCH_METRICS = ('severity', 'murder_rate', 'gun_death_rate', 'traffic_fatality_rate', 'incarceration_rate')
+BATCH_REPORT_NAME = "batch-report.json"
+
+# Multi-year time series (split output, --time-series): one frame per dataset
+# year, fetched as the year slider moves. Every TIMESERIES_KEYFRAME_INTERVAL-th
+# year is a keyframe with all z values and panel fields; the others carry only
+# what changed since the previous year.
+TIMESERIES_KEYFRAME_INTERVAL = 8
+
+# Sub-state drill-down (split output): with ``--level county``/``tract`` the
+# clicked state's areas are fetched as one shard and drawn over the state.
+# ``per_state`` layers are published by the Census one archive per state.
+# A shard over ``shard_budget`` bytes is re-simplified at double the
+# tolerance, up to SUBAREA_MAX_COARSEN times.
+SUBLEVEL_URL_TEMPLATE = "https://www2.census.gov/geo/tiger/GENZ2022/shp/{name}.zip"
+SUBLEVEL_NAME_TEMPLATE = "cb_2022_{scope}_{layer}_{resolution}"
+SUBLEVELS = {
+    'county': {'resolution': '20m', 'per_state': False, 'tolerance': 0.002, 'precision': 4,
+               'shard_budget': 150_000},
+    'tract': {'resolution': '500k', 'per_state': True, 'tolerance': 0.0005, 'precision': 5,
+              'shard_budget': 400_000},
+}
+LEVELS = ('state', *SUBLEVELS)
+SUBAREA_COLUMNS = ['GEOID', 'STATEFP', 'STUSPS', 'NAMELSAD', 'geometry']
+SUBAREA_MAX_COARSEN = 6
+
+# Point-to-area lookup: points are located in chunks of LOCATE_CHUNK_SIZE
+# (bounds the temporary arrays; chunks are also the unit of parallel work)
+# over a grid LOCATE_GRID_SIZE cells wide
+LOCATE_CHUNK_SIZE = 500_000
+LOCATE_GRID_SIZE = 512
+
+# Raw incident extracts (--ingest-incidents): one row per incident with its
+# type and either the area code (INCIDENT_KEY_COLUMNS) or coordinates. Files
+# are read INCIDENT_CHUNK_SIZE rows at a time, so memory is bounded by the
+# chunk plus one count per area and type.
+INCIDENT_CHUNK_SIZE = 1_000_000
+INCIDENT_TYPE_COLUMN = 'type'
+INCIDENT_COORD_COLUMNS = ('lon', 'lat')
+INCIDENT_KEY_COLUMNS = {'state': 'STUSPS', 'county': 'GEOID'}
+# Incident type -> per-100k rate column it produces
+INCIDENT_METRICS = {
+    'murder': 'murder_rate',
+    'gun_death': 'gun_death_rate',
+    'traffic_fatality': 'traffic_fatality_rate',
+}
+INCIDENT_OUTPUT_TEMPLATE = os.path.join(SHAPEFILE_DIR, "incident-rates-{level}.csv")
+
+# Vector tile export: Mapbox Vector Tiles packed into one PMTiles archive
+# (served by any static server with HTTP range requests) or MBTiles, chosen
+# by the file extension. Geometry is simplified per zoom to ~1 screen pixel.
+TILE_FORMATS = ('.pmtiles', '.mbtiles')
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_PRECISION = 6
+TILE_MAX_LATITUDE = 85.05112878
+TILE_LAYERS = {
+    'states': {'level': 'state', 'min_zoom': 0, 'max_zoom': 8, 'id_column': 'STATEFP',
+               'properties': {'STUSPS': 'abbr', 'NAME': 'name', 'severity': 'severity'}},
+    'counties': {'level': 'county', 'min_zoom': 4, 'max_zoom': 10, 'id_column': 'GEOID',
+                 'properties': {'GEOID': 'geoid', 'STUSPS': 'abbr', 'NAMELSAD': 'name',
+                                'severity': 'severity'}},
+}
+PMTILES_HEADER_SIZE = 127
+PMTILES_ROOT_MAX = 16384 - PMTILES_HEADER_SIZE
+
+# Statistics dataset: one row per state and year in statistics/states.csv (or
+# a Parquet file with the same columns), typed and described by
+# statistics/schema.json. Adding a metric or a year only touches those files;
+# --webapp-data regenerates the webapp copy from them.
+STATS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "statistics")
+STATS_SCHEMA_PATH = os.path.join(STATS_DIR, "schema.json")
+STATS_DATASET_PATH = os.path.join(STATS_DIR, "states.csv")
+STATS_SCHEMA_VERSION = 1
+# Schema dtype -> pandas dtype
+SCHEMA_DTYPES = {'int64': 'int64', 'float64': 'float64', 'string': 'object'}
+WEBAPP_STATS_TS_PATH = os.path.join("webapp", "data", "statistics.ts")
+WEBAPP_STATES_DIR = os.path.join("webapp", "public", "states")
+
+# Command line: ``python main.py <command> [options]``, with ``build`` as the
+# default command; ``bench <name>`` runs BENCH_DIR/bench_<name>.py
+CLI_COMMANDS = ('build', 'ingest', 'serve', 'bench')
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8000
+
+# ``serve``: variants requested as /map/<metric>/<year>/<level>/ are rendered
+# once into SERVE_CACHE_DIR (bounded, least recently used evicted first);
+# file responses are kept in a memory LRU of SERVE_MEMORY_CACHE_MB
+SERVE_MAP_PREFIX = "/map/"
+SERVE_CACHE_DIR = os.path.join(SHAPEFILE_DIR, "serve")
+SERVE_MEMORY_CACHE_MB = 64
+SERVE_DISK_CACHE_MB = 1024
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+LOG_FORMATS = ('text', 'json')
+
+# Build instrumentation (``BuildReport``): optional per-stage profilers, their
+# output directory, and the metric name prefix of the Prometheus export
+PROFILERS = ('cprofile', 'pyinstrument')
+PROFILE_DIR = "profiles"
+METRICS_PREFIX = "us_law_map"
+LOG_LEVELS = {'⚠': 'warning', '❌': 'error'}
+
+# The 50 states shown on the map
+US_STATES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
+    'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
+    'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
+    'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
+}
+
+
+def sha256_file(path):
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_cache_index(cache_dir, name="index.json"):
+    index_path = os.path.join(cache_dir, name)
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_cache_index(cache_dir, index, name="index.json"):
+    """Atomically rewrite the URL -> SHA-256 index (or another ``name``d index) of the cache."""
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(cache_dir, name))
+
+
+@contextlib.contextmanager
+def _cache_lock(cache_dir, key):
+    """
+    Hold an exclusive ``flock`` on ``<cache_dir>/<key>.lock`` for the block.
+
+    Runners sharing the cache directory take it around anything that rewrites
+    a shared file. Yields False (no lock) where ``fcntl`` is unavailable.
+    """
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(cache_dir, f"{key}.lock"), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _download(url, part_path):
+    """Download ``url`` into ``part_path``, resuming from its current size with a Range request."""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f"bytes={offset}-"} if offset else {}
+
+    print(f"📥 Downloading {url}" + (f" (resuming at {offset:,} bytes)" if offset else ""))
+    with requests.get(url, stream=True, headers=headers, timeout=60) as response:
+        if offset and response.status_code == 416:
+            # Range not satisfiable: the partial file is as long as the remote
+            # one or longer, so it may be stale; start over instead of trusting it.
+            print(f"⚠️  Partial download of {url} can't be resumed, starting over")
+            os.remove(part_path)
+            return _download(url, part_path)
+        response.raise_for_status()
+        # A 200 in reply to a Range request means the server ignored it;
+        # start over rather than appending a second full copy.
+        mode = 'ab' if offset and response.status_code == 206 else 'wb'
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+
+
+def _cached_blob(url, cache_dir, suffix, expected_sha256):
+    """The verified ``(blob path, digest)`` of ``url`` already in the cache, or None."""
+    known_sha = expected_sha256 or _read_cache_index(cache_dir).get(url)
+    if known_sha:
+        blob_path = os.path.join(cache_dir, "blobs", f"{known_sha}{suffix}")
+        if os.path.exists(blob_path):
+            if sha256_file(blob_path) == known_sha:
+                print(f"✓ Using cached download {blob_path}")
+                return blob_path, known_sha
+            print(f"⚠️  Cached blob {blob_path} failed verification, re-downloading")
+            os.remove(blob_path)
+    return None
+
+
+def fetch_cached(url, cache_dir=None, expected_sha256=None, suffix=".zip"):
+    """
+    Return the path of a verified, content-addressed copy of ``url``.
+
+    Blobs are stored as ``<cache_dir>/blobs/<sha256><suffix>`` and an index maps
+    each URL to its digest, so any runner sharing the cache directory skips the
+    network entirely. Interrupted downloads are kept as ``.part`` files and
+    resumed with an HTTP Range request; completed downloads are hashed, checked
+    against ``expected_sha256`` (if given) and moved into place with an atomic
+    rename, so a blob is never visible in a half-written state. A per-URL lock
+    (``_cache_lock``) lets one process at a time download a URL; the others
+    wait and then find its blob in the cache.
+
+    Args:
+        url: Source URL.
+        cache_dir: Cache root (defaults to ``CACHE_DIR``).
+        expected_sha256: Optional pinned hex digest the content must match.
+        suffix: File suffix for the stored blob.
+
+    Returns:
+        Tuple of (blob path, hex SHA-256 digest).
+
+    Raises:
+        ValueError: If the downloaded content does not match ``expected_sha256``.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    blob_dir = os.path.join(cache_dir, "blobs")
+    Path(blob_dir).mkdir(parents=True, exist_ok=True)
+    expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+
+    # Cache hit: look the digest up by URL (or by the pinned digest) and
+    # re-verify the blob so a corrupted cache entry is never reused.
+    cached = _cached_blob(url, cache_dir, suffix, expected_sha256)
+    if cached:
+        return cached
+
+    url_key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    with _cache_lock(cache_dir, url_key) as locked:
+        # Another runner may have finished the download while we waited
+        cached = _cached_blob(url, cache_dir, suffix, expected_sha256) if locked else None
+        if cached:
+            return cached
+        if locked:
+            part_path = os.path.join(cache_dir, f"{url_key}.part")
+        else:
+            fd, part_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+            os.close(fd)
+        try:
+            _download(url, part_path)
+            actual_sha = sha256_file(part_path)
+            if expected_sha256 and actual_sha != expected_sha256:
+                os.remove(part_path)
+                raise ValueError(
+                    f"Checksum mismatch for {url}: expected {expected_sha256}, got {actual_sha}"
+                )
+            blob_path = os.path.join(blob_dir, f"{actual_sha}{suffix}")
+            os.replace(part_path, blob_path)
+        finally:
+            if not locked and os.path.exists(part_path):
+                os.remove(part_path)
+
+        # Still under the URL lock, so a waiting runner finds the new entry
+        with _cache_lock(cache_dir, "index"):
+            index = _read_cache_index(cache_dir)
+            index[url] = actual_sha
+            _write_cache_index(cache_dir, index)
+    return blob_path, actual_sha
+
+
+def _extract_is_current(shapefile_dir, name, archive_sha):
+    """Check that every shapefile component exists and came from ``archive_sha``."""
+    marker = os.path.join(shapefile_dir, f"{name}.sha256")
+    if not all(os.path.exists(os.path.join(shapefile_dir, name + ext)) for ext in SHAPEFILE_PARTS):
+        return False
+    if archive_sha is None:
+        return os.path.exists(marker)
+    try:
+        with open(marker, encoding='utf-8') as f:
+            return f.read().strip() == archive_sha
+    except FileNotFoundError:
+        return False
+
+
+def download_shapefile(url=SHAPEFILE_URL, shapefile_dir=SHAPEFILE_DIR, name=SHAPEFILE_NAME,
+                       cache_dir=None, expected_sha256=SHAPEFILE_SHA256):
+    """
+    Download (via the shared cache) and extract the US states shapefile.
+
+    The extract is only trusted if all of its components are present and a
+    ``<name>.sha256`` marker records the archive it came from, so a partial or
+    stale extract is replaced instead of failing later inside ``gpd.read_file``.
+    Extraction happens in a temporary directory and each file is renamed into
+    place.
+
+    Returns:
+        Path to the ``.shp`` file.
+    """
+    Path(shapefile_dir).mkdir(parents=True, exist_ok=True)
+    shapefile_path = os.path.join(shapefile_dir, f"{name}.shp")
+
+    if _extract_is_current(shapefile_dir, name, expected_sha256):
+        print(f"✓ Shapefile already exists at {shapefile_path}")
+        return shapefile_path
+
+    zip_path, archive_sha = fetch_cached(url, cache_dir=cache_dir, expected_sha256=expected_sha256)
+
+    print(f"📦 Extracting shapefile...")
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        bad_member = zip_ref.testzip()
+        if bad_member is not None:
+            os.remove(zip_path)
+            raise zipfile.BadZipFile(f"Corrupt member {bad_member} in {zip_path}")
+        tmp_dir = tempfile.mkdtemp(dir=shapefile_dir, prefix=".extract-")
+        try:
+            zip_ref.extractall(tmp_dir)
+            for member in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, member), os.path.join(shapefile_dir, member))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Written last: its presence means the extract above completed.
+    with open(os.path.join(shapefile_dir, f"{name}.sha256"), 'w', encoding='utf-8') as f:
+        f.write(archive_sha)
+
+    print(f"✓ Shapefile ready at {shapefile_path}")
+    return shapefile_path
+
+
+def shapefile_fingerprint(shapefile_path):
+    """Return a SHA-256 over all components of a shapefile (.shp, .shx, .dbf, .prj)."""
+    base, _ = os.path.splitext(shapefile_path)
+    digest = hashlib.sha256()
+    for ext in SHAPEFILE_PARTS:
+        part = base + ext
+        if os.path.exists(part):
+            digest.update(ext.encode('ascii'))
+            digest.update(file_digest(part).encode('ascii'))
+    return digest.hexdigest()
+
+
+def geometry_store_path(fingerprint, store_dir=None, prefix='states', suffix='.parquet'):
+    """Path of the preprocessed GeoParquet file (or other store entry) for a given fingerprint."""
+    return os.path.join(store_dir or GEOMETRY_STORE_DIR, f"{prefix}-{fingerprint[:16]}{suffix}")
+
+
+def ingest_states(shapefile_path, store_dir=None, fingerprint=None, columns=STATE_COLUMNS,
+                  prefix='states', sort_by=('STUSPS',)):
+    """
+    Parse the raw Census shapefile once and write the 50 states to GeoParquet.
+
+    The stored frame is filtered to ``US_STATES``, trimmed to ``columns``,
+    reprojected to ``GEOMETRY_CRS`` and sorted by ``sort_by``. The file name
+    carries the source shapefile fingerprint, so a new Census release produces a
+    new store entry instead of silently reusing the old one. County and tract
+    layers use the same store with their own ``columns`` and ``prefix``.
+
+    Returns:
+        Tuple of (GeoDataFrame, store path).
+    """
+    fingerprint = fingerprint or shapefile_fingerprint(shapefile_path)
+    store_path = geometry_store_path(fingerprint, store_dir, prefix)
+
+    print("🗺️  Parsing shapefile (one-time ingest)...")
+    gdf = gpd.read_file(shapefile_path)
+    gdf = gdf[gdf['STUSPS'].isin(US_STATES)][columns]
+    gdf = gdf.to_crs(GEOMETRY_CRS).sort_values(list(sort_by)).reset_index(drop=True)
+
+    Path(os.path.dirname(store_path)).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(store_path), suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        gdf.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, store_path)
+    except ImportError:
+        # pyarrow is optional: without it we simply parse the shapefile each run
+        os.remove(tmp_path)
+        print("⚠️  pyarrow not installed, geometry store disabled")
+        return gdf, None
+    print(f"✓ Geometry store written to {store_path}")
+    return gdf, store_path
+
+
+def load_states(shapefile_path, store_dir=None, columns=STATE_COLUMNS, prefix='states',
+                sort_by=('STUSPS',)):
+    """
+    Load the 50-state GeoDataFrame, preferring the preprocessed GeoParquet store.
+
+    Falls back to ``ingest_states`` (which populates the store) when no entry
+    exists for the current shapefile fingerprint. ``columns``, ``prefix`` and
+    ``sort_by`` select another layer (counties, tracts) from the same store.
+    """
+    fingerprint = shapefile_fingerprint(shapefile_path)
+    store_path = geometry_store_path(fingerprint, store_dir, prefix)
+    if os.path.exists(store_path):
+        try:
+            gdf = gpd.read_parquet(store_path)
+            print(f"✓ Loaded geometry from store {store_path}")
+            return gdf
+        except ImportError:
+            pass
+    gdf, _ = ingest_states(shapefile_path, store_dir=store_dir, fingerprint=fingerprint,
+                           columns=columns, prefix=prefix, sort_by=sort_by)
+    return gdf
+
+
+def file_digest(path, cache_dir=None):
+    """
+    Return the hex SHA-256 of ``path``, memoized by absolute path, size and mtime.
+
+    The memo is ``<cache_dir>/digests.json``; a file whose size or
+    modification time changed is hashed again.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    name = os.path.abspath(path)
+    index = _read_cache_index(cache_dir, DIGEST_INDEX_NAME)
+    entry = index.get(name)
+    if entry and entry[:2] == stamp:
+        return entry[2]
+    digest = sha256_file(path)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    index[name] = stamp + [digest]
+    _write_cache_index(cache_dir, index, DIGEST_INDEX_NAME)
+    return digest
+
+
+def stage_key(*inputs):
+    """Hash JSON-serializable build stage inputs (and ``BUILD_CACHE_VERSION``) into a cache key."""
+    payload = json.dumps([BUILD_CACHE_VERSION, *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def extract_fingerprints(pattern, shapefile_dir=SHAPEFILE_DIR):
+    """
+    Fingerprint the complete shapefile extracts whose name matches ``pattern``.
+
+    Nothing is downloaded, so a build can tell whether it is up to date before
+    touching the network; extracts that are missing are simply left out.
+
+    Returns:
+        ``{name: shapefile_fingerprint}`` in name order.
+    """
+    fingerprints = {}
+    for shp in sorted(Path(shapefile_dir).glob(f"{pattern}.shp")):
+        if all(shp.with_suffix(ext).exists() for ext in SHAPEFILE_PARTS):
+            fingerprints[shp.stem] = shapefile_fingerprint(str(shp))
+    return fingerprints
+
+
+def _write_store_frame(frame, path):
+    """Atomically write ``frame`` as (Geo)Parquet; returns False without pyarrow."""
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        frame.to_parquet(tmp_path, index=False)
+    except ImportError:
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def _read_store_frame(path, geo=True):
+    """Read a frame written by ``_write_store_frame``, or None if absent or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return gpd.read_parquet(path) if geo else pd.read_parquet(path)
+    except ImportError:
+        return None
+
+
+def _write_store_file(path, data):
+    """Atomically write a stage product (geometry payload, figure JSON, build state) to the store."""
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data if isinstance(data, bytes) else data.encode('utf-8'))
+    os.replace(tmp_path, path)
+
+
+def simplified_states(shapefile_path, tolerance, precision, store_dir=None, force=False):
+    """
+    Load ``shapefile_path`` simplified by ``simplify_states``, cached in the store.
+
+    The cache key covers the shapefile fingerprint, ``tolerance`` and
+    ``precision``; ``force`` recomputes and overwrites the entry.
+
+    Returns:
+        Tuple of (GeoDataFrame, simplification report or None on a cache hit,
+        stage key).
+    """
+    key = stage_key('simplified', shapefile_fingerprint(shapefile_path), tolerance, precision)
+    cache_path = geometry_store_path(key, store_dir, prefix='simplified')
+    gdf = None if force else _read_store_frame(cache_path)
+    if gdf is not None:
+        print(f"✓ Simplified geometry unchanged, loaded {cache_path}")
+        return gdf, None, key
+    gdf, report = simplify_states(load_states(shapefile_path, store_dir), tolerance, precision)
+    _write_store_frame(gdf, cache_path)
+    return gdf, report, key
+
+
+def _polygons(geom):
+    """Return the polygons of a Polygon or MultiPolygon as a list."""
+    if geom.geom_type == 'Polygon':
+        return [geom]
+    return list(geom.geoms)
+
+
+def build_topology(geometries, precision=COORD_PRECISION):
+    """
+    Build a shared-arc topology from polygon geometries.
+
+    Coordinates are quantized to an integer grid of step ``10 ** -precision``
+    so vertices shared by neighbouring states compare equal. Every ring is cut
+    at junctions (vertices whose neighbours differ between rings) and the
+    resulting arcs are de-duplicated, so a border shared by two states is
+    stored once and referenced from both. References follow the TopoJSON
+    convention: ``~i`` means arc ``i`` traversed in reverse.
+
+    Polygons whose outer ring collapses below three points on the grid are
+    left out, so a geometry made only of such slivers has no polygons.
+
+    Returns:
+        Dict with ``step``, ``translate`` (grid origin), ``arcs`` (lists of
+        integer ``(x, y)`` tuples) and ``geometries`` (per input geometry, a
+        list of polygons, each a list of rings, each a list of arc refs).
+    """
+    step = 10 ** -precision
+    bounds = [geom.bounds for geom in geometries]
+    x0 = min(b[0] for b in bounds)
+    y0 = min(b[1] for b in bounds)
+
+    # Quantize rings, dropping consecutive duplicates created by snapping
+    quantized = []
+    for geom in geometries:
+        polygons = []
+        for polygon in _polygons(geom):
+            rings = []
+            for i, ring in enumerate([polygon.exterior, *polygon.interiors]):
+                pts = []
+                for x, y in ring.coords[:-1]:
+                    p = (round((x - x0) / step), round((y - y0) / step))
+                    if not pts or pts[-1] != p:
+                        pts.append(p)
+                while len(pts) > 1 and pts[0] == pts[-1]:
+                    pts.pop()
+                if len(pts) >= 3:
+                    rings.append(pts)
+                elif i == 0:
+                    # A collapsed exterior drops the whole polygon; its holes
+                    # must not be promoted to the outer ring.
+                    break
+            if rings:
+                polygons.append(rings)
+        quantized.append(polygons)
+
+    # Junctions: points seen with more than one distinct pair of neighbours
+    neighbours = {}
+    junctions = set()
+    for polygons in quantized:
+        for rings in polygons:
+            for pts in rings:
+                n = len(pts)
+                for i, p in enumerate(pts):
+                    a, b = pts[i - 1], pts[(i + 1) % n]
+                    pair = (a, b) if a <= b else (b, a)
+                    seen = neighbours.setdefault(p, pair)
+                    if seen != pair:
+                        junctions.add(p)
+
+    arcs = []
+    arc_index = {}
+
+    def arc_ref(segment):
+        key = tuple(segment)
+        if key in arc_index:
+            return arc_index[key]
+        reverse_key = key[::-1]
+        if reverse_key in arc_index:
+            return ~arc_index[reverse_key]
+        arc_index[key] = len(arcs)
+        arcs.append(segment)
+        return len(arcs) - 1
+
+    topo_geometries = []
+    for polygons in quantized:
+        topo_polygons = []
+        for rings in polygons:
+            topo_rings = []
+            for pts in rings:
+                cuts = [i for i, p in enumerate(pts) if p in junctions]
+                if not cuts:
+                    # Unshared ring: rotate to a canonical start so an identical
+                    # ring elsewhere still de-duplicates.
+                    start = pts.index(min(pts))
+                    pts = pts[start:] + pts[:start]
+                    topo_rings.append([arc_ref(pts + [pts[0]])])
+                    continue
+                start = cuts[0]
+                pts = pts[start:] + pts[:start]
+                cuts = [i - start for i in cuts] + [len(pts)]
+                closed = pts + [pts[0]]
+                topo_rings.append([
+                    arc_ref(closed[cuts[k]:cuts[k + 1] + 1]) for k in range(len(cuts) - 1)
+                ])
+            topo_polygons.append(topo_rings)
+        topo_geometries.append(topo_polygons)
+
+    return {'step': step, 'translate': (x0, y0), 'arcs': arcs, 'geometries': topo_geometries}
+
+
+def simplify_arcs(arcs, tolerance):
+    """
+    Douglas-Peucker simplify each arc (in grid units) with its endpoints fixed.
+
+    Because shared borders are a single arc, both neighbours receive exactly
+    the same simplified line and no gaps or overlaps open up between them.
+    """
+    if not tolerance:
+        return [list(arc) for arc in arcs]
+    lines = shapely.simplify(
+        [shapely.LineString(arc) for arc in arcs], tolerance, preserve_topology=True
+    )
+    simplified = []
+    for arc, line in zip(arcs, lines):
+        coords = [tuple(int(v) for v in c) for c in shapely.get_coordinates(line)]
+        closed = arc[0] == arc[-1]
+        simplified.append(coords if len(coords) >= (4 if closed else 2) else list(arc))
+    return simplified
+
+
+def _ring_coords(refs, arcs):
+    coords = []
+    for ref in refs:
+        arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+        coords.extend(arc if not coords else arc[1:])
+    return coords
+
+
+def topology_to_shapes(topology, arcs=None, precision=COORD_PRECISION, fallback=None):
+    """
+    Rebuild shapely geometries from a topology, optionally with replacement arcs.
+
+    Coordinates are dequantized and rounded to ``precision`` decimals. Holes
+    that collapse below three distinct points are dropped; a collapsed outer
+    ring falls back to its unsimplified arcs so no state ever disappears. A
+    geometry with no polygons left after quantization (only sub-grid islands)
+    is taken from ``fallback``, the unsimplified input geometries, or is an
+    empty polygon without them.
+    """
+    original_arcs = topology['arcs']
+    arcs = arcs if arcs is not None else original_arcs
+    step = topology['step']
+    x0, y0 = topology['translate']
+
+    def dequantize(coords):
+        return [(round(x0 + x * step, precision), round(y0 + y * step, precision)) for x, y in coords]
+
+    shapes = []
+    for index, topo_polygons in enumerate(topology['geometries']):
+        if not topo_polygons:
+            shapes.append(fallback[index] if fallback is not None else shapely.Polygon())
+            continue
+        polygons = []
+        for topo_rings in topo_polygons:
+            rings = []
+            for i, refs in enumerate(topo_rings):
+                coords = _ring_coords(refs, arcs)
+                if len(set(coords)) < 3:
+                    if i > 0:
+                        continue
+                    coords = _ring_coords(refs, original_arcs)
+                rings.append(dequantize(coords))
+            polygons.append(shapely.Polygon(rings[0], rings[1:]))
+        shapes.append(polygons[0] if len(polygons) == 1 else shapely.MultiPolygon(polygons))
+    return shapes
+
+
+def simplify_states(gdf, tolerance=SIMPLIFY_TOLERANCE, precision=COORD_PRECISION, key='STUSPS'):
+    """
+    Simplify and quantize state geometry without breaking shared borders.
+
+    Args:
+        gdf: GeoDataFrame with ``key`` and lon/lat ``geometry``.
+        tolerance: Douglas-Peucker tolerance in degrees (0 to only quantize).
+        precision: Number of decimals kept in the output coordinates.
+        key: Column identifying each row in the report.
+
+    Returns:
+        Tuple of (simplified GeoDataFrame copy, report), where report maps each
+        ``key`` value to ``(bytes_before, bytes_after)`` of its GeoJSON geometry.
+    """
+    topology = build_topology(list(gdf.geometry), precision=precision)
+    arcs = simplify_arcs(topology['arcs'], tolerance / topology['step'])
+    shapes = topology_to_shapes(topology, arcs, precision=precision, fallback=list(gdf.geometry))
+
+    report = {}
+    for abbr, before, after in zip(gdf[key], gdf.geometry, shapes):
+        report[abbr] = (len(json.dumps(shapely.geometry.mapping(before))),
+                        len(json.dumps(shapely.geometry.mapping(after))))
+
+    simplified = gdf.copy()
+    simplified['geometry'] = gpd.GeoSeries(shapes, index=gdf.index, crs=gdf.crs)
+    return simplified, report
+
+
+def print_simplification_report(report, top=5):
+    """Print total and per-state GeoJSON bytes saved by ``simplify_states``."""
+    before = sum(b for b, _ in report.values())
+    after = sum(a for _, a in report.values())
+    saved = before - after
+    print(f"✂️  Geometry simplified: {before:,} → {after:,} bytes "
+          f"({saved / before:.0%} saved)" if before else "✂️  Geometry simplified")
+    ranked = sorted(report.items(), key=lambda item: item[1][0] - item[1][1], reverse=True)
+    for abbr, (b, a) in ranked[:top]:
+        print(f"    {abbr}: {b:,} → {a:,} bytes (-{b - a:,})")
+
+
+def encode_topojson(topology, ids=None, properties=None, object_name='states'):
+    """
+    Encode a ``build_topology`` result as a TopoJSON document.
+
+    Arcs are delta-encoded integer coordinates with a ``transform`` to turn
+    them back into lon/lat, which is what makes the format compact.
+
+    Args:
+        topology: Result of ``build_topology``.
+        ids: Optional per-geometry ``id`` values.
+        properties: Optional per-geometry property dicts.
+        object_name: Name of the GeometryCollection under ``objects``.
+    """
+    encoded_arcs = []
+    for arc in topology['arcs']:
+        px, py = 0, 0
+        encoded = []
+        for x, y in arc:
+            encoded.append([x - px, y - py])
+            px, py = x, y
+        encoded_arcs.append(encoded)
+
+    geometries = []
+    for i, polygons in enumerate(topology['geometries']):
+        if len(polygons) == 1:
+            geometry = {'type': 'Polygon', 'arcs': polygons[0]}
+        else:
+            geometry = {'type': 'MultiPolygon', 'arcs': polygons}
+        if ids is not None:
+            geometry['id'] = ids[i]
+        if properties is not None:
+            geometry['properties'] = properties[i]
+        geometries.append(geometry)
+
+    step = topology['step']
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [step, step], 'translate': list(topology['translate'])},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded_arcs,
+    }
+
+
+def gdf_to_topojson(gdf, id_column='STUSPS', property_columns=('STUSPS',),
+                    precision=COORD_PRECISION, object_name='states'):
+    """
+    Convert a (typically already simplified) GeoDataFrame to a TopoJSON dict.
+
+    Property names are taken from ``property_columns``; pass a dict to rename
+    them (``{'NAME': 'name'}``).
+    """
+    topology = build_topology(list(gdf.geometry), precision=precision)
+    if not isinstance(property_columns, dict):
+        property_columns = {col: col for col in property_columns}
+    properties = [
+        {key: row[col] for col, key in property_columns.items()}
+        for row in gdf[list(property_columns)].to_dict('records')
+    ]
+    return encode_topojson(topology, ids=list(gdf[id_column]), properties=properties,
+                           object_name=object_name)
+
+
+def write_webapp_topojson(gdf, output_path=WEBAPP_TOPOJSON_PATH, precision=COORD_PRECISION):
+    """
+    Write the state boundaries used by the Next.js webapp as TopoJSON.
+
+    The webapp matches features on ``properties.name`` and uses the FIPS code
+    as the feature id for hover state, so those are the only attributes kept.
+    """
+    topology = gdf_to_topojson(gdf, id_column='STATEFP', property_columns={'NAME': 'name'},
+                               precision=precision)
+    Path(os.path.dirname(output_path) or ".").mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(topology, f, separators=(',', ':'))
+    print(f"✓ Webapp TopoJSON written to {output_path} ({os.path.getsize(output_path):,} bytes)")
+    return output_path
+
+
+def encode_binary_geometry(gdf, encoding='int32', precision=COORD_PRECISION, key='STUSPS'):
+    """
+    Pack polygon rings into little-endian typed arrays with offset arrays.
+
+    The result is a 4-byte header length, a JSON header (ids, encoding,
+    transform and counts, space-padded to a 4-byte boundary) and four arrays
+    the browser views in place: ``Uint32`` feature -> polygon, polygon -> ring
+    and ring -> point offsets, then interleaved x/y coordinates. ``'int32'``
+    coordinates are quantized to a 10^-``precision`` grid and delta-encoded
+    (each point relative to the previous one, across rings); ``'float32'``
+    stores lon/lat as is.
+
+    Returns:
+        The encoded bytes, decoded by ``binaryFeatures`` in the page (or
+        ``binary_geometry_shapes``).
+    """
+    if encoding not in BINARY_ENCODINGS:
+        raise ValueError(f"encoding must be one of {BINARY_ENCODINGS}, got {encoding!r}")
+    geom_type, coords, offsets = shapely.to_ragged_array(np.asarray(gdf.geometry))
+    if geom_type == shapely.GeometryType.POLYGON:
+        offsets = (*offsets, np.arange(len(gdf) + 1))
+    elif geom_type != shapely.GeometryType.MULTIPOLYGON:
+        raise ValueError(f"expected Polygon/MultiPolygon geometry, got {geom_type.name}")
+    ring_offsets, polygon_offsets, feature_offsets = offsets
+
+    step = 10 ** -precision
+    translate = [0.0, 0.0]
+    if encoding == 'int32':
+        if len(coords):
+            translate = (np.floor(coords.min(axis=0) / step) * step).round(precision).tolist()
+        quantized = np.rint((coords - translate) / step).astype(np.int64)
+        values = np.diff(quantized, axis=0, prepend=0).astype('<i4')
+    else:
+        values = coords.astype('<f4')
+
+    header = dumps_json({
+        'version': BINARY_GEOMETRY_VERSION,
+        'encoding': encoding,
+        'key': key,
+        'ids': gdf[key].tolist(),
+        'scale': [step, step],
+        'translate': translate,
+        'counts': {'features': len(feature_offsets) - 1, 'polygons': len(polygon_offsets) - 1,
+                   'rings': len(ring_offsets) - 1, 'points': len(coords)},
+    })
+    header += b' ' * (-len(header) % 4)
+    return b''.join([
+        struct.pack('<I', len(header)), header,
+        *(np.asarray(offset, dtype='<u4').tobytes() for offset in (feature_offsets, polygon_offsets, ring_offsets)),
+        values.tobytes(),
+    ])
+
+
+def binary_geometry_shapes(data):
+    """
+    Decode ``encode_binary_geometry`` bytes.
+
+    Returns:
+        Tuple of (ids, shapely geometries); single-part features come back
+        as MultiPolygons.
+    """
+    (header_length,) = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + header_length])
+    counts = header['counts']
+    position = 4 + header_length
+    offsets = []
+    for name in ('features', 'polygons', 'rings'):
+        offsets.append(np.frombuffer(data, dtype='<u4', count=counts[name] + 1, offset=position).astype(np.int64))
+        position += (counts[name] + 1) * 4
+    feature_offsets, polygon_offsets, ring_offsets = offsets
+    if header['encoding'] == 'int32':
+        values = np.frombuffer(data, dtype='<i4', count=counts['points'] * 2, offset=position)
+        quantized = np.cumsum(values.reshape(-1, 2), axis=0, dtype=np.int64)
+        coords = quantized * header['scale'] + header['translate']
+    else:
+        coords = np.frombuffer(data, dtype='<f4', count=counts['points'] * 2, offset=position)
+        coords = coords.reshape(-1, 2).astype(np.float64)
+    geometries = shapely.from_ragged_array(shapely.GeometryType.MULTIPOLYGON, coords,
+                                           (ring_offsets, polygon_offsets, feature_offsets))
+    return header['ids'], list(geometries)
+
+
+def _varint(value):
+    """Encode a non-negative int as a protobuf/PMTiles varint."""
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _pb_bytes(field, payload):
+    """Length-delimited protobuf field (strings, messages, packed arrays)."""
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _pb_uint(field, value):
+    """Varint protobuf field."""
+    return _varint(field << 3) + _varint(value)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _mvt_value(value):
+    """Encode a property value as an MVT ``Value`` message."""
+    if isinstance(value, bool):
+        return _pb_uint(7, int(value))
+    if isinstance(value, int):
+        return _pb_uint(5, value) if value >= 0 else _pb_uint(6, _zigzag(value))
+    if isinstance(value, float):
+        return _varint(3 << 3 | 1) + struct.pack('<d', value)
+    return _pb_bytes(1, str(value).encode('utf-8'))
+
+
+def encode_mvt_polygon(geom):
+    """
+    Encode tile-space polygons as MVT geometry commands.
+
+    ``geom`` is in tile pixel coordinates (y down) and may be any geometry;
+    only its polygon parts are kept. Rings are rounded to integers, winding is
+    fixed (exterior rings positive area, holes negative) and rings that collapse
+    to fewer than three points are dropped.
+
+    Returns:
+        List of command integers (empty when nothing survives).
+    """
+    commands = []
+    cx = cy = 0
+    for polygon in shapely.get_parts(shapely.get_parts(geom)):
+        if polygon.geom_type != 'Polygon':
+            continue
+        for i, ring in enumerate([polygon.exterior, *polygon.interiors]):
+            points = np.round(np.asarray(ring.coords)[:-1]).astype(np.int64)
+            points = points[np.any(points != np.roll(points, 1, axis=0), axis=1)]
+            if len(points) < 3:
+                if i == 0:
+                    break
+                continue
+            x, y = points[:, 0], points[:, 1]
+            area = int(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+            if area == 0:
+                if i == 0:
+                    break
+                continue
+            if (area > 0) != (i == 0):
+                points = points[::-1]
+            deltas = np.diff(points, axis=0, prepend=[[cx, cy]])
+            cx, cy = (int(v) for v in points[-1])
+            params = [_zigzag(int(v)) for v in deltas.ravel()]
+            commands += [1 | 1 << 3, *params[:2], 2 | (len(points) - 1) << 3, *params[2:], 7 | 1 << 3]
+    return commands
+
+
+def encode_mvt_layer(name, features, extent=TILE_EXTENT):
+    """
+    Encode one MVT layer.
+
+    Args:
+        name: Layer name (``source-layer`` in the map style).
+        features: Iterable of ``(id, properties, commands)``; ``None``
+            property values are omitted.
+        extent: Tile extent the geometry commands are expressed in.
+    """
+    keys, values = {}, {}
+    body = bytearray()
+    for feature_id, properties, commands in features:
+        tags = []
+        for key, value in properties.items():
+            if value is not None:
+                tags += [keys.setdefault(key, len(keys)), values.setdefault(_mvt_value(value), len(values))]
+        body += _pb_bytes(2, _pb_uint(1, feature_id)
+                          + _pb_bytes(2, b''.join(_varint(t) for t in tags))
+                          + _pb_uint(3, 3)  # POLYGON
+                          + _pb_bytes(4, b''.join(_varint(c) for c in commands)))
+    return (_pb_uint(15, 2) + _pb_bytes(1, name.encode('utf-8')) + bytes(body)
+            + b''.join(_pb_bytes(3, key.encode('utf-8')) for key in keys)
+            + b''.join(_pb_bytes(4, value) for value in values)
+            + _pb_uint(5, extent))
+
+
+def _mercator_pixels(coords, zoom, extent=TILE_EXTENT):
+    """Project an ``(N, 2)`` lon/lat array to global tile pixels at ``zoom``."""
+    size = extent * (1 << zoom)
+    return np.column_stack([(coords[:, 0] + 180.0) / 360.0 * size, _mercator_y(coords[:, 1]) * size])
+
+
+def zxy_to_tileid(z, x, y):
+    """PMTiles tile id: tiles of lower zooms first, then Hilbert order within a zoom."""
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    n = 1 << z
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return tile_id
+
+
+def iter_vector_tiles(layers, extent=TILE_EXTENT, buffer=TILE_BUFFER):
+    """
+    Cut layers into gzip-compressed Mapbox Vector Tiles, one zoom at a time.
+
+    At each zoom every layer is simplified with ``simplify_states`` at about
+    one screen pixel (shared borders stay shared), projected to Web Mercator
+    and clipped to each tile it touches (plus ``buffer`` pixels so strokes do
+    not show seams). Only one zoom's tiles are held in memory.
+
+    Args:
+        layers: Dict of layer name -> ``{'gdf', 'id_column', 'properties',
+            'min_zoom', 'max_zoom'}``; ``properties`` maps columns to the
+            attribute names written to the tile, ``id_column`` must be numeric.
+
+    Yields:
+        ``(z, x, y, tile_bytes)`` in PMTiles tile id order.
+    """
+    min_zoom = min(layer['min_zoom'] for layer in layers.values())
+    max_zoom = max(layer['max_zoom'] for layer in layers.values())
+    for zoom in range(min_zoom, max_zoom + 1):
+        tiles = {}
+        last = (1 << zoom) - 1
+        for name, layer in layers.items():
+            if not layer['min_zoom'] <= zoom <= layer['max_zoom']:
+                continue
+            gdf = layer['gdf']
+            simplified, _ = simplify_states(gdf, 360.0 / (256 << zoom), TILE_PRECISION,
+                                            key=layer['id_column'])
+            pixels = shapely.make_valid(shapely.transform(
+                simplified.geometry.values, lambda coords: _mercator_pixels(coords, zoom, extent)
+            ))
+            ids = gdf[layer['id_column']].astype('int64').tolist()
+            properties = gdf[list(layer['properties'])].rename(columns=layer['properties']).to_dict('records')
+            for geom, feature_id, props in zip(pixels, ids, properties):
+                minx, miny, maxx, maxy = geom.bounds
+                for x in range(max(0, int((minx - buffer) // extent)), min(last, int((maxx + buffer) // extent)) + 1):
+                    for y in range(max(0, int((miny - buffer) // extent)), min(last, int((maxy + buffer) // extent)) + 1):
+                        clipped = shapely.clip_by_rect(geom, x * extent - buffer, y * extent - buffer,
+                                                       (x + 1) * extent + buffer, (y + 1) * extent + buffer)
+                        if clipped.is_empty:
+                            continue
+                        commands = encode_mvt_polygon(
+                            shapely.transform(clipped, lambda coords: coords - (x * extent, y * extent))
+                        )
+                        if commands:
+                            tiles.setdefault((x, y), {}).setdefault(name, []).append(
+                                (feature_id, props, commands)
+                            )
+        for x, y in sorted(tiles, key=lambda xy: zxy_to_tileid(zoom, *xy)):
+            tile = b''.join(_pb_bytes(3, encode_mvt_layer(name, features, extent))
+                            for name, features in tiles[(x, y)].items())
+            yield zoom, x, y, gzip.compress(tile, compresslevel=9, mtime=0)
+
+
+def _pmtiles_directory(entries):
+    """Serialize ``(tile_id, offset, length, run_length)`` entries as a gzip PMTiles directory."""
+    out = bytearray(_varint(len(entries)))
+    last_id = 0
+    for tile_id, _, _, _ in entries:
+        out += _varint(tile_id - last_id)
+        last_id = tile_id
+    for _, _, _, run_length in entries:
+        out += _varint(run_length)
+    for _, _, length, _ in entries:
+        out += _varint(length)
+    for i, (_, offset, _, _) in enumerate(entries):
+        previous = entries[i - 1] if i else None
+        contiguous = previous and offset == previous[1] + previous[2]
+        out += _varint(0 if contiguous else offset + 1)
+    return gzip.compress(bytes(out), compresslevel=9, mtime=0)
+
+
+def write_pmtiles(path, tiles, metadata, center=(-95.7129, 37.0902)):
+    """
+    Write ``(z, x, y, bytes)`` tiles (in tile id order) as a PMTiles v3 archive.
+
+    Tile data is spooled to a temporary file as it arrives; identical tiles
+    (e.g. the interior of a large state) are stored once and consecutive
+    repeats collapse into one run-length entry. When the root directory does
+    not fit in the first 16 KiB it is split into leaf directories.
+
+    Returns:
+        Dict with ``tiles`` (addressed), ``contents`` (unique) and ``bytes``.
+    """
+    entries = []
+    offsets = {}
+    zooms = []
+    with tempfile.TemporaryFile() as data:
+        for z, x, y, tile in tiles:
+            tile_id = zxy_to_tileid(z, x, y)
+            zooms.append(z)
+            digest = hashlib.sha256(tile).digest()
+            if digest not in offsets:
+                offsets[digest] = (data.tell(), len(tile))
+                data.write(tile)
+            offset, length = offsets[digest]
+            last = entries[-1] if entries else None
+            if last and last[1] == offset and last[0] + last[3] == tile_id:
+                entries[-1] = (last[0], offset, length, last[3] + 1)
+            else:
+                entries.append((tile_id, offset, length, 1))
+
+        root, leaves = _pmtiles_directory(entries), b''
+        leaf_size = 4096
+        while len(root) > PMTILES_ROOT_MAX:
+            root_entries, leaf_parts, leaf_offset = [], [], 0
+            for start in range(0, len(entries), leaf_size):
+                leaf = _pmtiles_directory(entries[start:start + leaf_size])
+                root_entries.append((entries[start][0], leaf_offset, len(leaf), 0))
+                leaf_parts.append(leaf)
+                leaf_offset += len(leaf)
+            root, leaves = _pmtiles_directory(root_entries), b''.join(leaf_parts)
+            leaf_size *= 2
+
+        meta = gzip.compress(json.dumps(metadata, separators=(',', ':')).encode('utf-8'),
+                             compresslevel=9, mtime=0)
+        data_length = data.tell()
+        bounds = metadata.get('bounds', [-180, -85, 180, 85])
+        root_offset = PMTILES_HEADER_SIZE
+        meta_offset = root_offset + len(root)
+        leaf_offset = meta_offset + len(meta)
+        data_offset = leaf_offset + len(leaves)
+        header = b'PMTiles' + struct.pack(
+            '<BQQQQQQQQQQQBBBBBBiiiiBii', 3,
+            root_offset, len(root), meta_offset, len(meta), leaf_offset, len(leaves),
+            data_offset, data_length, len(zooms), len(entries), len(offsets),
+            1, 2, 2, 1,  # clustered, gzip directories, gzip tiles, MVT
+            min(zooms, default=0), max(zooms, default=0),
+            *(int(round(v * 1e7)) for v in bounds),
+            min(zooms, default=0), int(round(center[0] * 1e7)), int(round(center[1] * 1e7)),
+        )
+
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".pmtiles.tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header + root + meta + leaves)
+            data.seek(0)
+            shutil.copyfileobj(data, f)
+        os.replace(tmp_path, path)
+    return {'tiles': len(zooms), 'contents': len(offsets), 'bytes': os.path.getsize(path)}
+
+
+def _read_varint(buf, pos):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _parse_pmtiles_directory(data):
+    buf = gzip.decompress(data)
+    count, pos = _read_varint(buf, 0)
+    columns = []
+    for _ in range(4):
+        column = []
+        for _ in range(count):
+            value, pos = _read_varint(buf, pos)
+            column.append(value)
+        columns.append(column)
+    deltas, run_lengths, lengths, raw_offsets = columns
+    entries, tile_id = [], 0
+    for i in range(count):
+        tile_id += deltas[i]
+        if raw_offsets[i] == 0 and i:
+            offset = entries[-1][1] + entries[-1][2]
+        else:
+            offset = raw_offsets[i] - 1
+        entries.append((tile_id, offset, lengths[i], run_lengths[i]))
+    return entries
 
-def download_shapefile():
-    """Download and extract US states shapefile if not already present."""
-    Path(SHAPEFILE_DIR).mkdir(exist_ok=True)
-    shapefile_path = os.path.join(SHAPEFILE_DIR, f"{SHAPEFILE_NAME}.shp")
 
-    if os.path.exists(shapefile_path):
-        print(f"✓ Shapefile already exists at {shapefile_path}")
-        return shapefile_path
+def read_pmtiles_tile(path, z, x, y):
+    """
+    Read one tile from a PMTiles archive written by ``write_pmtiles``.
+
+    Only the header, the directories on the tile's path and the tile itself are
+    read (the same ranges a browser client requests).
+
+    Returns:
+        The stored (gzip-compressed) tile bytes, or ``None`` if absent.
+    """
+    tile_id = zxy_to_tileid(z, x, y)
+    with open(path, 'rb') as f:
+        header = f.read(PMTILES_HEADER_SIZE)
+        if header[:7] != b'PMTiles' or header[7] != 3:
+            raise ValueError(f"{path} is not a PMTiles v3 archive")
+        (root_offset, root_length, _, _, leaf_offset, _, data_offset) = struct.unpack_from('<7Q', header, 8)
+        dir_offset, dir_length = root_offset, root_length
+        for _ in range(4):
+            f.seek(dir_offset)
+            entries = _parse_pmtiles_directory(f.read(dir_length))
+            match = None
+            for entry in entries:
+                if entry[0] > tile_id:
+                    break
+                match = entry
+            if match is None:
+                return None
+            entry_id, offset, length, run_length = match
+            if run_length == 0:
+                dir_offset, dir_length = leaf_offset + offset, length
+                continue
+            if tile_id >= entry_id + run_length:
+                return None
+            f.seek(data_offset + offset)
+            return f.read(length)
+    return None
+
+
+def write_mbtiles(path, tiles, metadata):
+    """Write ``(z, x, y, bytes)`` tiles to an MBTiles (SQLite, TMS rows) archive."""
+    import sqlite3
+    Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".mbtiles.tmp")
+    os.close(fd)
+    count = 0
+    with sqlite3.connect(tmp_path) as db:
+        db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+        db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+        for z, x, y, tile in tiles:
+            db.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", (z, x, (1 << z) - 1 - y, tile))
+            count += 1
+        rows = {
+            'name': metadata['name'], 'format': 'pbf', 'type': 'overlay',
+            'minzoom': metadata['minzoom'], 'maxzoom': metadata['maxzoom'],
+            'bounds': ','.join(str(v) for v in metadata['bounds']),
+            'json': json.dumps({'vector_layers': metadata['vector_layers']}),
+        }
+        db.executemany("INSERT INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in rows.items()])
+    db.close()
+    os.replace(tmp_path, path)
+    return {'tiles': count, 'contents': count, 'bytes': os.path.getsize(path)}
+
+
+def export_vector_tiles(path, layers):
+    """
+    Cut ``layers`` (see ``iter_vector_tiles``) into a PMTiles or MBTiles archive.
+
+    The format follows the extension of ``path`` (``TILE_FORMATS``). A PMTiles
+    archive can be served by any static server that supports HTTP range
+    requests; clients only fetch the tiles in view.
+
+    Returns:
+        Dict with ``path``, ``tiles``, ``contents`` and ``bytes``.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext not in TILE_FORMATS:
+        raise ValueError(f"vector tile archive must end in one of {TILE_FORMATS}, got {path!r}")
+    bounds = [float(v) for v in pd.concat([layer['gdf'].geometry.bounds for layer in layers.values()])
+              .agg({'minx': 'min', 'miny': 'min', 'maxx': 'max', 'maxy': 'max'})]
+    metadata = {
+        'name': PAGE_TITLE,
+        'bounds': bounds,
+        'minzoom': min(layer['min_zoom'] for layer in layers.values()),
+        'maxzoom': max(layer['max_zoom'] for layer in layers.values()),
+        'vector_layers': [
+            {'id': name, 'minzoom': layer['min_zoom'], 'maxzoom': layer['max_zoom'],
+             'fields': {key: 'String' if layer['gdf'][col].dtype == object else 'Number'
+                        for col, key in layer['properties'].items()}}
+            for name, layer in layers.items()
+        ],
+    }
+    writer = write_pmtiles if ext == '.pmtiles' else write_mbtiles
+    result = writer(path, iter_vector_tiles(layers), metadata)
+    print(f"✓ Vector tiles written to {path}: {result['tiles']:,} tiles "
+          f"({result['contents']:,} unique), {result['bytes']:,} bytes")
+    return dict(result, path=path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_stats_schema(path=STATS_SCHEMA_PATH):
+    """
+    Read and validate the statistics schema (cached per path).
+
+    The schema names the row ``key`` and ``period`` columns and lists every
+    statistics column with its ``dtype`` (``int64``, ``float64`` or
+    ``string``), a short ``label``, a ``description`` and its camelCase
+    ``webapp`` field. Columns
+    flagged ``summary`` are bundled in the webapp index, ``subarea`` ones vary
+    below the state level, and ``average`` ones get a US average under that name.
+    """
+    with open(path) as f:
+        schema = json.load(f)
+    if schema.get('version') != STATS_SCHEMA_VERSION:
+        raise ValueError(f"{path}: schema version {schema.get('version')!r} is not supported "
+                         f"(expected {STATS_SCHEMA_VERSION})")
+    unknown = {name: col.get('dtype') for name, col in schema['columns'].items()
+               if col.get('dtype') not in SCHEMA_DTYPES}
+    if unknown:
+        raise ValueError(f"{path}: unsupported dtype(s) {unknown}; choose from {', '.join(SCHEMA_DTYPES)}")
+    return schema
+
+
+def stat_dtypes(schema=None):
+    """pandas dtype of every statistics column, in schema order."""
+    schema = schema or load_stats_schema()
+    return {name: SCHEMA_DTYPES[col['dtype']] for name, col in schema['columns'].items()}
+
+
+def subarea_stat_columns(schema=None):
+    """Statistics columns that vary below the state level (the rest are inherited from the state)."""
+    schema = schema or load_stats_schema()
+    return [name for name, col in schema['columns'].items() if col.get('subarea')]
+
+
+def color_metrics(schema=None):
+    """Numeric statistics columns a map can be colored by, with their labels."""
+    schema = schema or load_stats_schema()
+    return {name: col.get('label', name) for name, col in schema['columns'].items()
+            if col['dtype'] != 'string'}
+
+
+def _dataset_columns(dataset):
+    """Column names of a statistics CSV/Parquet file, without reading its rows."""
+    if str(dataset).endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(dataset).schema_arrow.names
+    return list(pd.read_csv(dataset, nrows=0).columns)
+
+
+def load_statistics(dataset=STATS_DATASET_PATH, schema=None, store_dir=None):
+    """
+    Load the statistics dataset as a typed DataFrame.
+
+    A Parquet dataset is memory-mapped and converted column by column. A CSV
+    is parsed once per content fingerprint with pyarrow's typed reader and
+    cached as Parquet in the geometry store, so later loads take the same
+    columnar path; without pyarrow it is read with pandas.
+
+    Args:
+        dataset: ``.csv`` or ``.parquet`` file with the schema's key, period
+            and statistics columns (extra columns are ignored).
+        schema: Parsed schema (defaults to ``load_stats_schema()``).
+        store_dir: Override for the Parquet cache directory.
+
+    Returns:
+        DataFrame with the key, period and statistics columns, one row per
+        key and period.
+    """
+    schema = schema or load_stats_schema()
+    key, period = schema['key'], schema['period']
+    dtypes = {key: 'object', period: 'int64', **stat_dtypes(schema)}
+    missing = [col for col in dtypes if col not in _dataset_columns(dataset)]
+    if missing:
+        raise ValueError(f"{dataset} is missing column(s) {', '.join(missing)}")
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+    if pa is None:
+        frame = pd.read_csv(dataset, usecols=list(dtypes), dtype={col: 'object' for col in dtypes})
+    else:
+        table_path = dataset
+        if not str(dataset).endswith('.parquet'):
+            digest = hashlib.sha256(json.dumps(schema, sort_keys=True).encode('utf-8'))
+            digest.update(sha256_file(dataset).encode('ascii'))
+            table_path = geometry_store_path(digest.hexdigest(), store_dir, prefix='statistics')
+            if not os.path.exists(table_path):
+                arrow_types = {'int64': pa.int64(), 'float64': pa.float64(), 'object': pa.string()}
+                table = pa_csv.read_csv(dataset, convert_options=pa_csv.ConvertOptions(
+                    include_columns=list(dtypes),
+                    column_types={col: arrow_types[dtype] for col, dtype in dtypes.items()},
+                ))
+                Path(os.path.dirname(table_path)).mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(table_path), suffix=".parquet.tmp")
+                os.close(fd)
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, table_path)
+        table = pq.read_table(table_path, columns=list(dtypes), memory_map=True)
+        frame = table.to_pandas(split_blocks=True, self_destruct=True)
+
+    incomplete = [col for col, dtype in dtypes.items() if dtype != 'object' and frame[col].isna().any()]
+    if incomplete:
+        raise ValueError(f"{dataset} has empty values in {', '.join(incomplete)}")
+    if frame.duplicated([key, period]).any():
+        raise ValueError(f"{dataset} has duplicate {key}/{period} rows")
+    return frame.astype(dtypes)
+
+
+def get_state_statistics_frame(year=None, dataset=STATS_DATASET_PATH):
+    """
+    Return one year of state statistics as a typed DataFrame keyed by ``STUSPS``.
+
+    Args:
+        year: Period to select (defaults to the latest in the dataset).
+        dataset: Statistics CSV/Parquet file (see ``load_statistics``).
+    """
+    schema = load_stats_schema()
+    frame = load_statistics(dataset, schema)
+    period = schema['period']
+    year = frame[period].max() if year is None else year
+    frame = frame[frame[period] == year]
+    if frame.empty:
+        raise ValueError(f"{dataset} has no rows for {period} {year}")
+    return frame.drop(columns=period).reset_index(drop=True)
+
+
+def statistics_averages(stats_df, schema=None):
+    """US averages (mean over the states, one decimal) of the schema's ``average`` columns."""
+    schema = schema or load_stats_schema()
+    return {col['average']: round(float(stats_df[name].mean()), 1)
+            for name, col in schema['columns'].items() if col.get('average')}
+
+
+def load_state_statistics(path, stats_df=None):
+    """
+    Overlay state statistics from a CSV keyed by ``STUSPS`` on ``stats_df``.
+
+    Statistics columns present in the file (e.g. the rates written by
+    ``ingest_incidents``) replace the built-in values for the states it
+    lists; empty cells, other columns and other states keep their value.
+    """
+    stats_df = get_state_statistics_frame() if stats_df is None else stats_df
+    frame = pd.read_csv(path, dtype={'STUSPS': str})
+    if 'STUSPS' not in frame.columns:
+        raise ValueError(f"{path} has no STUSPS column")
+    dtypes = stat_dtypes()
+    columns = [col for col in dtypes if col in frame.columns]
+    merged = stats_df.set_index('STUSPS')
+    merged.update(frame.set_index('STUSPS')[columns])
+    return merged.astype(dtypes).reset_index()
+
+
+def join_statistics(gdf, stats_df, key='STUSPS'):
+    """Attach every statistics column to ``gdf`` in a single vectorized merge on ``key``."""
+    return gdf.merge(stats_df, on=key, how='left', validate='one_to_one')
+
+
+def state_records(gdf, key='STUSPS', name_column='NAME'):
+    """
+    Serialize the joined frame into the per-state panel records.
+
+    Uses a columnar ``to_dict('records')`` pass (values come back as native
+    Python types) instead of casting row by row.
+
+    Returns:
+        Dict of ``key`` value -> record with ``name``, ``abbr`` and the
+        statistics columns.
+    """
+    records = gdf[[name_column, key, *stat_dtypes()]].rename(columns={name_column: 'name', key: 'abbr'})
+    return dict(zip(records['abbr'], records.to_dict('records')))
+
+
+def _mercator_y(lat):
+    """Web Mercator y in world units (0 at the top, 1 at the bottom)."""
+    lat = np.radians(np.clip(lat, -TILE_MAX_LATITUDE, TILE_MAX_LATITUDE))
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+
+
+def compute_views(gdf, key='STUSPS', viewport=VIEWPORT_SIZE, padding=VIEW_PADDING,
+                  zoom_range=VIEW_ZOOM_RANGE):
+    """
+    Compute the fit-to-viewport camera of every row in one vectorized pass.
+
+    Bounding boxes come from ``gdf.geometry.bounds``; an area crossing the
+    antimeridian (Alaska's Aleutians) is measured with longitudes in
+    [0, 360) instead, so its box is not the whole globe. The center is the
+    middle of the box in Web Mercator, and the zoom is the largest one at
+    which the box fills at most ``padding`` of ``viewport``.
+
+    Returns:
+        DataFrame indexed by ``key`` with ``lon``, ``lat``, ``zoom`` and the
+        ``west``/``south``/``east``/``north`` bounds.
+    """
+    geoms = gdf.geometry.values
+    bounds = gdf.geometry.bounds.to_numpy()
+    shifted = shapely.bounds(shapely.transform(
+        geoms, lambda coords: np.column_stack([coords[:, 0] % 360.0, coords[:, 1]])
+    ))
+    wraps = (shifted[:, 2] - shifted[:, 0]) < (bounds[:, 2] - bounds[:, 0])
+    bounds[wraps] = shifted[wraps]
+    west, south, east, north = bounds.T
+
+    top, bottom = _mercator_y(north), _mercator_y(south)
+    width = np.maximum((east - west) / 360.0, 1e-9)
+    height = np.maximum(bottom - top, 1e-9)
+    zoom = np.log2(np.minimum(viewport[0] * padding / (512 * width),
+                              viewport[1] * padding / (512 * height)))
+    center_y = (top + bottom) / 2.0
+    views = pd.DataFrame({
+        'lon': ((west + east) / 2.0 + 180.0) % 360.0 - 180.0,
+        'lat': np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * center_y)))),
+        'zoom': np.clip(zoom, *zoom_range),
+        'west': west, 'south': south, 'east': east, 'north': north,
+    }, index=pd.Index(gdf[key], name=key))
+    return views
+
+
+def views_payload(views, fields=VIEW_FIELDS):
+    """
+    Serialize ``compute_views`` output as a compact numeric array.
+
+    Returns:
+        ``{'keys': [...], 'fields': [...], 'values': [...]}`` where ``values``
+        holds ``len(fields)`` numbers per key, in ``keys`` order.
+    """
+    values = views[list(fields)].round({'lon': 4, 'lat': 4, 'zoom': 2})
+    return {
+        'keys': list(views.index),
+        'fields': list(fields),
+        'values': values.to_numpy().ravel().tolist(),
+    }
+
+
+def write_webapp_views(gdf, output_path=WEBAPP_VIEWS_PATH):
+    """Write the per-state fly-to cameras used by the Next.js webapp."""
+    Path(os.path.dirname(output_path) or ".").mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(views_payload(compute_views(gdf)), f, separators=(',', ':'))
+    print(f"✓ Webapp state views written to {output_path} ({os.path.getsize(output_path):,} bytes)")
+    return output_path
+
+
+def _ts_literal(value):
+    """Render a scalar as a TypeScript literal in the webapp's style (single quotes)."""
+    if isinstance(value, str):
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+    return json.dumps(value)
+
+
+def write_webapp_data(gdf, stats_df, ts_path=WEBAPP_STATS_TS_PATH, records_dir=WEBAPP_STATES_DIR,
+                      dataset=STATS_DATASET_PATH, year=None):
+    """
+    Generate the webapp's statistics module and per-state records from the dataset.
+
+    ``ts_path`` gets the ``StateSummary``/``StateData`` types (field names and
+    types from the schema), ``US_AVERAGES`` (same values as the page's
+    ``usAverages``) and the ``STATES_INDEX`` of summary columns;
+    ``records_dir`` gets one ``<ABBR>.json`` per state fetched on click.
+
+    Args:
+        gdf: State geometry frame (for ``NAME``).
+        stats_df: ``get_state_statistics_frame`` output for the chosen year.
+        dataset: Statistics file, fingerprinted in the generated header.
+        year: Year of ``stats_df`` (defaults to the dataset's latest).
+    """
+    schema = load_stats_schema()
+    columns = schema['columns']
+    ts_types = {'int64': 'number', 'float64': 'number', 'string': 'string'}
+    summary = [name for name, col in columns.items() if col.get('summary')]
+    detail = [name for name in columns if name not in summary]
+
+    frame = gdf[['STUSPS', 'NAME']].merge(stats_df, on='STUSPS', how='inner', validate='one_to_one')
+    frame = frame.sort_values('STUSPS').rename(columns={'STUSPS': 'abbr', 'NAME': 'name'})
+    frame = frame.rename(columns={name: col['webapp'] for name, col in columns.items()})
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+    Path(records_dir).mkdir(parents=True, exist_ok=True)
+    for record in records:
+        with open(os.path.join(records_dir, f"{record['abbr']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+    def fields(names):
+        return ''.join(f"  {columns[name]['webapp']}: {ts_types[columns[name]['dtype']]}\n" for name in names)
+
+    summary_fields = ['abbr', 'name', *(columns[name]['webapp'] for name in summary)]
+    index = ',\n'.join(
+        f"  {record['abbr']}: {{\n" + ',\n'.join(f"    {field}: {_ts_literal(record[field])}"
+                                                 for field in summary_fields) + "\n  }"
+        for record in records
+    )
+    averages = ',\n'.join(f"  {name}: {_ts_literal(value)}"
+                          for name, value in statistics_averages(stats_df, schema).items())
+    if year is None:
+        year = int(load_statistics(dataset, schema)[schema['period']].max())
+    source = os.path.relpath(dataset, os.path.dirname(STATS_DIR))
+    module = (
+        f"// Generated by `python main.py --webapp-data` from {source} (sha256\n"
+        f"// {sha256_file(dataset)[:16]}). Do not edit: change the dataset and regenerate.\n"
+        "// Per-state records are written alongside to public/states/<ABBR>.json.\n"
+        "\n"
+        f"export interface StateSummary {{\n  abbr: string\n  name: string\n{fields(summary)}}}\n"
+        "\n"
+        f"export interface StateData extends StateSummary {{\n{fields(detail)}}}\n"
+        "\n"
+        f"export const STATS_YEAR = {year}\n"
+        "\n"
+        f"export const US_AVERAGES = {{\n{averages}\n}}\n"
+        "\n"
+        f"export const STATES_INDEX: Record<string, StateSummary> = {{\n{index}\n}}\n"
+    )
+    Path(os.path.dirname(ts_path) or ".").mkdir(parents=True, exist_ok=True)
+    with open(ts_path, 'w', encoding='utf-8') as f:
+        f.write(module)
+    print(f"✓ Webapp statistics written to {ts_path} and {len(records)} records to {records_dir}")
+    return ts_path
+
+
+# Page template pieces shared by the single-file and split-asset outputs.
+# Kept as plain strings (not f-strings) so CSS/JS braces need no escaping.
+PLOTLY_JS_URL = "https://cdn.plot.ly/plotly-2.27.0.min.js"
+PAGE_TITLE = "US Law Severity & Crime Statistics Map"
+
+PAGE_CSS = """
+body {
+    margin: 0;
+    padding: 0;
+    font-family: Arial, sans-serif;
+    background-color: #f8f9fa;
+    overflow: hidden;
+}
+#myDiv {
+    width: 100%;
+    height: 100vh;
+}
+#statsPanel {
+    position: fixed;
+    top: 50%;
+    right: 20px;
+    transform: translateY(-50%);
+    width: 380px;
+    max-height: 80vh;
+    overflow-y: auto;
+    background: white;
+    border: 3px solid #e74c3c;
+    border-radius: 12px;
+    padding: 25px;
+    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+    font-family: 'Courier New', monospace;
+    font-size: 13px;
+    line-height: 1.6;
+    display: none;
+    z-index: 1000;
+    color: #2c3e50;
+}
+#statsPanel.visible {
+    display: block;
+    animation: slideIn 0.3s ease-out;
+}
+@keyframes slideIn {
+    from {
+        opacity: 0;
+        transform: translateY(-50%) translateX(50px);
+    }
+    to {
+        opacity: 1;
+        transform: translateY(-50%) translateX(0);
+    }
+}
+#statsPanel h2 {
+    margin: 0 0 15px 0;
+    padding-bottom: 10px;
+    border-bottom: 2px solid #e74c3c;
+    color: #e74c3c;
+    font-size: 18px;
+}
+#statsPanel .section {
+    margin: 15px 0;
+    padding: 12px;
+    background: #f8f9fa;
+    border-radius: 6px;
+}
+#statsPanel .section-title {
+    font-weight: bold;
+    font-size: 14px;
+    color: #2c3e50;
+    margin-bottom: 8px;
+    display: block;
+}
+#statsPanel .stat-row {
+    margin: 5px 0;
+}
+#statsPanel .stat-label {
+    font-weight: bold;
+    color: #34495e;
+}
+#statsPanel .stat-value {
+    color: #2c3e50;
+}
+#statsPanel .us-avg {
+    color: #7f8c8d;
+    font-size: 11px;
+    font-style: italic;
+    margin-left: 10px;
+}
+#statsPanel .notes {
+    background: #fff3cd;
+    padding: 10px;
+    border-radius: 6px;
+    border-left: 4px solid #ffc107;
+    margin-top: 10px;
+    font-size: 12px;
+}
+#closePanel {
+    position: absolute;
+    top: 15px;
+    right: 15px;
+    background: #e74c3c;
+    color: white;
+    border: none;
+    border-radius: 50%;
+    width: 30px;
+    height: 30px;
+    cursor: pointer;
+    font-size: 18px;
+    line-height: 1;
+    font-weight: bold;
+}
+#closePanel:hover {
+    background: #c0392b;
+}
+#yearControl {
+    position: fixed;
+    bottom: 20px;
+    left: 50%;
+    transform: translateX(-50%);
+    display: none;
+    align-items: center;
+    gap: 12px;
+    padding: 10px 18px;
+    background: rgba(255, 255, 255, 0.95);
+    border: 2px solid #2c3e50;
+    border-radius: 8px;
+    z-index: 1000;
+}
+#yearControl.visible {
+    display: flex;
+}
+#yearSlider {
+    width: 360px;
+}
+#yearLabel {
+    font-weight: bold;
+    font-size: 16px;
+    color: #2c3e50;
+    min-width: 3em;
+}
+"""
+
+PAGE_BODY = """
+<div id="myDiv"></div>
+<div id="statsPanel">
+    <button id="closePanel" onclick="closeStatsPanel()">×</button>
+    <div id="panelContent"></div>
+</div>
+<div id="yearControl">
+    <input type="range" id="yearSlider" step="1">
+    <span id="yearLabel"></span>
+</div>
+"""
+
+APP_JS = """
+// Build the map from the figure JSON, its geometry (TopoJSON, GeoJSON, or the
+// binary encoding as an ArrayBuffer or base64 string) and the per-state
+// statistics shown in the click panel. ``assets`` (split output only) points
+// at the lazily fetched per-state records and detail geometry.
+function initMap(plotData, geometry, stats, assets) {
+    const stateData = stats.stateData || {};
+    const usAverages = stats.usAverages;
+    let data = plotData.data;
+    const layout = plotData.layout;
+    if (geometry) {
+        data[0].geojson = typeof geometry === 'string' || geometry instanceof ArrayBuffer
+            ? binaryFeatures(geometry)
+            : geometry.type === 'Topology' ? topojsonFeatures(geometry, 'states') : geometry;
+    }
+    const config = {
+        scrollZoom: true,
+        displayModeBar: true,
+        displaylogo: false,
+        responsive: true
+    };
+
+    // Create the plot
+    Plotly.newPlot('myDiv', data, layout, config);
+
+    // Get the plot div
+    var myDiv = document.getElementById('myDiv');
+    var statsPanel = document.getElementById('statsPanel');
+    var panelContent = document.getElementById('panelContent');
+
+    // Level-of-detail geometry: a higher-resolution shard of the selected
+    // state is fetched once the map is zoomed in far enough
+    const detailLevels = (assets && assets.detail) || [];
+    const baseFeatures = data[0].geojson ? data[0].geojson.features : [];
+    const detailCache = {};
+    let selectedAbbr = null;
+    let appliedDetail = null;
+
+    function setDetailGeometry(abbr, detailGeometry) {
+        const features = baseFeatures.map(function(f) {
+            if (!abbr || f.properties.STUSPS !== abbr) {
+                return f;
+            }
+            return {type: 'Feature', id: f.id, properties: f.properties, geometry: detailGeometry};
+        });
+        // New trace object so Plotly.react notices the geometry change
+        data = [Object.assign({}, data[0], {geojson: {type: 'FeatureCollection', features: features}}),
+                ...data.slice(1)];
+    }
+
+    function loadDetail(abbr, zoom) {
+        let level = null;
+        detailLevels.forEach(function(l) {
+            if (zoom >= l.minZoom) {
+                level = l;
+            }
+        });
+        if (!level) {
+            return;
+        }
+        const url = level.base + abbr + '.json';
+        if (appliedDetail === url) {
+            return;
+        }
+        if (!detailCache[url]) {
+            detailCache[url] = fetch(url)
+                .then(function(response) { return response.json(); })
+                .then(function(topo) { return topojsonFeatures(topo, 'states').features[0].geometry; });
+        }
+        detailCache[url].then(function(detailGeometry) {
+            if (selectedAbbr !== abbr) {
+                return;
+            }
+            appliedDetail = url;
+            setDetailGeometry(abbr, detailGeometry);
+            Plotly.react('myDiv', data, myDiv.layout, config);
+        }).catch(function() {
+            delete detailCache[url];
+        });
+    }
+
+    function clearDetail() {
+        selectedAbbr = null;
+        if (appliedDetail) {
+            appliedDetail = null;
+            setDetailGeometry(null, null);
+        }
+    }
+
+    // County/tract drill-down: the selected state's areas are drawn as a
+    // second trace from one shard; the most recently used shards are kept
+    const sublevel = assets && assets.sublevel;
+    const subareaCache = new Map();
+    const SUBAREA_CACHE_SIZE = 8;
+    let subareaRecords = {};
+
+    function getSubareas(abbr) {
+        let shard = subareaCache.get(abbr);
+        if (shard) {
+            subareaCache.delete(abbr);
+        } else {
+            shard = fetch(sublevel.base + abbr + '.json')
+                .then(function(response) { return response.json(); })
+                .catch(function() {
+                    subareaCache.delete(abbr);
+                    return null;
+                });
+        }
+        subareaCache.set(abbr, shard);
+        if (subareaCache.size > SUBAREA_CACHE_SIZE) {
+            subareaCache.delete(subareaCache.keys().next().value);
+        }
+        return shard;
+    }
+
+    function setSubareas(shard) {
+        subareaRecords = shard ? shard.records : {};
+        data = data.slice(0, 1);
+        if (!shard) {
+            return;
+        }
+        const ids = Object.keys(shard.records);
+        data.push({
+            type: 'choroplethmapbox',
+            geojson: topojsonFeatures(shard.topology, 'areas'),
+            featureidkey: 'properties.GEOID',
+            locations: ids,
+            z: ids.map(function(id) { return shard.records[id][sublevel.column]; }),
+            zmin: sublevel.zmin,
+            zmax: sublevel.zmax,
+            colorscale: data[0].colorscale,
+            showscale: false,
+            text: ids.map(function(id) { return '<b>' + shard.records[id].name + '</b>'; }),
+            hovertemplate: '%{text}<extra></extra>',
+            marker: {opacity: 0.85, line: {width: 0.5, color: 'white'}}
+        });
+    }
+
+    function loadSubareas(abbr) {
+        if (!sublevel) {
+            return;
+        }
+        getSubareas(abbr).then(function(shard) {
+            if (shard && selectedAbbr === abbr) {
+                setSubareas(shard);
+                Plotly.react('myDiv', data, myDiv.layout, config);
+            }
+        });
+    }
+
+    myDiv.on('plotly_relayout', function(update) {
+        const zoom = update['mapbox.zoom'];
+        if (selectedAbbr && zoom !== undefined) {
+            loadDetail(selectedAbbr, zoom);
+        }
+    });
+
+    // Click-to-zoom camera per state, fitted to its geometry by main.py and
+    // shipped as a flat numeric array (``views.fields`` values per key)
+    const stateCenters = {};
+    const views = stats.views || {keys: [], fields: [], values: []};
+    const stride = views.fields.length;
+    views.keys.forEach(function(abbr, i) {
+        const view = {};
+        views.fields.forEach(function(field, j) {
+            view[field] = views.values[i * stride + j];
+        });
+        stateCenters[abbr] = view;
+    });
+
+    // County/tract records may lack rates; show "n/a" instead of failing
+    function formatRate(value) {
+        return value === null || value === undefined ? 'n/a' : value.toFixed(1);
+    }
+
+    function formatCount(value, suffix) {
+        return value === null || value === undefined ? 'n/a' : value.toLocaleString() + (suffix || '');
+    }
+
+    function renderStatsPanel(state) {
+        // Create detailed statistics panel HTML
+        const panelHTML = `
+            <h2>📍 ${state.name} (${state.abbr})${state.year ? ' · ' + state.year : ''}</h2>
+
+            <div class="section">
+                <span class="section-title">⚖️ LAW SEVERITY</span>
+                <div class="stat-row">
+                    <span class="stat-label">Severity Score:</span>
+                    <span class="stat-value">${state.severity}/100 (${state.category})</span>
+                </div>
+                <div class="stat-row">
+                    <span class="stat-label">Death Penalty:</span>
+                    <span class="stat-value">${state.death_penalty}</span>
+                </div>
+            </div>
+
+            <div class="section">
+                <span class="section-title">📊 CRIME STATISTICS (per 100k)</span>
+                <div class="stat-row">
+                    <span class="stat-label">Murder Rate:</span>
+                    <span class="stat-value">${formatRate(state.murder_rate)}</span>
+                    <span class="us-avg">(US avg: ${usAverages.murder})</span>
+                </div>
+                <div class="stat-row">
+                    <span class="stat-label">Gun Deaths:</span>
+                    <span class="stat-value">${formatRate(state.gun_death_rate)}</span>
+                    <span class="us-avg">(US avg: ${usAverages.gun})</span>
+                </div>
+                <div class="stat-row">
+                    <span class="stat-label">Traffic Deaths:</span>
+                    <span class="stat-value">${formatRate(state.traffic_fatality_rate)}</span>
+                    <span class="us-avg">(US avg: ${usAverages.traffic})</span>
+                </div>
+            </div>
+
+            <div class="section">
+                <span class="section-title">📈 POPULATION & INCARCERATION</span>
+                <div class="stat-row">
+                    <span class="stat-label">Population:</span>
+                    <span class="stat-value">${formatCount(state.population)}</span>
+                </div>
+                <div class="stat-row">
+                    <span class="stat-label">Incarceration Rate:</span>
+                    <span class="stat-value">${formatCount(state.incarceration_rate, '/100k')}</span>
+                </div>
+            </div>
+
+            <div class="notes">
+                <strong>📝 Note:</strong> ${state.notes}
+            </div>
+
+            <div style="margin-top: 15px; text-align: center; color: #7f8c8d; font-size: 11px;">
+                <em>Double-click map to reset view</em>
+            </div>
+        `;
+
+        // Update panel content and show it
+        panelContent.innerHTML = panelHTML;
+        statsPanel.classList.add('visible');
+    }
+
+    // Per-state panel records: inline in the single-file page, fetched once
+    // and cached in the split output
+    const stateRecordCache = {};
+    function getStateRecord(abbr) {
+        if (stateData[abbr]) {
+            return Promise.resolve(stateData[abbr]);
+        }
+        if (!assets || !assets.states) {
+            return Promise.resolve(null);
+        }
+        if (!stateRecordCache[abbr]) {
+            stateRecordCache[abbr] = fetch(assets.states + abbr + '.json')
+                .then(function(response) { return response.json(); })
+                .catch(function() {
+                    delete stateRecordCache[abbr];
+                    return null;
+                });
+        }
+        return stateRecordCache[abbr];
+    }
+
+    // Time series: one frame per year under ``timeSeries.base``. Keyframes
+    // hold every state's z value and panel fields, the other years only what
+    // changed since the previous year, so a year is rebuilt from the nearest
+    // keyframe (or already rebuilt year) before it; frames are fetched as the
+    // slider reaches them
+    const timeSeries = assets && assets.timeSeries;
+    const frameCache = {};
+    const yearStates = {};
+    let selectedYear = null;
+    let yearRecords = null;
+
+    function getFrame(year) {
+        if (!frameCache[year]) {
+            frameCache[year] = fetch(timeSeries.base + year + '.json')
+                .then(function(response) { return response.json(); });
+            frameCache[year].catch(function() { delete frameCache[year]; });
+        }
+        return frameCache[year];
+    }
+
+    function getYearState(year) {
+        if (yearStates[year]) {
+            return yearStates[year];
+        }
+        const end = timeSeries.years.indexOf(year);
+        let start = end;
+        while (timeSeries.keyframes.indexOf(timeSeries.years[start]) < 0 &&
+               !yearStates[timeSeries.years[start - 1]]) {
+            start--;
+        }
+        const base = timeSeries.keyframes.indexOf(timeSeries.years[start]) < 0
+            ? yearStates[timeSeries.years[start - 1]] : Promise.resolve(null);
+        const chain = timeSeries.years.slice(start, end + 1).map(getFrame);
+        yearStates[year] = Promise.all([base, ...chain]).then(function(frames) {
+            const state = frames[0] ? {z: frames[0].z.slice(), records: Object.assign({}, frames[0].records)}
+                                    : {z: [], records: {}};
+            frames.slice(1).forEach(function(frame) {
+                if (!frame.zIndex) {
+                    state.z = frame.z.slice();
+                    state.records = Object.assign({}, frame.records);
+                    return;
+                }
+                frame.zIndex.forEach(function(index, i) { state.z[index] = frame.z[i]; });
+                Object.keys(frame.records).forEach(function(abbr) {
+                    state.records[abbr] = Object.assign({}, state.records[abbr], frame.records[abbr]);
+                });
+            });
+            return state;
+        });
+        yearStates[year].catch(function() { delete yearStates[year]; });
+        return yearStates[year];
+    }
+
+    // The selected year's panel fields over the state's (current year) record
+    function withYear(abbr, record) {
+        if (!record || !yearRecords) {
+            return record;
+        }
+        return Object.assign({}, record, yearRecords[abbr], {year: selectedYear});
+    }
+
+    function showYear(year) {
+        selectedYear = year;
+        document.getElementById('yearLabel').textContent = year;
+        getYearState(year).then(function(state) {
+            if (selectedYear !== year) {
+                return;
+            }
+            yearRecords = state.records;
+            data = [Object.assign({}, data[0], {z: state.z}), ...data.slice(1)];
+            Plotly.react('myDiv', data, myDiv.layout, config);
+            const abbr = selectedAbbr;
+            if (abbr && statsPanel.classList.contains('visible')) {
+                getStateRecord(abbr).then(function(record) {
+                    if (record && selectedAbbr === abbr && selectedYear === year) {
+                        renderStatsPanel(withYear(abbr, record));
+                    }
+                });
+            }
+        }).catch(function() {});
+    }
+
+    if (timeSeries) {
+        const slider = document.getElementById('yearSlider');
+        slider.min = timeSeries.years[0];
+        slider.max = timeSeries.years[timeSeries.years.length - 1];
+        slider.value = timeSeries.current;
+        document.getElementById('yearLabel').textContent = timeSeries.current;
+        document.getElementById('yearControl').classList.add('visible');
+        slider.addEventListener('input', function() {
+            const year = parseInt(slider.value, 10);
+            if (timeSeries.years.indexOf(year) >= 0 && year !== selectedYear) {
+                showYear(year);
+            }
+        });
+        selectedYear = timeSeries.current;
+    }
+
+    // Add click event handler
+    myDiv.on('plotly_click', function(eventData) {
+        if (eventData.points && eventData.points.length > 0) {
+            const point = eventData.points[0];
+            if (point.curveNumber === 1) {
+                // Click on a county/tract of the selected state
+                const record = subareaRecords[point.location];
+                if (record) {
+                    renderStatsPanel(record);
+                }
+                return;
+            }
+            const stateAbbr = point.location;
+            const center = stateCenters[stateAbbr];
+
+            if (center) {
+                // Zoom to state with proper centering
+                const newLayout = {
+                    ...layout,
+                    mapbox: {
+                        ...layout.mapbox,
+                        center: {lat: center.lat, lon: center.lon},
+                        zoom: center.zoom
+                    }
+                };
+
+                clearDetail();
+                setSubareas(null);
+                Plotly.react('myDiv', data, newLayout, config);
+                selectedAbbr = stateAbbr;
+                loadDetail(stateAbbr, center.zoom);
+                loadSubareas(stateAbbr);
+
+                getStateRecord(stateAbbr).then(function(state) {
+                    // Ignore a late response for a state that is no longer selected
+                    if (state && selectedAbbr === stateAbbr) {
+                        renderStatsPanel(withYear(stateAbbr, state));
+                    }
+                });
+            }
+        }
+    });
+
+    // Handle double-click to reset
+    myDiv.on('plotly_doubleclick', function() {
+        // Reset zoom (back to the national geometry)
+        clearDetail();
+        setSubareas(null);
+        const resetLayout = {
+            ...layout,
+            mapbox: {
+                ...layout.mapbox,
+                center: {"lat": 37.0902, "lon": -95.7129},
+                zoom: 3
+            }
+        };
+        Plotly.react('myDiv', data, resetLayout, config);
+
+        // Hide stats panel
+        closeStatsPanel();
+    });
+}
+
+function closeStatsPanel() {
+    document.getElementById('statsPanel').classList.remove('visible');
+}
+"""
+
+# Split output: the app fetches its data once the shell has loaded
+SPLIT_BOOTSTRAP_JS = """
+(function() {
+    const assets = window.MAP_ASSETS;
+    function load(url) {
+        return fetch(url).then(function(response) {
+            return url.endsWith('.bin') ? response.arrayBuffer() : response.json();
+        });
+    }
+    Promise.all([load(assets.stats), load(assets.geometry)]).then(function(results) {
+        initMap(results[0].figure, results[1], results[0], assets);
+    });
+})();
+"""
+
+
+def dumps_json(value):
+    """Compact JSON as UTF-8 bytes, serialized by orjson when installed (numpy values included)."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def json_object(fields, raw=None):
+    """
+    Serialize ``fields`` as a JSON object, splicing in already serialized values.
+
+    ``raw`` maps names to JSON bytes (e.g. the figure JSON) that are inserted
+    as they are instead of being parsed back into Python objects first.
+    """
+    parts = [dumps_json(name) + b':' + value for name, value in (raw or {}).items()]
+    parts.extend(dumps_json(name) + b':' + dumps_json(value) for name, value in fields.items())
+    return b'{' + b','.join(parts) + b'}'
+
+
+def geometry_payload(gdf, geometry_format='topojson', precision=COORD_PRECISION, key='STUSPS',
+                     encoding='int32'):
+    """
+    Serialize the geometry the page attaches to its trace, as bytes.
+
+    TopoJSON comes from ``gdf_to_topojson``. GeoJSON features are assembled
+    around ``shapely.to_geojson`` strings (one vectorized GEOS call), with
+    no per-feature Python dicts. ``'binary'`` returns the
+    ``encode_binary_geometry`` typed arrays (with ``encoding`` coordinates)
+    rather than JSON.
+    """
+    if geometry_format == 'topojson':
+        return dumps_json(gdf_to_topojson(gdf, precision=precision))
+    if geometry_format == 'binary':
+        return encode_binary_geometry(gdf, encoding, precision, key)
+    geometries = shapely.to_geojson(np.asarray(gdf.geometry))
+    features = ','.join(
+        f'{{"id":"{index}","type":"Feature","properties":{{"{key}":{json.dumps(value)}}},'
+        f'"geometry":{geometry}}}'
+        for index, value, geometry in zip(gdf.index, gdf[key], geometries)
+    )
+    return f'{{"type":"FeatureCollection","features":[{features}]}}'.encode('utf-8')
+
+
+def write_inline_html(path, figure_json, geometry_json, stats_json):
+    """
+    Stream the standalone single-file page, with every payload inlined, to ``path``.
+
+    The payloads are JSON bytes written to the file as they are, so the page
+    is never assembled as one string in memory.
+    """
+    head = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{PAGE_TITLE}</title>
+    <script src="{PLOTLY_JS_URL}"></script>
+    <style>{PAGE_CSS}</style>
+</head>
+<body>{PAGE_BODY}
+    <script>{TOPOJSON_DECODER_JS}{BINARY_GEOMETRY_DECODER_JS}{APP_JS}
+initMap("""
+    with open(path, 'wb') as f:
+        f.write(head.encode('utf-8'))
+        f.write(figure_json)
+        f.write(b', ')
+        f.write(geometry_json)
+        f.write(b', ')
+        f.write(stats_json)
+        f.write(b""");
+    </script>
+</body>
+</html>
+""")
+
+
+def content_hash(data):
+    """Short SHA-256 content hash used in asset file names."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def precompress_file(path, rel_path):
+    """
+    Write maximum-compression ``.gz`` and ``.br`` siblings of ``path``.
+
+    Siblings newer than the source are reused, which makes re-runs over
+    content-hashed assets free. Brotli is skipped when the module is missing.
+
+    Returns:
+        Dict of encoding -> ``{'file', 'content_encoding', 'size'}``.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    compressors = {'gzip': lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors['br'] = lambda raw: brotli.compress(raw, quality=11, mode=brotli.MODE_TEXT)
+
+    encodings = {}
+    for encoding, compress in compressors.items():
+        suffix = PRECOMPRESS_SUFFIXES[encoding]
+        target = path + suffix
+        if not (os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path)):
+            with open(target + ".tmp", 'wb') as f:
+                f.write(compress(data))
+            os.replace(target + ".tmp", target)
+        encodings[encoding] = {
+            'file': rel_path + suffix,
+            'content_encoding': encoding,
+            'size': os.path.getsize(target),
+        }
+    return encodings
+
+
+def artifact_manifest(root_dir, cache_controls, precompress=True):
+    """
+    Describe every artifact the way ``asset-manifest.json`` lists it.
+
+    Each entry (keyed by path relative to ``root_dir``) records the
+    ``Content-Type``, ``Cache-Control`` and raw size, and when ``precompress``
+    is set the precompressed siblings with the ``Content-Encoding`` to upload
+    them under.
+
+    Args:
+        root_dir: Directory the artifact paths are relative to.
+        cache_controls: Dict of relative path -> Cache-Control value.
+        precompress: Write ``.gz``/``.br`` siblings and list them.
+
+    Returns:
+        Manifest dict of relative path -> entry.
+    """
+    manifest = {}
+    for rel_path, cache_control in cache_controls.items():
+        path = os.path.join(root_dir, rel_path)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/json', 'application/javascript'):
+            content_type += '; charset=utf-8'
+        entry = {
+            'content_type': content_type,
+            'cache_control': cache_control,
+            'size': os.path.getsize(path),
+        }
+        if precompress:
+            entry['encodings'] = precompress_file(path, rel_path)
+        manifest[rel_path] = entry
+    if precompress:
+        print_size_report(manifest)
+    return manifest
+
+
+def write_manifest(root_dir, cache_controls, precompress=True, manifest_path=None):
+    """
+    Write ``asset-manifest.json`` describing every artifact for the S3 upload.
+
+    Args:
+        root_dir: Directory the artifact paths are relative to.
+        cache_controls: Dict of relative path -> Cache-Control value.
+        precompress: Write ``.gz``/``.br`` siblings and list them.
+        manifest_path: Where to write the manifest (default:
+            ``<root_dir>/asset-manifest.json``).
+
+    Returns:
+        Tuple of (manifest path, manifest dict); see ``artifact_manifest``.
+    """
+    manifest = artifact_manifest(root_dir, cache_controls, precompress)
+    manifest_path = manifest_path or os.path.join(root_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path, manifest
+
+
+def print_size_report(manifest):
+    """Print raw vs gzip vs brotli sizes for every artifact in a manifest."""
+    rows = {}
+    for rel_path, entry in manifest.items():
+        # Shard directories (detail geometry, state records) are summarised
+        if os.path.dirname(rel_path) not in ("", "assets"):
+            rel_path = os.path.dirname(rel_path) + "/*"
+        encodings = entry.get('encodings', {})
+        raw = entry['size']
+        gz = encodings.get('gzip', {}).get('size', raw)
+        br = encodings.get('br', {}).get('size', gz)
+        row = rows.setdefault(rel_path, [0, 0, 0])
+        row[0] += raw
+        row[1] += gz
+        row[2] += br
+
+    print(f"📦 {'Artifact':<44} {'raw':>10} {'gzip':>10} {'brotli':>10}")
+    for rel_path, (raw, gz, br) in rows.items():
+        print(f"   {rel_path:<44} {raw:>10,} {gz:>10,} {br:>10,}")
+    raw, gz, br = (sum(row[i] for row in rows.values()) for i in range(3))
+    print(f"   {'total':<44} {raw:>10,} {gz:>10,} {br:>10,}")
+
+
+def write_shard_dir(asset_dir, prefix, shards):
+    """
+    Write shards as ``<asset_dir>/<prefix>.<hash>/<name>.json``.
+
+    ``shards`` is a dict or an iterable of ``(name, bytes)`` pairs; an
+    iterable is consumed one shard at a time, so only the shard being written
+    is held in memory. The hash covers every shard, so the directory is
+    immutable like any other hashed asset; it is populated in a temporary
+    directory and renamed into place, or discarded if it already exists.
+
+    Returns:
+        The directory URL relative to the output root, with a trailing slash.
+    """
+    if isinstance(shards, dict):
+        shards = sorted(shards.items())
+    digest = hashlib.sha256()
+    tmp_dir = tempfile.mkdtemp(dir=asset_dir, prefix=".shards-")
+    try:
+        for name, data in shards:
+            digest.update(name.encode('utf-8'))
+            digest.update(data)
+            with open(os.path.join(tmp_dir, f"{name}.json"), 'wb') as f:
+                f.write(data)
+        rel_dir = f"{prefix}.{digest.hexdigest()[:12]}"
+        shard_dir = os.path.join(asset_dir, rel_dir)
+        if not os.path.isdir(shard_dir):
+            Path(os.path.dirname(shard_dir)).mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_dir, shard_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return f"assets/{rel_dir}/"
+
+
+def load_detail_geometry(resolution, level, force=False):
+    """Fetch a ``DETAIL_LEVELS`` resolution and simplify it at the level's tolerance (cached)."""
+    shapefile_path = download_shapefile(
+        url=SHAPEFILE_URL_TEMPLATE.format(resolution=resolution),
+        name=SHAPEFILE_NAME_TEMPLATE.format(resolution=resolution),
+        expected_sha256=None,
+    )
+    gdf, _, _ = simplified_states(shapefile_path, level['tolerance'], level['precision'], force=force)
+    return gdf
+
+
+def write_detail_shards(asset_dir, levels=DETAIL_LEVELS, geometries=None):
+    """
+    Build per-state level-of-detail geometry shards for the split output.
+
+    For each Census resolution in ``levels`` the shapefile is fetched through
+    the cache, simplified at that level's tolerance (shared borders stay
+    consistent) and written as one small TopoJSON file per state under
+    ``<asset_dir>/detail/<resolution>.<hash>/<STUSPS>.json``. The directory
+    name carries a hash of all shards in the level, so the files are immutable
+    like the other hashed assets. ``geometries`` maps resolutions to frames
+    already simplified by ``load_detail_geometry``, skipping that step.
+
+    Returns:
+        List of ``{'name', 'minZoom', 'base'}`` dicts (``base`` relative to the
+        output directory) ordered by ``min_zoom``, as consumed by the page.
+    """
+    geometries = geometries or {}
+    detail = []
+    for resolution, level in sorted(levels.items(), key=lambda item: item[1]['min_zoom']):
+        gdf = geometries.get(resolution)
+        if gdf is None:
+            gdf = load_detail_geometry(resolution, level)
+        sizes = []
+
+        def shards():
+            for i, abbr in enumerate(gdf['STUSPS']):
+                shard = dumps_json(gdf_to_topojson(gdf.iloc[[i]], precision=level['precision']))
+                sizes.append(len(shard))
+                yield abbr, shard
+
+        base = write_shard_dir(asset_dir, f"detail/{resolution}", shards())
+        print(f"✓ {resolution} detail shards: {sum(sizes):,} bytes across {len(sizes)} states")
+        detail.append({'name': resolution, 'minZoom': level['min_zoom'], 'base': base})
+    return detail
+
+
+def load_subarea_statistics(path):
+    """
+    Read optional county/tract statistics from a CSV keyed by ``GEOID``.
+
+    Only ``GEOID`` is required; whichever ``subarea_stat_columns()`` are
+    present are kept and the others are left empty (shown as "n/a" in the panel).
+    """
+    frame = pd.read_csv(path, dtype={'GEOID': str})
+    if 'GEOID' not in frame.columns:
+        raise ValueError(f"{path} has no GEOID column")
+    stat_types = stat_dtypes()
+    columns = [col for col in subarea_stat_columns() if col in frame.columns]
+    # Nullable integers, so a missing count does not turn the column into floats
+    dtypes = {col: 'Int64' if stat_types[col] == 'int64' else stat_types[col] for col in columns}
+    return frame[['GEOID', *columns]].astype(dtypes)
+
+
+def subarea_records(gdf, stats_df, subarea_stats=None):
+    """
+    Serialize county/tract panel records for one state's areas.
+
+    Law columns come from the enclosing state's row of ``stats_df``; the
+    ``subarea_stat_columns()`` come from ``subarea_stats`` and are ``None`` where
+    it has no value (or when it is not given).
+
+    Returns:
+        Dict of ``GEOID`` -> record with the same keys as ``state_records``.
+    """
+    stat_columns = list(stat_dtypes())
+    law_columns = [col for col in stat_columns if col not in subarea_stat_columns()]
+    frame = gdf[['GEOID', 'NAMELSAD', 'STUSPS']].merge(
+        stats_df[['STUSPS', *law_columns]], on='STUSPS', how='left', validate='many_to_one'
+    )
+    if subarea_stats is not None:
+        frame = frame.merge(subarea_stats, on='GEOID', how='left', validate='one_to_one')
+    frame = frame.reindex(columns=['GEOID', 'NAMELSAD', 'STUSPS', *stat_columns])
+    frame = frame.astype(object).where(frame.notna(), None)
+    records = frame.rename(columns={'NAMELSAD': 'name', 'STUSPS': 'abbr'})
+    return dict(zip(records.pop('GEOID'), records.to_dict('records')))
+
+
+def load_subareas(level, scope='us'):
+    """Fetch and load a ``SUBLEVELS`` layer for ``scope`` (``'us'`` or a state FIPS code)."""
+    name = SUBLEVEL_NAME_TEMPLATE.format(scope=scope, layer=level, resolution=SUBLEVELS[level]['resolution'])
+    shapefile_path = download_shapefile(url=SUBLEVEL_URL_TEMPLATE.format(name=name), name=name,
+                                        expected_sha256=None)
+    return load_states(shapefile_path, columns=SUBAREA_COLUMNS, prefix=level,
+                       sort_by=('STUSPS', 'GEOID'))
+
+
+def iter_subarea_groups(level, states_gdf):
+    """
+    Yield ``(STUSPS, GeoDataFrame)`` with each state's counties or tracts.
+
+    A national layer is loaded once and split by state; a ``per_state`` layer
+    is fetched and loaded one state at a time, so only that state's areas are
+    held in memory. States are yielded in ``STUSPS`` order.
+    """
+    if not SUBLEVELS[level]['per_state']:
+        yield from load_subareas(level).groupby('STUSPS', sort=True)
+        return
+    for abbr, statefp in sorted(zip(states_gdf['STUSPS'], states_gdf['STATEFP'])):
+        yield abbr, load_subareas(level, statefp)
+
+
+class GeometryLocator:
+    """
+    Batched point-in-polygon lookup over a loaded GeoDataFrame.
+
+    At construction an STRtree over the areas fills a regular grid over their
+    extent: each cell keeps the areas that intersect it, and a cell lying
+    entirely inside one area is resolved to it outright. Locating a point is
+    then integer arithmetic to find its cell, plus a vectorized
+    ``shapely.intersects_xy`` test against the prepared candidate polygons for
+    points in border cells only; no point geometries are created. A point on a
+    shared border belongs to the first matching row of ``gdf``.
+
+    Example:
+        locator = GeometryLocator(load_states(download_shapefile()))
+        codes = locator.locate(incidents['lon'], incidents['lat'])
+    """
+
+    def __init__(self, gdf, key='STUSPS', grid_size=LOCATE_GRID_SIZE):
+        self.keys = gdf[key].to_numpy(dtype=object)
+        self.geometries = shapely.make_valid(np.asarray(gdf.geometry.values))
+        shapely.prepare(self.geometries)
+        tree = shapely.STRtree(self.geometries)
+
+        xmin, ymin, xmax, ymax = shapely.total_bounds(self.geometries)
+        self.bounds = (xmin, ymin, xmax, ymax)
+        self.shape = (grid_size, max(1, int(np.ceil(grid_size * (ymax - ymin) / (xmax - xmin)))))
+        self.cell_size = ((xmax - xmin) / self.shape[0], (ymax - ymin) / self.shape[1])
+        cols, rows = np.meshgrid(np.arange(self.shape[0]), np.arange(self.shape[1]))
+        cols, rows = cols.ravel(), rows.ravel()
+        cells = shapely.box(xmin + cols * self.cell_size[0], ymin + rows * self.cell_size[1],
+                            xmin + (cols + 1) * self.cell_size[0], ymin + (rows + 1) * self.cell_size[1])
+
+        cell_idx, area_idx = tree.query(cells, predicate='intersects')
+        covered = shapely.covers(self.geometries[area_idx], cells[cell_idx])
+        n_cells = len(cells)
+        order = np.lexsort((area_idx, cell_idx))
+        cell_idx, area_idx, covered = cell_idx[order], area_idx[order], covered[order]
+        # Cells inside an area need no point test, unless a lower-indexed area
+        # also reaches into the cell (it would win the overlap or border)
+        self.cell_owner = np.full(n_cells, -1, dtype=np.int64)
+        reached, first = np.unique(cell_idx, return_index=True)
+        owned = covered[first]
+        self.cell_owner[reached[owned]] = area_idx[first[owned]]
+        border = self.cell_owner[cell_idx] < 0
+        self.candidates = area_idx[border]
+        self.offsets = np.searchsorted(cell_idx[border], np.arange(n_cells + 1))
+
+    def _locate_chunk(self, lons, lats):
+        codes = np.full(len(lons), None, dtype=object)
+        xmin, ymin, xmax, ymax = self.bounds
+        with np.errstate(invalid='ignore'):
+            cols = np.floor((lons - xmin) / self.cell_size[0])
+            rows = np.floor((lats - ymin) / self.cell_size[1])
+        inside = (cols >= 0) & (lons <= xmax) & (rows >= 0) & (lats <= ymax)
+        points = np.flatnonzero(inside)
+        # Points on the east or north edge fall in the last column or row
+        cols = np.minimum(cols[points].astype(np.int64), self.shape[0] - 1)
+        rows = np.minimum(rows[points].astype(np.int64), self.shape[1] - 1)
+        cells = rows * self.shape[0] + cols
+
+        owners = self.cell_owner[cells]
+        resolved = owners >= 0
+        codes[points[resolved]] = self.keys[owners[resolved]]
+
+        points, cells = points[~resolved], cells[~resolved]
+        starts = self.offsets[cells]
+        counts = self.offsets[cells + 1] - starts
+        point_idx = np.repeat(points, counts)
+        group_start = np.repeat(np.cumsum(counts) - counts, counts)
+        area_idx = self.candidates[np.repeat(starts, counts) + np.arange(len(point_idx)) - group_start]
+        hit = shapely.intersects_xy(self.geometries[area_idx], lons[point_idx], lats[point_idx])
+        point_idx, area_idx = point_idx[hit], area_idx[hit]
+        # Candidates are in area order, so the first hit per point wins
+        first = np.unique(point_idx, return_index=True)[1]
+        codes[point_idx[first]] = self.keys[area_idx[first]]
+        return codes
+
+    def locate(self, lons, lats, chunk_size=LOCATE_CHUNK_SIZE, workers=1):
+        """
+        Return the ``key`` of the area containing each point.
+
+        Args:
+            lons, lats: Equal-length array-likes of WGS84 coordinates.
+            chunk_size: Points processed per batch.
+            workers: Threads locating chunks concurrently (numpy and shapely
+                release the GIL in their vectorized operations).
+
+        Returns:
+            Object array of keys, ``None`` where a point is outside every area
+            (or has missing coordinates).
+        """
+        lons = np.asarray(lons, dtype='float64')
+        lats = np.asarray(lats, dtype='float64')
+        if lons.shape != lats.shape:
+            raise ValueError(f"lons and lats differ in shape: {lons.shape} != {lats.shape}")
+        chunks = [(lons[i:i + chunk_size], lats[i:i + chunk_size]) for i in range(0, len(lons), chunk_size)]
+        if workers > 1 and len(chunks) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(lambda chunk: self._locate_chunk(*chunk), chunks))
+        else:
+            parts = [self._locate_chunk(*chunk) for chunk in chunks]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=object)
+
+
+def build_locator(level='state'):
+    """``GeometryLocator`` over the state (``STUSPS``) or county (``GEOID``) geometry."""
+    if level == 'state':
+        return GeometryLocator(load_states(download_shapefile()))
+    if level != 'county':
+        raise ValueError(f"point lookup supports 'state' or 'county', got {level!r}")
+    return GeometryLocator(load_subareas(level), key='GEOID')
+
+
+def _incident_columns(path, names, level):
+    """Pick the columns to read from an incident file: type plus area code or coordinates."""
+    key = INCIDENT_KEY_COLUMNS[level]
+    names = set(names)
+    if INCIDENT_TYPE_COLUMN not in names:
+        raise ValueError(f"{path} has no {INCIDENT_TYPE_COLUMN!r} column")
+    if key in names:
+        return [INCIDENT_TYPE_COLUMN, key]
+    if names.issuperset(INCIDENT_COORD_COLUMNS):
+        return [INCIDENT_TYPE_COLUMN, *INCIDENT_COORD_COLUMNS]
+    raise ValueError(f"{path} needs a {key!r} column or {' and '.join(INCIDENT_COORD_COLUMNS)} columns")
+
+
+def iter_incident_chunks(path, level='state', chunk_size=INCIDENT_CHUNK_SIZE):
+    """
+    Yield an incident CSV or Parquet file as DataFrames of at most ``chunk_size`` rows.
+
+    Only the needed columns are read: ``INCIDENT_TYPE_COLUMN`` plus the
+    level's ``INCIDENT_KEY_COLUMNS`` code when the file has it, or the
+    ``INCIDENT_COORD_COLUMNS`` otherwise.
+    """
+    key = INCIDENT_KEY_COLUMNS[level]
+    if str(path).endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        columns = _incident_columns(path, parquet.schema_arrow.names, level)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    columns = _incident_columns(path, pd.read_csv(path, nrows=0).columns, level)
+    dtypes = {col: 'float64' for col in INCIDENT_COORD_COLUMNS}
+    dtypes.update({INCIDENT_TYPE_COLUMN: 'category', key: str})
+    yield from pd.read_csv(path, usecols=columns, dtype={col: dtypes[col] for col in columns},
+                           chunksize=chunk_size)
+
+
+def aggregate_incidents(paths, level='state', chunk_size=INCIDENT_CHUNK_SIZE, workers=1, locator=None):
+    """
+    Count incidents per area and ``INCIDENT_METRICS`` type, streaming the files.
+
+    Rows carrying the area code are counted directly; the others are placed
+    with a ``GeometryLocator`` (built on first use unless ``locator`` is given).
+    Rows of other types or outside every area are skipped and reported.
+
+    Args:
+        paths: Incident CSV/Parquet files.
+        level: ``'state'`` (keyed by ``STUSPS``) or ``'county'`` (``GEOID``).
+        chunk_size: Rows read and located per batch.
+        workers: Threads for the point lookup.
+        locator: Optional prebuilt ``GeometryLocator`` for ``level``.
+
+    Returns:
+        Integer DataFrame indexed by area code with one column per incident type.
+    """
+    if level not in INCIDENT_KEY_COLUMNS:
+        raise ValueError(f"level must be one of {tuple(INCIDENT_KEY_COLUMNS)}, got {level!r}")
+    key = INCIDENT_KEY_COLUMNS[level]
+    counts = pd.DataFrame(columns=list(INCIDENT_METRICS), index=pd.Index([], name=key), dtype='int64')
+    rows = other = unmatched = 0
+    for path in paths:
+        print(f"📥 Reading {path}...")
+        for chunk in iter_incident_chunks(path, level, chunk_size):
+            if key in chunk.columns:
+                codes = chunk[key].astype('string').str.strip()
+                codes = codes.str.upper() if level == 'state' else codes.str.zfill(5)
+            else:
+                locator = locator if locator is not None else build_locator(level)
+                codes = pd.Series(locator.locate(chunk[INCIDENT_COORD_COLUMNS[0]],
+                                                 chunk[INCIDENT_COORD_COLUMNS[1]], chunk_size, workers),
+                                  index=chunk.index)
+            types = chunk[INCIDENT_TYPE_COLUMN].astype(str)
+            known = types.isin(INCIDENT_METRICS)
+            located = codes.notna()
+            rows += len(chunk)
+            other += int((~known).sum())
+            unmatched += int((known & ~located).sum())
+            keep = known & located
+            chunk_counts = pd.DataFrame({key: codes[keep], 'type': types[keep]}).value_counts().unstack(fill_value=0)
+            counts = counts.add(chunk_counts.reindex(columns=counts.columns, fill_value=0), fill_value=0)
+    print(f"   {rows:,} rows: {rows - other - unmatched:,} counted, {other:,} of other types, "
+          f"{unmatched:,} outside every {level}")
+    return counts.astype('int64').sort_index()
+
+
+def incident_rates(counts, population, years=1):
+    """
+    Turn ``aggregate_incidents`` counts into annual per-100k rates.
+
+    Args:
+        counts: Incident counts indexed by area code.
+        population: Population per area code; every area in it gets a row
+            (rate 0 where it had no incidents, empty where population is unknown).
+        years: Years covered by the extract, to annualize the rates.
+
+    Returns:
+        DataFrame of area code, ``population``, the ``INCIDENT_METRICS`` rate
+        columns and a ``<type>_count`` column per incident type.
+    """
+    extra = counts.index.difference(population.index)
+    if len(extra):
+        print(f"⚠️  {int(counts.loc[extra].to_numpy().sum()):,} incidents in {len(extra)} area(s) "
+              f"without population ignored ({', '.join(map(str, extra[:5]))}{', ...' if len(extra) > 5 else ''})")
+    counts = counts.reindex(population.index, fill_value=0)
+    per_capita = 100_000 / years / population.astype('float64').where(population > 0)
+    frame = pd.DataFrame({'population': population})
+    for incident_type, column in INCIDENT_METRICS.items():
+        frame[column] = (counts[incident_type] * per_capita).round(2)
+    for incident_type in INCIDENT_METRICS:
+        frame[f"{incident_type}_count"] = counts[incident_type]
+    return frame.rename_axis(population.index.name).reset_index()
+
+
+def ingest_incidents(paths, level='state', output_path=None, subarea_stats=None, years=1,
+                     chunk_size=INCIDENT_CHUNK_SIZE, workers=1):
+    """
+    Aggregate raw incident files into per-100k rates ready for the map build.
+
+    State rates use the built-in state populations and are read back with
+    ``--state-stats``; county rates need ``subarea_stats`` with a
+    ``population`` column, whose other columns are carried over so the output
+    can be passed straight to ``--subarea-stats``.
+
+    Args:
+        paths: Incident CSV/Parquet files (see ``iter_incident_chunks``).
+        level: ``'state'`` or ``'county'``.
+        output_path: CSV to write (default ``INCIDENT_OUTPUT_TEMPLATE``).
+        subarea_stats: County statistics CSV keyed by ``GEOID``.
+        years: Years covered by the extract.
+        chunk_size: Rows read per batch.
+        workers: Threads for the point lookup.
+
+    Returns:
+        The rates DataFrame that was written.
+    """
+    if level == 'state':
+        base = None
+        population = get_state_statistics_frame().set_index('STUSPS')['population']
+    else:
+        if not subarea_stats:
+            raise ValueError(f"{level} rates need subarea statistics with a population column")
+        base = load_subarea_statistics(subarea_stats)
+        if 'population' not in base.columns:
+            raise ValueError(f"{subarea_stats} has no population column")
+        population = base.set_index('GEOID')['population'].dropna()
+
+    counts = aggregate_incidents(paths, level, chunk_size, workers)
+    rates = incident_rates(counts, population, years)
+    if base is not None:
+        rates = base.drop(columns=['population', *INCIDENT_METRICS.values()], errors='ignore').merge(
+            rates, on='GEOID', how='left', validate='one_to_one')
+
+    output_path = output_path or INCIDENT_OUTPUT_TEMPLATE.format(level=level)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    rates.to_csv(output_path, index=False)
+    print(f"✅ Incident rates for {len(rates):,} {level} area(s) written to {output_path}")
+    return rates
+
+
+def subarea_shard(gdf, records, tolerance, precision, budget, max_coarsen=SUBAREA_MAX_COARSEN):
+    """
+    Encode one state's areas and records as a shard of at most ``budget`` bytes.
+
+    The areas are simplified together (borders between them stay shared) and
+    the tolerance is doubled until the shard fits, so a state with thousands
+    of tracts gets coarser outlines rather than an oversized download. After
+    ``max_coarsen`` doublings the last shard is returned as is.
+
+    Returns:
+        Tuple of (shard bytes, tolerance used).
+    """
+    for attempt in range(max_coarsen + 1):
+        simplified, _ = simplify_states(gdf, tolerance, precision, key='GEOID')
+        topology = gdf_to_topojson(simplified, id_column='GEOID', property_columns=('GEOID',),
+                                   precision=precision, object_name='areas')
+        shard = dumps_json({'topology': topology, 'records': records})
+        if len(shard) <= budget or attempt == max_coarsen:
+            return shard, tolerance
+        tolerance *= 2
+
+
+def write_subarea_shards(output_dir, level, states_gdf, stats_df, subarea_stats=None):
+    """
+    Write the ``level`` drill-down as ``assets/<level>.<hash>/<STUSPS>.json``.
+
+    Each shard holds the state's areas as TopoJSON (object ``areas``, ids and
+    ``properties.GEOID`` set to the GEOID) plus their ``subarea_records``.
+    States are processed and written one at a time.
+
+    Returns:
+        ``{'level', 'base'}`` dict for ``write_split_assets``.
+    """
+    config = SUBLEVELS[level]
+    asset_dir = os.path.join(output_dir, "assets")
+    Path(asset_dir).mkdir(parents=True, exist_ok=True)
+    budget = config['shard_budget']
+    sizes = {}
+    coarsened = []
+
+    def shards():
+        for abbr, gdf in iter_subarea_groups(level, states_gdf):
+            records = subarea_records(gdf, stats_df, subarea_stats)
+            shard, tolerance = subarea_shard(gdf, records, config['tolerance'], config['precision'],
+                                             budget)
+            sizes[abbr] = len(shard)
+            if tolerance != config['tolerance']:
+                coarsened.append(f"{abbr} ({tolerance:g}°)")
+            yield abbr, shard
+
+    base = write_shard_dir(asset_dir, level, shards())
+    largest = max(sizes, key=sizes.get)
+    print(f"✓ {level} shards: {sum(sizes.values()):,} bytes across {len(sizes)} states "
+          f"(largest {largest}: {sizes[largest]:,} bytes, budget {budget:,})")
+    if coarsened:
+        print(f"    coarsened: {', '.join(coarsened)}")
+    over = sorted(abbr for abbr, size in sizes.items() if size > budget)
+    if over:
+        print(f"⚠️  Still over budget after {SUBAREA_MAX_COARSEN} coarsening steps: {', '.join(over)}")
+    return {'level': level, 'base': base}
+
+
+def timeseries_frames(series_df, keys, color_column='severity', key='STUSPS', period='year',
+                      keyframe_interval=TIMESERIES_KEYFRAME_INTERVAL):
+    """
+    Delta-encode a multi-year statistics frame into per-year animation frames.
+
+    Geometry and the figure are shipped once; a frame only carries the trace's
+    ``z`` values (in ``keys`` order) and the panel fields. Keyframes (every
+    ``keyframe_interval``-th year) hold them in full as ``{"z": [...],
+    "records": {key: {column: value}}}``; the other years hold only what
+    differs from the previous year: ``zIndex``/``z`` for the changed positions
+    and the changed fields per area. ``None`` marks a missing value.
+
+    Args:
+        series_df: ``load_statistics``-style frame with ``key``, ``period`` and
+            statistics columns, one row per area and year.
+        keys: Area order of the choropleth trace.
+        color_column: Column the map is colored by.
+
+    Yields:
+        ``(year, bytes)`` pairs for ``write_shard_dir``, in year order.
+    """
+    columns = list(stat_dtypes())
+    previous = None
+    for i, (year, frame) in enumerate(series_df.groupby(period, sort=True)):
+        frame = frame.set_index(key).reindex(keys)[columns]
+        frame = frame.astype(object).where(frame.notna(), None)
+        if i % keyframe_interval == 0:
+            payload = {'year': int(year), 'z': frame[color_column].tolist(),
+                       'records': frame.to_dict('index')}
+        else:
+            changed = frame.ne(previous) & (frame.notna() | previous.notna())
+            z_index = np.flatnonzero(changed[color_column].to_numpy())
+            payload = {
+                'year': int(year),
+                'base': int(previous_year),
+                'zIndex': z_index.tolist(),
+                'z': frame[color_column].iloc[z_index].tolist(),
+                'records': {
+                    area: {col: frame.at[area, col] for col in columns if changed.at[area, col]}
+                    for area in frame.index[changed.any(axis=1).to_numpy()]
+                },
+            }
+        previous, previous_year = frame, year
+        yield str(int(year)), dumps_json(payload)
+
+
+def prune_assets(output_dir, manifest):
+    """
+    Delete files under ``<output_dir>/assets`` that ``manifest`` doesn't list.
+
+    Hashed assets are never overwritten, so every data update would otherwise
+    leave the previous build's files (and their ``.gz``/``.br`` siblings)
+    behind to be uploaded again. Unlisted ``.gz``/``.br`` siblings in
+    ``output_dir`` itself (``index.html`` after ``--no-precompress``) go too.
+    Dot-prefixed entries (shard directories still being written) are left
+    alone, and emptied directories are removed.
+
+    Returns:
+        Number of files deleted.
+    """
+    asset_dir = os.path.join(output_dir, "assets")
+    keep = {os.path.normpath(path) for path in _artifact_files(output_dir, manifest)}
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(asset_dir, topdown=False):
+        rel_dir = os.path.relpath(dirpath, asset_dir)
+        if rel_dir != os.curdir and any(part.startswith('.') for part in rel_dir.split(os.sep)):
+            continue
+        for name in filenames:
+            path = os.path.normpath(os.path.join(dirpath, name))
+            if not name.startswith('.') and path not in keep:
+                os.remove(path)
+                removed += 1
+        if dirpath != asset_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    for name in os.listdir(output_dir):
+        path = os.path.normpath(os.path.join(output_dir, name))
+        if name.endswith(tuple(PRECOMPRESS_SUFFIXES.values())) and path not in keep and os.path.isfile(path):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def write_split_assets(output_dir, geometry_json, stats_json, state_records=None, precompress=True,
+                       detail_levels=DETAIL_LEVELS, sublevel=None, time_series=None, detail_geometries=None,
+                       geometry_format='topojson'):
+    """
+    Write the page as a small HTML shell plus content-hashed static assets.
+
+    ``assets/geometry.<hash>.json`` (the slow-changing boundaries),
+    ``assets/stats.<hash>.json`` (figure + statistics), ``assets/app.<hash>.js``
+    and ``assets/app.<hash>.css`` never change content under a given name, so
+    the CDN can cache them as immutable; only ``index.html`` and the stats
+    file change on a data update. ``asset-manifest.json`` lists each file with
+    the headers to upload it with (see ``write_manifest``), and assets of
+    earlier builds it no longer lists are deleted (see ``prune_assets``). Each of
+    ``state_records`` is written as its own ``assets/states.<hash>/<STUSPS>.json``
+    shard, fetched by the page when the state is clicked, and level-of-detail
+    geometry for ``detail_levels`` is added under ``assets/detail/`` (from
+    ``detail_geometries`` when given, see ``write_detail_shards``).
+    ``sublevel`` (from ``write_subarea_shards``) is passed through to the page
+    and its shards listed in the manifest. ``time_series`` is a dict with the
+    ``frames`` from ``timeseries_frames`` plus the ``years``, ``keyframes`` and
+    ``current`` year, written as ``assets/years.<hash>/<year>.json``. The
+    ``'binary'`` ``geometry_format`` is written as ``assets/geometry.<hash>.bin``.
+
+    Returns:
+        Dict of logical name -> written path (including ``index`` and ``manifest``).
+    """
+    asset_dir = os.path.join(output_dir, "assets")
+    Path(asset_dir).mkdir(parents=True, exist_ok=True)
+
+    contents = {
+        'geometry': ('bin' if geometry_format == 'binary' else 'json', geometry_json),
+        'stats': ('json', stats_json),
+        'app': ('js', TOPOJSON_DECODER_JS + BINARY_GEOMETRY_DECODER_JS + APP_JS + SPLIT_BOOTSTRAP_JS),
+        'style': ('css', PAGE_CSS),
+    }
+    urls = {}
+    paths = {}
+    for name, (ext, content) in contents.items():
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        stem = 'app' if name == 'style' else name
+        filename = f"{stem}.{content_hash(data)}.{ext}"
+        path = os.path.join(asset_dir, filename)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        urls[name] = f"assets/{filename}"
+        paths[name] = path
+
+    detail = write_detail_shards(asset_dir, detail_levels, detail_geometries) if detail_levels else []
+    map_assets = {'geometry': urls['geometry'], 'stats': urls['stats'], 'detail': detail}
+    shard_dirs = [level['base'] for level in detail]
+    if state_records:
+        map_assets['states'] = write_shard_dir(asset_dir, "states", (
+            (abbr, dumps_json(state_records[abbr]))
+            for abbr in sorted(state_records)
+        ))
+        shard_dirs.append(map_assets['states'])
+    if sublevel:
+        map_assets['sublevel'] = sublevel
+        shard_dirs.append(sublevel['base'])
+    if time_series:
+        frame_sizes = {}
+
+        def sized(frames):
+            for year, data in frames:
+                frame_sizes[year] = len(data)
+                yield year, data
+
+        map_assets['timeSeries'] = {
+            'base': write_shard_dir(asset_dir, "years", sized(time_series['frames'])),
+            **{name: time_series[name] for name in ('years', 'keyframes', 'current')},
+        }
+        shard_dirs.append(map_assets['timeSeries']['base'])
+        keyframe_bytes = sum(frame_sizes[str(year)] for year in time_series['keyframes'])
+        print(f"🎞️  {len(frame_sizes)} year frames: {len(time_series['keyframes'])} keyframe(s) "
+              f"{keyframe_bytes:,} bytes, deltas {sum(frame_sizes.values()) - keyframe_bytes:,} bytes")
+
+    shell = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{PAGE_TITLE}</title>
+    <link rel="preload" href="{urls['geometry']}" as="fetch" crossorigin>
+    <link rel="preload" href="{urls['stats']}" as="fetch" crossorigin>
+    <link rel="stylesheet" href="{urls['style']}">
+    <script src="{PLOTLY_JS_URL}"></script>
+</head>
+<body>{PAGE_BODY}
+    <script>window.MAP_ASSETS = {json.dumps(map_assets)};</script>
+    <script src="{urls['app']}"></script>
+</body>
+</html>
+"""
+    paths['index'] = os.path.join(output_dir, "index.html")
+    with open(paths['index'], 'w', encoding='utf-8') as f:
+        f.write(shell)
+
+    cache_controls = {'index.html': HTML_CACHE_CONTROL}
+    cache_controls.update({url: ASSET_CACHE_CONTROL for url in urls.values()})
+    for shard_dir in shard_dirs:
+        cache_controls.update({
+            shard_dir + name: ASSET_CACHE_CONTROL
+            for name in sorted(os.listdir(os.path.join(output_dir, shard_dir))) if name.endswith('.json')
+        })
+    paths['manifest'], manifest = write_manifest(output_dir, cache_controls, precompress=precompress)
+    removed = prune_assets(output_dir, manifest)
+    if removed:
+        print(f"🧹 Removed {removed:,} stale asset file(s) from earlier builds")
+    return paths
 
-    print(f"📥 Downloading shapefile from US Census Bureau...")
-    zip_path = os.path.join(SHAPEFILE_DIR, "states.zip")
 
-    response = requests.get(SHAPEFILE_URL, stream=True)
-    response.raise_for_status()
+def build_vector_tiles(path, layer_names=('states',)):
+    """
+    Export ``TILE_LAYERS`` (with their severity) as a vector tile archive.
 
-    with open(zip_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    Args:
+        path: ``.pmtiles`` or ``.mbtiles`` output path.
+        layer_names: Keys of ``TILE_LAYERS`` to include.
+    """
+    stats_df = get_state_statistics_frame()
+    layers = {}
+    for name in layer_names:
+        config = TILE_LAYERS[name]
+        if config['level'] == 'state':
+            gdf = join_statistics(load_states(download_shapefile()), stats_df)
+        else:
+            gdf = load_subareas(config['level']).merge(stats_df[['STUSPS', 'severity']], on='STUSPS',
+                                                       how='left', validate='many_to_one')
+        layers[name] = dict(config, gdf=gdf)
+    return export_vector_tiles(path, layers)
 
-    print(f"📦 Extracting shapefile...")
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(SHAPEFILE_DIR)
 
-    os.remove(zip_path)
-    print(f"✓ Shapefile ready at {shapefile_path}")
-    return shapefile_path
+def map_inputs(simplify_tolerance=SIMPLIFY_TOLERANCE, coord_precision=COORD_PRECISION,
+               stats_dataset=STATS_DATASET_PATH, stats_year=None, state_stats=None, detail_levels=None,
+               level='state', subarea_stats=None):
+    """
+    Fingerprint every input a map build reads, without loading or downloading any of them.
 
-def get_state_statistics():
+    Returns:
+        Dict with ``geometry`` (state shapefile, tolerance and precision),
+        ``statistics`` (dataset, schema, overrides and year), ``detail`` and
+        ``subareas`` (their shapefiles, settings and statistics) and
+        ``renderer`` (this module, which holds the page templates, the
+        colorscale and the figure layout).
     """
-    Return comprehensive statistics for each state including law severity and crime data.
-    
-    Data includes:
-    - Law severity score (0-100)
-    - Murder rate per 100k population (2022 FBI data estimates)
-    - Gun death rate per 100k (CDC data estimates)
-    - Traffic fatality rate per 100k (NHTSA data estimates)
-    - Population (2023 estimates)
-    - Incarceration rate per 100k
-    """
-    stats = {
-        # Format: 'state': {severity, murder_rate, gun_death_rate, traffic_fatality_rate, population, incarceration_rate, death_penalty, notes}
-        'AL': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 12.9, 'gun_death_rate': 26.4, 'traffic_fatality_rate': 20.1,
-            'population': 5074296, 'incarceration_rate': 840, 
-            'notes': 'High incarceration and violent crime rates'
-        },
-        'AK': {
-            'severity': 30, 'category': 'Lenient', 'death_penalty': 'Abolished 1957',
-            'murder_rate': 8.4, 'gun_death_rate': 24.5, 'traffic_fatality_rate': 10.3,
-            'population': 733583, 'incarceration_rate': 740,
-            'notes': 'Rehabilitative focus but high violent crime'
-        },
-        'AZ': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 8.9, 'gun_death_rate': 17.4, 'traffic_fatality_rate': 13.4,
-            'population': 7359197, 'incarceration_rate': 820,
-            'notes': 'Strict laws, active death penalty'
-        },
-        'AR': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 11.5, 'gun_death_rate': 22.6, 'traffic_fatality_rate': 18.2,
-            'population': 3045637, 'incarceration_rate': 1010,
-            'notes': 'Very high incarceration rate'
-        },
-        'CA': {
-            'severity': 38, 'category': 'Lenient', 'death_penalty': 'Moratorium',
-            'murder_rate': 5.7, 'gun_death_rate': 9.0, 'traffic_fatality_rate': 10.6,
-            'population': 39538223, 'incarceration_rate': 550,
-            'notes': 'Largest death row but executions suspended'
-        },
-        'CO': {
-            'severity': 52, 'category': 'Moderate', 'death_penalty': 'Abolished 2020',
-            'murder_rate': 6.5, 'gun_death_rate': 15.4, 'traffic_fatality_rate': 12.1,
-            'population': 5773714, 'incarceration_rate': 630,
-            'notes': 'Recently abolished death penalty'
-        },
-        'CT': {
-            'severity': 30, 'category': 'Lenient', 'death_penalty': 'Abolished 2012',
-            'murder_rate': 4.6, 'gun_death_rate': 6.6, 'traffic_fatality_rate': 8.9,
-            'population': 3605944, 'incarceration_rate': 480,
-            'notes': 'Progressive criminal justice reforms'
-        },
-        'DE': {
-            'severity': 58, 'category': 'Moderate', 'death_penalty': 'Abolished 2016',
-            'murder_rate': 8.4, 'gun_death_rate': 13.2, 'traffic_fatality_rate': 12.8,
-            'population': 1018396, 'incarceration_rate': 650,
-            'notes': 'Death penalty ruled unconstitutional'
-        },
-        'FL': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 6.9, 'gun_death_rate': 13.7, 'traffic_fatality_rate': 14.8,
-            'population': 22244823, 'incarceration_rate': 770,
-            'notes': 'High death row population'
-        },
-        'GA': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 10.2, 'gun_death_rate': 18.0, 'traffic_fatality_rate': 13.6,
-            'population': 10912876, 'incarceration_rate': 900,
-            'notes': 'Strict sentencing laws'
-        },
-        'HI': {
-            'severity': 20, 'category': 'Lenient', 'death_penalty': 'Abolished 1957',
-            'murder_rate': 2.9, 'gun_death_rate': 4.8, 'traffic_fatality_rate': 9.4,
-            'population': 1455271, 'incarceration_rate': 490,
-            'notes': 'Lowest violent crime rate, most progressive'
-        },
-        'ID': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 3.6, 'gun_death_rate': 16.7, 'traffic_fatality_rate': 15.8,
-            'population': 1939033, 'incarceration_rate': 860,
-            'notes': 'Firing squad available as execution method'
-        },
-        'IL': {
-            'severity': 38, 'category': 'Lenient', 'death_penalty': 'Abolished 2011',
-            'murder_rate': 9.1, 'gun_death_rate': 14.1, 'traffic_fatality_rate': 9.2,
-            'population': 12812508, 'incarceration_rate': 520,
-            'notes': 'Abolished after wrongful convictions scandal'
-        },
-        'IN': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 8.0, 'gun_death_rate': 16.7, 'traffic_fatality_rate': 12.9,
-            'population': 6833037, 'incarceration_rate': 800,
-            'notes': 'Conservative laws with active death penalty'
-        },
-        'IA': {
-            'severity': 80, 'category': 'Severe', 'death_penalty': 'Abolished 1965',
-            'murder_rate': 3.2, 'gun_death_rate': 11.2, 'traffic_fatality_rate': 11.4,
-            'population': 3200517, 'incarceration_rate': 610,
-            'notes': 'No death penalty but long sentences'
-        },
-        'KS': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 6.3, 'gun_death_rate': 15.1, 'traffic_fatality_rate': 13.2,
-            'population': 2937880, 'incarceration_rate': 680,
-            'notes': 'Death penalty on books, no executions since 1965'
-        },
-        'KY': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 8.8, 'gun_death_rate': 20.1, 'traffic_fatality_rate': 17.4,
-            'population': 4505836, 'incarceration_rate': 920,
-            'notes': 'Electric chair available as backup method'
-        },
-        'LA': {
-            'severity': 95, 'category': 'Severe', 'death_penalty': 'Active',
-            'murder_rate': 15.8, 'gun_death_rate': 26.3, 'traffic_fatality_rate': 18.4,
-            'population': 4657757, 'incarceration_rate': 1090,
-            'notes': 'Highest incarceration rate in the nation'
-        },
-        'ME': {
-            'severity': 25, 'category': 'Lenient', 'death_penalty': 'Abolished 1887',
-            'murder_rate': 1.8, 'gun_death_rate': 11.0, 'traffic_fatality_rate': 10.2,
-            'population': 1385340, 'incarceration_rate': 370,
-            'notes': 'Very low crime, early abolition'
-        },
-        'MD': {
-            'severity': 55, 'category': 'Moderate', 'death_penalty': 'Abolished 2013',
-            'murder_rate': 9.6, 'gun_death_rate': 15.0, 'traffic_fatality_rate': 8.5,
-            'population': 6177224, 'incarceration_rate': 590,
-            'notes': 'Recent criminal justice reforms'
-        },
-        'MA': {
-            'severity': 28, 'category': 'Lenient', 'death_penalty': 'Abolished 1984',
-            'murder_rate': 3.2, 'gun_death_rate': 3.7, 'traffic_fatality_rate': 5.1,
-            'population': 7029917, 'incarceration_rate': 340,
-            'notes': 'Lowest gun death rate, strong rehabilitation focus'
-        },
-        'MI': {
-            'severity': 55, 'category': 'Moderate', 'death_penalty': 'Abolished 1846',
-            'murder_rate': 7.6, 'gun_death_rate': 14.6, 'traffic_fatality_rate': 10.8,
-            'population': 10077331, 'incarceration_rate': 620,
-            'notes': 'First English-speaking jurisdiction to abolish death penalty'
-        },
-        'MN': {
-            'severity': 45, 'category': 'Moderate', 'death_penalty': 'Abolished 1911',
-            'murder_rate': 3.5, 'gun_death_rate': 9.3, 'traffic_fatality_rate': 7.8,
-            'population': 5706494, 'incarceration_rate': 370,
-            'notes': 'Strong emphasis on rehabilitation'
-        },
-        'MS': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 20.5, 'gun_death_rate': 28.6, 'traffic_fatality_rate': 22.2,
-            'population': 2961279, 'incarceration_rate': 1030,
-            'notes': 'Highest murder rate in the nation'
-        },
-        'MO': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 11.8, 'gun_death_rate': 23.9, 'traffic_fatality_rate': 14.7,
-            'population': 6177957, 'incarceration_rate': 860,
-            'notes': 'High execution rate'
-        },
-        'MT': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 4.5, 'gun_death_rate': 22.5, 'traffic_fatality_rate': 18.6,
-            'population': 1122867, 'incarceration_rate': 720,
-            'notes': 'High gun death rate'
-        },
-        'NE': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 3.7, 'gun_death_rate': 10.2, 'traffic_fatality_rate': 11.9,
-            'population': 1961504, 'incarceration_rate': 540,
-            'notes': 'Death penalty reinstated by referendum in 2016'
-        },
-        'NV': {
-            'severity': 85, 'category': 'Severe', 'death_penalty': 'Active',
-            'murder_rate': 10.2, 'gun_death_rate': 18.5, 'traffic_fatality_rate': 12.7,
-            'population': 3104614, 'incarceration_rate': 840,
-            'notes': 'High violent crime rate in urban areas'
-        },
-        'NH': {
-            'severity': 50, 'category': 'Moderate', 'death_penalty': 'Abolished 2019',
-            'murder_rate': 1.3, 'gun_death_rate': 9.3, 'traffic_fatality_rate': 9.1,
-            'population': 1377529, 'incarceration_rate': 400,
-            'notes': 'Lowest murder rate, last northeast state to abolish'
-        },
-        'NJ': {
-            'severity': 32, 'category': 'Lenient', 'death_penalty': 'Abolished 2007',
-            'murder_rate': 3.4, 'gun_death_rate': 5.2, 'traffic_fatality_rate': 6.4,
-            'population': 9288994, 'incarceration_rate': 450,
-            'notes': 'First state to abolish death penalty in 21st century'
-        },
-        'NM': {
-            'severity': 48, 'category': 'Moderate', 'death_penalty': 'Abolished 2009',
-            'murder_rate': 8.8, 'gun_death_rate': 24.2, 'traffic_fatality_rate': 16.8,
-            'population': 2117522, 'incarceration_rate': 570,
-            'notes': 'Progressive reforms, high gun death rate'
-        },
-        'NY': {
-            'severity': 35, 'category': 'Lenient', 'death_penalty': 'Abolished 2007',
-            'murder_rate': 4.2, 'gun_death_rate': 5.4, 'traffic_fatality_rate': 5.8,
-            'population': 20201249, 'incarceration_rate': 380,
-            'notes': 'Major criminal justice reforms in recent years'
-        },
-        'NC': {
-            'severity': 88, 'category': 'Severe', 'death_penalty': 'Active',
-            'murder_rate': 7.9, 'gun_death_rate': 16.1, 'traffic_fatality_rate': 13.6,
-            'population': 10439388, 'incarceration_rate': 570,
-            'notes': 'De facto moratorium on executions'
-        },
-        'ND': {
-            'severity': 85, 'category': 'Severe', 'death_penalty': 'Abolished 1973',
-            'murder_rate': 3.3, 'gun_death_rate': 13.4, 'traffic_fatality_rate': 13.2,
-            'population': 779094, 'incarceration_rate': 430,
-            'notes': 'Long sentences despite no death penalty'
-        },
-        'OH': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 6.3, 'gun_death_rate': 15.2, 'traffic_fatality_rate': 10.5,
-            'population': 11799448, 'incarceration_rate': 730,
-            'notes': 'Recent informal moratorium on executions'
-        },
-        'OK': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 9.2, 'gun_death_rate': 20.7, 'traffic_fatality_rate': 17.3,
-            'population': 4019800, 'incarceration_rate': 1050,
-            'notes': 'Highest execution rate per capita'
-        },
-        'OR': {
-            'severity': 32, 'category': 'Lenient', 'death_penalty': 'Moratorium',
-            'murder_rate': 4.5, 'gun_death_rate': 14.9, 'traffic_fatality_rate': 11.2,
-            'population': 4237256, 'incarceration_rate': 600,
-            'notes': 'Governor-imposed moratorium on executions'
-        },
-        'PA': {
-            'severity': 58, 'category': 'Moderate', 'death_penalty': 'Moratorium',
-            'murder_rate': 7.8, 'gun_death_rate': 13.6, 'traffic_fatality_rate': 10.1,
-            'population': 13002700, 'incarceration_rate': 650,
-            'notes': 'Large prison population, execution moratorium'
-        },
-        'RI': {
-            'severity': 25, 'category': 'Lenient', 'death_penalty': 'Abolished 1984',
-            'murder_rate': 3.5, 'gun_death_rate': 4.4, 'traffic_fatality_rate': 5.9,
-            'population': 1097379, 'incarceration_rate': 410,
-            'notes': 'Very progressive criminal justice system'
-        },
-        'SC': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 11.2, 'gun_death_rate': 22.8, 'traffic_fatality_rate': 19.4,
-            'population': 5118425, 'incarceration_rate': 730,
-            'notes': 'Recently added firing squad as execution method'
-        },
-        'SD': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 4.5, 'gun_death_rate': 13.5, 'traffic_fatality_rate': 16.2,
-            'population': 886667, 'incarceration_rate': 590,
-            'notes': 'Conservative laws, active death penalty'
-        },
-        'TN': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 10.6, 'gun_death_rate': 21.3, 'traffic_fatality_rate': 16.5,
-            'population': 7051339, 'incarceration_rate': 870,
-            'notes': 'Highly punitive justice system'
-        },
-        'TX': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 8.2, 'gun_death_rate': 14.7, 'traffic_fatality_rate': 13.2,
-            'population': 30029572, 'incarceration_rate': 880,
-            'notes': 'National leader in executions'
-        },
-        'UT': {
-            'severity': 90, 'category': 'Severe', 'death_penalty': 'Active',
-            'murder_rate': 2.8, 'gun_death_rate': 13.6, 'traffic_fatality_rate': 10.4,
-            'population': 3380800, 'incarceration_rate': 410,
-            'notes': 'Firing squad available, low crime rate'
-        },
-        'VT': {
-            'severity': 22, 'category': 'Lenient', 'death_penalty': 'Abolished 1964',
-            'murder_rate': 2.2, 'gun_death_rate': 11.6, 'traffic_fatality_rate': 9.8,
-            'population': 643077, 'incarceration_rate': 320,
-            'notes': 'Lowest incarceration rate, most progressive'
-        },
-        'VA': {
-            'severity': 92, 'category': 'Severe', 'death_penalty': 'Abolished 2021',
-            'murder_rate': 6.1, 'gun_death_rate': 13.4, 'traffic_fatality_rate': 9.6,
-            'population': 8631393, 'incarceration_rate': 680,
-            'notes': 'Former leader in executions, recently abolished'
-        },
-        'WA': {
-            'severity': 35, 'category': 'Lenient', 'death_penalty': 'Abolished 2018',
-            'murder_rate': 4.2, 'gun_death_rate': 10.9, 'traffic_fatality_rate': 8.4,
-            'population': 7705281, 'incarceration_rate': 510,
-            'notes': 'Death penalty ruled unconstitutional'
-        },
-        'WV': {
-            'severity': 60, 'category': 'Moderate', 'death_penalty': 'Abolished 1965',
-            'murder_rate': 7.8, 'gun_death_rate': 17.8, 'traffic_fatality_rate': 15.9,
-            'population': 1793716, 'incarceration_rate': 610,
-            'notes': 'Moderate laws, high drug-related crime'
-        },
-        'WI': {
-            'severity': 50, 'category': 'Moderate', 'death_penalty': 'Abolished 1853',
-            'murder_rate': 4.8, 'gun_death_rate': 11.8, 'traffic_fatality_rate': 11.2,
-            'population': 5893718, 'incarceration_rate': 580,
-            'notes': 'Balanced justice system'
-        },
-        'WY': {
-            'severity': 100, 'category': 'Very Severe', 'death_penalty': 'Active',
-            'murder_rate': 3.4, 'gun_death_rate': 25.9, 'traffic_fatality_rate': 22.6,
-            'population': 576851, 'incarceration_rate': 710,
-            'notes': 'Very high traffic fatality rate, active death penalty'
-        },
+    subareas = None
+    if level != 'state':
+        config = SUBLEVELS[level]
+        pattern = SUBLEVEL_NAME_TEMPLATE.format(scope='*', layer=level, resolution=config['resolution'])
+        subareas = [extract_fingerprints(pattern), config,
+                    file_digest(subarea_stats) if subarea_stats else None]
+    return {
+        'geometry': [extract_fingerprints(SHAPEFILE_NAME), simplify_tolerance, coord_precision],
+        'statistics': [file_digest(stats_dataset), file_digest(STATS_SCHEMA_PATH),
+                       file_digest(state_stats) if state_stats else None, stats_year],
+        'detail': {resolution: [extract_fingerprints(SHAPEFILE_NAME_TEMPLATE.format(resolution=resolution)),
+                                config] for resolution, config in (detail_levels or {}).items()},
+        'subareas': subareas,
+        'renderer': file_digest(os.path.abspath(__file__)),
     }
-    return stats
 
-def get_state_bounds(gdf, state_abbr):
-    """Get the geographic bounds for a specific state."""
-    state_geom = gdf[gdf['STUSPS'] == state_abbr].geometry.values[0]
-    bounds = state_geom.bounds  # (minx, miny, maxx, maxy)
-    
-    # Calculate center and appropriate zoom
-    center_lon = (bounds[0] + bounds[2]) / 2
-    center_lat = (bounds[1] + bounds[3]) / 2
-    
-    # Calculate zoom level based on bounds size
-    lon_range = bounds[2] - bounds[0]
-    lat_range = bounds[3] - bounds[1]
-    max_range = max(lon_range, lat_range)
-    
-    # Rough zoom calculation (adjust as needed)
-    if max_range > 20:
-        zoom = 3.5
-    elif max_range > 10:
-        zoom = 4.5
-    elif max_range > 5:
-        zoom = 5.5
-    else:
-        zoom = 6.5
-    
-    return center_lat, center_lon, zoom
 
-def create_interactive_map():
-    """Generate and display an advanced interactive US law severity map with click-to-view stats."""
+def build_state_path(target, store_dir=None):
+    """Where the last build of ``target`` (output file or directory) records its key."""
+    name = hashlib.sha256(os.path.abspath(target).encode('utf-8')).hexdigest()
+    return geometry_store_path(name, store_dir, prefix='build', suffix='.json')
+
+
+def _artifact_files(root_dir, manifest):
+    """Every file listed in ``manifest`` (paths relative to ``root_dir``), with its siblings."""
+    files = []
+    for rel_path, entry in manifest.items():
+        files.append(os.path.join(root_dir, rel_path))
+        files.extend(os.path.join(root_dir, sibling['file'])
+                     for sibling in entry.get('encodings', {}).values())
+    return files
+
+
+def _manifest_files(root_dir):
+    """Every file listed in ``root_dir``'s asset manifest (with its siblings), plus the manifest."""
+    manifest_path = os.path.join(root_dir, MANIFEST_NAME)
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return [manifest_path, *_artifact_files(root_dir, manifest)]
+
+
+def _build_files(root_dir, artifacts, manifest):
+    """The files a build wrote: its artifacts and their siblings, plus the manifest when it was written."""
+    files = _artifact_files(root_dir, manifest)
+    if 'manifest' in artifacts:
+        files.insert(0, artifacts['manifest'])
+    return files
+
+
+def read_build_state(target, key, store_dir=None):
+    """
+    Return the artifacts of ``target``'s last build if it was built from ``key`` and is intact.
+
+    Intact means every file the build wrote still has the size and mtime
+    recorded right after the build, so a deleted or hand-edited output is
+    rebuilt.
+
+    Returns:
+        Tuple of the artifacts and manifest dict passed to
+        ``write_build_state``, or None.
+    """
+    try:
+        with open(build_state_path(target, store_dir), encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if state.get('key') != key:
+        return None
+    for path, stamp in state['files'].items():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if [stat.st_size, stat.st_mtime_ns] != stamp:
+            return None
+    return state['artifacts'], state['manifest']
+
+
+def write_build_state(target, key, artifacts, root_dir, manifest, store_dir=None):
+    """Record ``key``, ``artifacts``, ``manifest`` and the size and mtime of every file the build wrote."""
+    files = {}
+    for path in _build_files(root_dir, artifacts, manifest):
+        stat = os.stat(path)
+        files[path] = [stat.st_size, stat.st_mtime_ns]
+    state_path = build_state_path(target, store_dir)
+    _write_store_file(state_path, json.dumps({'key': key, 'artifacts': artifacts, 'manifest': manifest,
+                                              'files': files}, indent=2))
+
+
+def prepare_geometry(simplify_tolerance=SIMPLIFY_TOLERANCE, coord_precision=COORD_PRECISION,
+                     detail_levels=None, force=False, report=None):
+    """
+    Load and simplify the state geometry a map build needs.
+
+    Simplified frames are cached in the geometry store (see
+    ``simplified_states``); ``force`` recomputes them. The ``download``,
+    ``states`` and ``detail`` steps are timed as stages of ``report``.
+
+    Returns:
+        Dict with ``states`` (the simplified 20m frame), ``detail``
+        (``{resolution: frame}`` from ``load_detail_geometry`` for
+        ``detail_levels``) and ``key`` (the states' stage key), as accepted
+        by ``create_interactive_map``.
+    """
+    report = report if report is not None else BuildReport()
+
     # Download shapefile
-    shapefile_path = download_shapefile()
+    with report.stage('download'):
+        shapefile_path = download_shapefile()
 
-    # Load shapefile
+    # Load geometry (GeoParquet store when available, shapefile otherwise) and
+    # simplify shared borders once, rounding coordinates for a lighter page
     print("🗺️  Loading geographic data...")
-    gdf = gpd.read_file(shapefile_path)
+    with report.stage('states'):
+        gdf, simplify_report, key = simplified_states(shapefile_path, simplify_tolerance, coord_precision,
+                                                      force=force)
+    if simplify_report is not None:
+        print_simplification_report(simplify_report)
+    with report.stage('detail'):
+        detail = {resolution: load_detail_geometry(resolution, level, force)
+                  for resolution, level in (detail_levels or {}).items()}
+    return {'states': gdf, 'detail': detail, 'key': key}
 
-    # Filter to 50 states only
-    us_states = {
-        'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
-        'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
-        'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
-        'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
-        'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
-    }
-    gdf = gdf[gdf['STUSPS'].isin(us_states)]
 
-    # Get state statistics
-    state_stats = get_state_statistics()
+def peak_rss_bytes():
+    """High-water resident set size of this process in bytes (None without ``resource``, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class BuildReport:
+    """
+    Per-stage instrumentation of one map build, filled in by ``create_interactive_map``.
+
+    Each ``stage(name)`` block appends a record to ``stages``: ``name``,
+    ``seconds`` (wall), ``cpu_seconds``, ``peak_rss_bytes`` (the process
+    high-water mark when the stage ended) and ``peak_rss_growth_bytes`` (how
+    far the stage raised it), plus ``bytes`` when the stage sets it on the
+    record it yields. Stages opened inside another are named
+    ``<outer>/<inner>``. When a ``JsonLog`` is attached each record is also
+    written as a ``stage`` record. ``up_to_date`` is set when the build found
+    nothing to do, and ``manifest`` holds the build's artifact manifest (see
+    ``artifact_manifest``) whether or not it was written to disk.
+
+    With ``profile`` (a ``PROFILERS`` name) every top-level stage also runs
+    under cProfile or pyinstrument, saved as ``<profile_dir>/<stage>.prof``
+    (read with ``pstats``/snakeviz) or ``.html``; the path is the record's
+    ``profile``.
+    """
+
+    def __init__(self, log=None, profile=None, profile_dir=PROFILE_DIR):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"profile must be one of {PROFILERS}, got {profile!r}")
+        self.log = log
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.up_to_date = False
+        self.manifest = None
+        self._open = []
+        self._started = (time.perf_counter(), time.process_time())
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        name = '/'.join([*self._open, name])
+        record = {'name': name}
+        self.stages.append(record)  # in start order, so outer stages precede their inner ones
+        stop_profiler = self._start_profiler() if self.profile and not self._open else None
+        self._open.append(name.rsplit('/', 1)[-1])
+        peak_before = peak_rss_bytes()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - wall, 4)
+            record['cpu_seconds'] = round(time.process_time() - cpu, 4)
+            self._open.pop()
+            peak = peak_rss_bytes()
+            if peak is not None:
+                record['peak_rss_bytes'] = peak
+                record['peak_rss_growth_bytes'] = peak - peak_before
+            if stop_profiler is not None:
+                record['profile'] = stop_profiler(name)
+            # Keep 'name' first and any 'bytes' set by the stage after the timings
+            if 'bytes' in record:
+                record['bytes'] = record.pop('bytes')
+            if self.log is not None:
+                self.log.event('stage', **record)
+
+    def _start_profiler(self):
+        """Start the configured profiler; returns a function stopping it and saving the result."""
+        Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+        if self.profile == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+            def stop(name):
+                profiler.disable()
+                path = os.path.join(self.profile_dir, f"{name.replace('/', '.')}.prof")
+                profiler.dump_stats(path)
+                return path
+            return stop
+
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+
+        def stop(name):
+            profiler.stop()
+            path = os.path.join(self.profile_dir, f"{name.replace('/', '.')}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            return path
+        return stop
+
+    def summary(self):
+        """The whole build so far: ``up_to_date``, ``seconds``, ``cpu_seconds``, ``peak_rss_bytes`` and ``stages``."""
+        wall, cpu = self._started
+        return {
+            'up_to_date': self.up_to_date,
+            'seconds': round(time.perf_counter() - wall, 4),
+            'cpu_seconds': round(time.process_time() - cpu, 4),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': self.stages,
+        }
+
+    def prometheus(self, labels=None):
+        """
+        The ``summary`` in the Prometheus text exposition format.
+
+        Build totals are ``<METRICS_PREFIX>_build_*`` gauges and stages
+        ``<METRICS_PREFIX>_stage_*{stage="..."}``; ``labels`` (e.g. the output
+        mode) are added to every sample. Written where node_exporter's textfile
+        collector reads it, each nightly build becomes a point in a time series.
+        """
+        def label_text(extra):
+            items = {**(labels or {}), **extra}
+            if not items:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                       for value in items.values())
+            return '{' + ','.join(f'{key}="{value}"' for key, value in zip(items, escaped)) + '}'
+
+        summary = self.summary()
+        lines = []
+        metrics = [
+            ('build_seconds', "Wall time of the build", [({}, summary['seconds'])]),
+            ('build_cpu_seconds', "CPU time of the build", [({}, summary['cpu_seconds'])]),
+            ('build_peak_rss_bytes', "Peak resident memory of the build process",
+             [({}, summary['peak_rss_bytes'])]),
+            ('build_up_to_date', "1 when no input changed and nothing was rebuilt",
+             [({}, int(summary['up_to_date']))]),
+        ]
+        for field, help_text in (('seconds', "Wall time of a build stage"),
+                                 ('cpu_seconds', "CPU time of a build stage"),
+                                 ('peak_rss_bytes', "Process peak resident memory at the end of a stage"),
+                                 ('peak_rss_growth_bytes', "Increase of the peak resident memory during a stage"),
+                                 ('bytes', "Bytes produced by a build stage")):
+            metrics.append((f"stage_{field}", help_text,
+                            [({'stage': record['name']}, record[field])
+                             for record in summary['stages'] if record.get(field) is not None]))
+        for name, help_text, samples in metrics:
+            samples = [(extra, value) for extra, value in samples if value is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            lines.extend(f"{METRICS_PREFIX}_{name}{label_text(extra)} {value}" for extra, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self, path, labels=None):
+        """Write the ``summary`` to ``path``: Prometheus text for ``.prom``, JSON otherwise (atomically)."""
+        if path.endswith('.prom'):
+            text = self.prometheus(labels)
+        else:
+            text = json.dumps({**({'labels': labels} if labels else {}), **self.summary()}, indent=2)
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def print_stages(self):
+        """Print a table of the stage records."""
+        print("⏱️  Build stages:")
+        print(f"    {'stage':<24} {'wall (s)':>9} {'cpu (s)':>9} {'peak RSS (MB)':>14} {'bytes':>12}")
+        for record in self.stages:
+            peak = record.get('peak_rss_bytes')
+            peak = '-' if peak is None else f"{peak / 2 ** 20:.0f}"
+            size = f"{record['bytes']:,}" if 'bytes' in record else ''
+            print(f"    {record['name']:<24} {record['seconds']:>9.3f} {record['cpu_seconds']:>9.3f} "
+                  f"{peak:>14} {size:>12}")
+
+
+class JsonLog(io.TextIOBase):
+    """
+    Text stream that turns printed progress lines into JSON log records.
+
+    Installed with ``contextlib.redirect_stdout``, every non-empty line becomes
+    ``{"ts", "event": "log", "level", "message"}`` on ``stream`` (one object
+    per line, leading emoji dropped; lines starting with ⚠️/❌ are
+    ``warning``/``error``). ``event()`` writes other records to the same stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._pending = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        for line in lines:
+            message = re.sub(r'^[^\w\'"(\[<]+', '', line.strip())
+            if message:
+                level = LOG_LEVELS.get(line.strip()[:1], 'info')
+                self.event('log', level=level, message=message)
+        return len(text)
+
+    def event(self, event, **fields):
+        """Write one ``{"ts", "event", **fields}`` record."""
+        record = {'ts': round(time.time(), 3), 'event': event, **fields}
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.stream.flush()
+
 
-    # Assign data to geodataframe
-    for col in ['severity', 'category', 'death_penalty', 'murder_rate', 'gun_death_rate', 
-                'traffic_fatality_rate', 'population', 'incarceration_rate', 'notes']:
-        gdf[col] = gdf['STUSPS'].map(lambda x: state_stats.get(x, {}).get(col, 'N/A'))
+def build_figure(gdf, color_column, us_averages, zrange=None):
+    """
+    Build the choropleth figure (trace, layout and guide annotations) for a joined frame.
 
-    # Calculate US averages for context
-    avg_murder = sum(s['murder_rate'] for s in state_stats.values()) / len(state_stats)
-    avg_gun = sum(s['gun_death_rate'] for s in state_stats.values()) / len(state_stats)
-    avg_traffic = sum(s['traffic_fatality_rate'] for s in state_stats.values()) / len(state_stats)
+    Args:
+        gdf: Geometry joined with the statistics (``join_statistics``).
+        color_column: ``color_metrics()`` column the states are colored by.
+        us_averages: ``statistics_averages`` output quoted in the guide.
+        zrange: Optional ``(zmin, zmax)`` color range (fixed across years
+            for a time series).
 
+    Returns:
+        ``plotly.graph_objects.Figure``.
+    """
     # Create simple hover text (just state name)
-    gdf['hover_text'] = (
+    hover_text = (
         '<b>' + gdf['NAME'] + '</b> (' + gdf['STUSPS'] + ')<br>' +
         '<i>💡 Click state to zoom in and see details</i>' +
         '<extra></extra>'
     )
 
-    # Prepare data for Plotly
-    print("🎨 Creating interactive visualization with click-to-view statistics...")
-    
-    # Convert to JSON for Plotly
-    gdf_json = json.loads(gdf.to_json())
-    
-    # Prepare state data as JSON for JavaScript
-    state_data_dict = {}
-    for idx, row in gdf.iterrows():
-        state_data_dict[row['STUSPS']] = {
-            'name': row['NAME'],
-            'abbr': row['STUSPS'],
-            'severity': int(row['severity']),
-            'category': row['category'],
-            'death_penalty': row['death_penalty'],
-            'murder_rate': float(row['murder_rate']),
-            'gun_death_rate': float(row['gun_death_rate']),
-            'traffic_fatality_rate': float(row['traffic_fatality_rate']),
-            'population': int(row['population']),
-            'incarceration_rate': int(row['incarceration_rate']),
-            'notes': row['notes']
-        }
-    
+    # Colorbar titled with the metric's label; severity keeps its category ticks
+    colorbar = dict(
+        title=f"<b>{'<br>'.join(color_metrics()[color_column].split(' ', 1))}</b>",
+        thickness=20,
+        len=0.7,
+        x=0.98,
+        tickfont=dict(size=11, family='Arial, sans-serif'),
+    )
+    if color_column == 'severity':
+        colorbar.update(tickvals=[20, 40, 60, 80, 100],
+                        ticktext=['20<br>Lenient', '40', '60<br>Moderate', '80', '100<br>Very<br>Severe'])
+
     # Create the figure with Plotly Choropleth
     fig = go.Figure(go.Choroplethmapbox(
-        geojson=gdf_json,
         locations=gdf['STUSPS'],
-        z=gdf['severity'],
+        z=gdf[color_column],
         featureidkey="properties.STUSPS",
         colorscale=[
             [0.0, 'rgb(34, 139, 34)'],    # Forest green (lowest severity)
@@ -464,22 +3725,16 @@ def create_interactive_map():
             [0.8, 'rgb(220, 20, 60)'],    # Crimson
             [1.0, 'rgb(139, 0, 0)']       # Dark red (highest severity)
         ],
-        text=gdf['hover_text'],
+        text=hover_text,
         hovertemplate='%{text}',
-        colorbar=dict(
-            title="<b>Severity<br>Score</b>",
-            thickness=20,
-            len=0.7,
-            x=0.98,
-            tickvals=[20, 40, 60, 80, 100],
-            ticktext=['20<br>Lenient', '40', '60<br>Moderate', '80', '100<br>Very<br>Severe'],
-            tickfont=dict(size=11, family='Arial, sans-serif'),
-        ),
+        colorbar=colorbar,
         marker_opacity=0.85,
         marker_line_width=1.5,
         marker_line_color='white',
         customdata=gdf['STUSPS']
     ))
+    if zrange is not None:
+        fig.update_traces(zmin=zrange[0], zmax=zrange[1])
 
     # Update layout
     fig.update_layout(
@@ -529,8 +3784,8 @@ def create_interactive_map():
                 '<b>Incarceration:</b> Prisoners per 100,000<br>'
                 '<br>'
                 '<i>💡 US Averages:</i><br>'
-                f'  Murder: {avg_murder:.1f} | Guns: {avg_gun:.1f}<br>'
-                f'  Traffic: {avg_traffic:.1f} per 100k<br>'
+                f'  Murder: {us_averages["murder"]:.1f} | Guns: {us_averages["gun"]:.1f}<br>'
+                f'  Traffic: {us_averages["traffic"]:.1f} per 100k<br>'
                 '<br>'
                 '<b>Data Sources:</b> FBI UCR, CDC, NHTSA<br>'
                 '<i>2022-2023 estimates</i>'
@@ -573,350 +3828,1026 @@ def create_interactive_map():
     ]
     
     fig.update_layout(annotations=annotations)
+    return fig
 
-    print("✨ Generating interactive map with click-to-view functionality...")
-    
-    # Get the figure JSON and properly escape it
-    fig_json = fig.to_json()
-    
-    # Create custom HTML with JavaScript for click handling
-    html_template = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>US Law Severity & Crime Statistics Map</title>
-    <script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
-    <style>
-        body {{
-            margin: 0;
-            padding: 0;
-            font-family: Arial, sans-serif;
-            background-color: #f8f9fa;
-            overflow: hidden;
-        }}
-        #myDiv {{
-            width: 100%;
-            height: 100vh;
-        }}
-        #statsPanel {{
-            position: fixed;
-            top: 50%;
-            right: 20px;
-            transform: translateY(-50%);
-            width: 380px;
-            max-height: 80vh;
-            overflow-y: auto;
-            background: white;
-            border: 3px solid #e74c3c;
-            border-radius: 12px;
-            padding: 25px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            font-family: 'Courier New', monospace;
-            font-size: 13px;
-            line-height: 1.6;
-            display: none;
-            z-index: 1000;
-            color: #2c3e50;
-        }}
-        #statsPanel.visible {{
-            display: block;
-            animation: slideIn 0.3s ease-out;
-        }}
-        @keyframes slideIn {{
-            from {{
-                opacity: 0;
-                transform: translateY(-50%) translateX(50px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(-50%) translateX(0);
-            }}
-        }}
-        #statsPanel h2 {{
-            margin: 0 0 15px 0;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #e74c3c;
-            color: #e74c3c;
-            font-size: 18px;
-        }}
-        #statsPanel .section {{
-            margin: 15px 0;
-            padding: 12px;
-            background: #f8f9fa;
-            border-radius: 6px;
-        }}
-        #statsPanel .section-title {{
-            font-weight: bold;
-            font-size: 14px;
-            color: #2c3e50;
-            margin-bottom: 8px;
-            display: block;
-        }}
-        #statsPanel .stat-row {{
-            margin: 5px 0;
-        }}
-        #statsPanel .stat-label {{
-            font-weight: bold;
-            color: #34495e;
-        }}
-        #statsPanel .stat-value {{
-            color: #2c3e50;
-        }}
-        #statsPanel .us-avg {{
-            color: #7f8c8d;
-            font-size: 11px;
-            font-style: italic;
-            margin-left: 10px;
-        }}
-        #statsPanel .notes {{
-            background: #fff3cd;
-            padding: 10px;
-            border-radius: 6px;
-            border-left: 4px solid #ffc107;
-            margin-top: 10px;
-            font-size: 12px;
-        }}
-        #closePanel {{
-            position: absolute;
-            top: 15px;
-            right: 15px;
-            background: #e74c3c;
-            color: white;
-            border: none;
-            border-radius: 50%;
-            width: 30px;
-            height: 30px;
-            cursor: pointer;
-            font-size: 18px;
-            line-height: 1;
-            font-weight: bold;
-        }}
-        #closePanel:hover {{
-            background: #c0392b;
-        }}
-    </style>
-</head>
-<body>
-    <div id="myDiv"></div>
-    <div id="statsPanel">
-        <button id="closePanel" onclick="closeStatsPanel()">×</button>
-        <div id="panelContent"></div>
-    </div>
-    <script>
-        // State data
-        const stateData = {json.dumps(state_data_dict)};
-        
-        // US Averages
-        const usAverages = {{
-            murder: {avg_murder:.1f},
-            gun: {avg_gun:.1f},
-            traffic: {avg_traffic:.1f}
-        }};
-        
-        // Plot data - embedded as JSON
-        const plotData = {fig_json};
-        const data = plotData.data;
-        const layout = plotData.layout;
-        const config = {{
-            scrollZoom: true,
-            displayModeBar: true,
-            displaylogo: false,
-            responsive: true
-        }};
-        
-        // Create the plot
-        Plotly.newPlot('myDiv', data, layout, config);
-        
-        // Get the plot div
-        var myDiv = document.getElementById('myDiv');
-        var statsPanel = document.getElementById('statsPanel');
-        var panelContent = document.getElementById('panelContent');
-        
-        // State bounds for proper zoom centering (approximate center coordinates)
-        const stateCenters = {{
-            'AL': {{lat: 32.806671, lon: -86.791130, zoom: 6}},
-            'AK': {{lat: 61.370716, lon: -152.404419, zoom: 3.5}},
-            'AZ': {{lat: 33.729759, lon: -111.431221, zoom: 6}},
-            'AR': {{lat: 34.969704, lon: -92.373123, zoom: 6}},
-            'CA': {{lat: 36.116203, lon: -119.681564, zoom: 5}},
-            'CO': {{lat: 39.059811, lon: -105.311104, zoom: 6}},
-            'CT': {{lat: 41.597782, lon: -72.755371, zoom: 7.5}},
-            'DE': {{lat: 39.318523, lon: -75.507141, zoom: 8}},
-            'FL': {{lat: 27.766279, lon: -81.686783, zoom: 6}},
-            'GA': {{lat: 33.040619, lon: -83.643074, zoom: 6}},
-            'HI': {{lat: 21.094318, lon: -157.498337, zoom: 6.5}},
-            'ID': {{lat: 44.240459, lon: -114.478828, zoom: 5.5}},
-            'IL': {{lat: 40.349457, lon: -88.986137, zoom: 6}},
-            'IN': {{lat: 39.849426, lon: -86.258278, zoom: 6.5}},
-            'IA': {{lat: 42.011539, lon: -93.210526, zoom: 6.5}},
-            'KS': {{lat: 38.526600, lon: -96.726486, zoom: 6}},
-            'KY': {{lat: 37.668140, lon: -84.670067, zoom: 6.5}},
-            'LA': {{lat: 31.169546, lon: -91.867805, zoom: 6}},
-            'ME': {{lat: 44.693947, lon: -69.381927, zoom: 6}},
-            'MD': {{lat: 39.063946, lon: -76.802101, zoom: 7}},
-            'MA': {{lat: 42.230171, lon: -71.530106, zoom: 7}},
-            'MI': {{lat: 43.326618, lon: -84.536095, zoom: 5.5}},
-            'MN': {{lat: 45.694454, lon: -93.900192, zoom: 5.5}},
-            'MS': {{lat: 32.741646, lon: -89.678696, zoom: 6}},
-            'MO': {{lat: 38.456085, lon: -92.288368, zoom: 6}},
-            'MT': {{lat: 46.921925, lon: -110.454353, zoom: 5}},
-            'NE': {{lat: 41.125370, lon: -98.268082, zoom: 6}},
-            'NV': {{lat: 38.313515, lon: -117.055374, zoom: 5.5}},
-            'NH': {{lat: 43.452492, lon: -71.563896, zoom: 7}},
-            'NJ': {{lat: 40.298904, lon: -74.521011, zoom: 7}},
-            'NM': {{lat: 34.840515, lon: -106.248482, zoom: 5.5}},
-            'NY': {{lat: 42.165726, lon: -74.948051, zoom: 6}},
-            'NC': {{lat: 35.630066, lon: -79.806419, zoom: 6}},
-            'ND': {{lat: 47.528912, lon: -99.784012, zoom: 6}},
-            'OH': {{lat: 40.388783, lon: -82.764915, zoom: 6.5}},
-            'OK': {{lat: 35.565342, lon: -96.928917, zoom: 6}},
-            'OR': {{lat: 44.572021, lon: -122.070938, zoom: 6}},
-            'PA': {{lat: 40.590752, lon: -77.209755, zoom: 6}},
-            'RI': {{lat: 41.680893, lon: -71.511780, zoom: 8.5}},
-            'SC': {{lat: 33.856892, lon: -80.945007, zoom: 6.5}},
-            'SD': {{lat: 44.299782, lon: -99.438828, zoom: 6}},
-            'TN': {{lat: 35.747845, lon: -86.692345, zoom: 6}},
-            'TX': {{lat: 31.054487, lon: -97.563461, zoom: 5}},
-            'UT': {{lat: 40.150032, lon: -111.862434, zoom: 6}},
-            'VT': {{lat: 44.045876, lon: -72.710686, zoom: 7}},
-            'VA': {{lat: 37.769337, lon: -78.169968, zoom: 6}},
-            'WA': {{lat: 47.400902, lon: -121.490494, zoom: 6}},
-            'WV': {{lat: 38.491226, lon: -80.954453, zoom: 6.5}},
-            'WI': {{lat: 44.268543, lon: -89.616508, zoom: 6}},
-            'WY': {{lat: 42.755966, lon: -107.302490, zoom: 6}}
-        }};
-        
-        function closeStatsPanel() {{
-            statsPanel.classList.remove('visible');
-        }}
-        
-        // Add click event handler
-        myDiv.on('plotly_click', function(eventData) {{
-            if (eventData.points && eventData.points.length > 0) {{
-                const point = eventData.points[0];
-                const stateAbbr = point.location;
-                const state = stateData[stateAbbr];
-                const center = stateCenters[stateAbbr];
-                
-                if (state && center) {{
-                    // Create detailed statistics panel HTML
-                    const panelHTML = `
-                        <h2>📍 ${{state.name}} (${{state.abbr}})</h2>
-                        
-                        <div class="section">
-                            <span class="section-title">⚖️ LAW SEVERITY</span>
-                            <div class="stat-row">
-                                <span class="stat-label">Severity Score:</span>
-                                <span class="stat-value">${{state.severity}}/100 (${{state.category}})</span>
-                            </div>
-                            <div class="stat-row">
-                                <span class="stat-label">Death Penalty:</span>
-                                <span class="stat-value">${{state.death_penalty}}</span>
-                            </div>
-                        </div>
-                        
-                        <div class="section">
-                            <span class="section-title">📊 CRIME STATISTICS (per 100k)</span>
-                            <div class="stat-row">
-                                <span class="stat-label">Murder Rate:</span>
-                                <span class="stat-value">${{state.murder_rate.toFixed(1)}}</span>
-                                <span class="us-avg">(US avg: ${{usAverages.murder}})</span>
-                            </div>
-                            <div class="stat-row">
-                                <span class="stat-label">Gun Deaths:</span>
-                                <span class="stat-value">${{state.gun_death_rate.toFixed(1)}}</span>
-                                <span class="us-avg">(US avg: ${{usAverages.gun}})</span>
-                            </div>
-                            <div class="stat-row">
-                                <span class="stat-label">Traffic Deaths:</span>
-                                <span class="stat-value">${{state.traffic_fatality_rate.toFixed(1)}}</span>
-                                <span class="us-avg">(US avg: ${{usAverages.traffic}})</span>
-                            </div>
-                        </div>
-                        
-                        <div class="section">
-                            <span class="section-title">📈 POPULATION & INCARCERATION</span>
-                            <div class="stat-row">
-                                <span class="stat-label">Population:</span>
-                                <span class="stat-value">${{state.population.toLocaleString()}}</span>
-                            </div>
-                            <div class="stat-row">
-                                <span class="stat-label">Incarceration Rate:</span>
-                                <span class="stat-value">${{state.incarceration_rate}}/100k</span>
-                            </div>
-                        </div>
-                        
-                        <div class="notes">
-                            <strong>📝 Note:</strong> ${{state.notes}}
-                        </div>
-                        
-                        <div style="margin-top: 15px; text-align: center; color: #7f8c8d; font-size: 11px;">
-                            <em>Double-click map to reset view</em>
-                        </div>
-                    `;
-                    
-                    // Update panel content and show it
-                    panelContent.innerHTML = panelHTML;
-                    statsPanel.classList.add('visible');
-                    
-                    // Zoom to state with proper centering
-                    const newLayout = {{
-                        ...layout,
-                        mapbox: {{
-                            ...layout.mapbox,
-                            center: {{lat: center.lat, lon: center.lon}},
-                            zoom: center.zoom
-                        }}
-                    }};
-                    
-                    Plotly.react('myDiv', data, newLayout, config);
-                }}
-            }}
-        }});
-        
-        // Handle double-click to reset
-        myDiv.on('plotly_doubleclick', function() {{
-            // Reset zoom
-            const resetLayout = {{
-                ...layout,
-                mapbox: {{
-                    ...layout.mapbox,
-                    center: {{"lat": 37.0902, "lon": -95.7129}},
-                    zoom: 3
-                }}
-            }};
-            Plotly.react('myDiv', data, resetLayout, config);
-            
-            // Hide stats panel
-            closeStatsPanel();
-        }});
-    </script>
-</body>
-</html>
+
+def create_interactive_map(simplify_tolerance=SIMPLIFY_TOLERANCE, coord_precision=COORD_PRECISION,
+                           geometry_format='topojson', output_mode='inline', output_dir=SPLIT_OUTPUT_DIR,
+                           precompress=True, detail_levels=DETAIL_LEVELS, level='state',
+                           subarea_stats=None, state_stats=None, stats_dataset=STATS_DATASET_PATH,
+                           stats_year=None, time_series=False, color_column='severity', geometry=None,
+                           force=False, open_browser=True, report=None, geometry_encoding='int32',
+                           manifest_path=None):
     """
-    
-    # Save as HTML
+    Generate and display an advanced interactive US law severity map with click-to-view stats.
+
+    Args:
+        simplify_tolerance: Border simplification tolerance in degrees (0 disables).
+        coord_precision: Decimals kept in the embedded GeoJSON coordinates.
+        geometry_format: ``'topojson'`` to embed shared-arc TopoJSON decoded in
+            the browser, ``'geojson'`` to embed plain GeoJSON, or ``'binary'``
+            for typed arrays (base64 inline, a ``.bin`` asset when split).
+        output_mode: ``'inline'`` for the standalone HTML file, or ``'split'``
+            for an HTML shell plus content-hashed assets in ``output_dir``.
+        output_dir: Destination of the split output.
+        precompress: Write max-compression ``.gz``/``.br`` siblings of every
+            artifact and list them in ``asset-manifest.json``.
+        detail_levels: Level-of-detail resolutions lazy-loaded on zoom (split
+            output only; empty to disable).
+        level: ``'state'``, or a ``SUBLEVELS`` key to also drill down into the
+            clicked state's counties/tracts (split output only).
+        subarea_stats: Optional CSV of county/tract statistics keyed by
+            ``GEOID`` (see ``load_subarea_statistics``).
+        state_stats: Optional CSV of state statistics keyed by ``STUSPS``
+            overriding the dataset values (see ``load_state_statistics``).
+        stats_dataset: Statistics CSV/Parquet file (see ``load_statistics``).
+        stats_year: Dataset year to show (defaults to the latest).
+        time_series: Add a year slider over every dataset year, with
+            delta-encoded frames fetched as it moves (split output only).
+        color_column: Numeric statistics column the map is colored by.
+        geometry: ``prepare_geometry`` output to reuse (loaded and simplified
+            with ``simplify_tolerance``/``coord_precision`` when omitted).
+        force: Rebuild every stage even if its inputs are unchanged.
+        open_browser: Open the inline output in the default browser.
+        report: ``BuildReport`` the stage timings are recorded in.
+        geometry_encoding: ``BINARY_ENCODINGS`` coordinate type of the
+            ``'binary'`` geometry format.
+        manifest_path: Also write the inline page's ``asset-manifest.json``
+            here (the split output always writes one into ``output_dir``).
+
+    The build is incremental: when ``map_inputs`` and the options match the
+    last build of the output (and its files are untouched) nothing is
+    rebuilt; otherwise the simplified geometry, joined frame, geometry
+    payload and figure JSON are reused from the store when their own inputs
+    are unchanged.
+
+    Returns:
+        Artifact paths: ``index`` (the HTML file), ``manifest`` when one was
+        written, plus the hashed assets for the split output.
+    """
+    report = report if report is not None else BuildReport()
+    if geometry_format not in GEOMETRY_FORMATS:
+        raise ValueError(f"geometry_format must be one of {GEOMETRY_FORMATS}, got {geometry_format!r}")
+    if geometry_encoding not in BINARY_ENCODINGS:
+        raise ValueError(f"geometry_encoding must be one of {BINARY_ENCODINGS}, got {geometry_encoding!r}")
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"output_mode must be one of {OUTPUT_MODES}, got {output_mode!r}")
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {LEVELS}, got {level!r}")
+    if level != 'state' and output_mode != 'split':
+        raise ValueError(f"level {level!r} requires output_mode 'split'")
+    if time_series and output_mode != 'split':
+        raise ValueError("time_series requires output_mode 'split'")
+    metrics = color_metrics()
+    if color_column not in metrics:
+        raise ValueError(f"color_column must be one of {tuple(metrics)}, got {color_column!r}")
+
+    # Output stage: nothing to do when no input changed since the last build
     output_file = "us_law_severity_map_interactive.html"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_template)
+    if output_mode == 'split':
+        target, root_dir = output_dir, output_dir
+    else:
+        target, root_dir = output_file, os.path.dirname(os.path.abspath(output_file))
+    if geometry_format != 'binary':
+        geometry_encoding = None
+    if output_mode == 'split' or manifest_path is None:
+        manifest_path = None
+    else:
+        manifest_path = os.path.abspath(manifest_path)
+    options = [geometry_format, geometry_encoding, output_mode, precompress, level, time_series, color_column,
+               manifest_path]
+
+    def fingerprint():
+        inputs = map_inputs(simplify_tolerance, coord_precision, stats_dataset, stats_year, state_stats,
+                            detail_levels if output_mode == 'split' else None, level, subarea_stats)
+        return inputs, stage_key('output', inputs, options)
+
+    with report.stage('fingerprint'):
+        inputs, key = fingerprint()
+        state = None if force else read_build_state(target, key)
+    if state is not None:
+        artifacts, report.manifest = state
+        report.up_to_date = True
+        print(f"✓ Up to date: no input changed since '{artifacts['index']}' was built (--force rebuilds)")
+        return artifacts
+
+    if geometry is None:
+        with report.stage('geometry'):
+            geometry = prepare_geometry(simplify_tolerance, coord_precision,
+                                        detail_levels if output_mode == 'split' else None, force, report)
+    gdf = geometry['states']
+    geometry_key = geometry.get('key')
+
+    # Get state statistics and join them onto the geometry in one merge; the
+    # joined frame is cached per geometry and statistics inputs
+    with report.stage('statistics'):
+        joined_key = geometry_key and stage_key('joined', geometry_key, inputs['statistics'])
+        joined_path = joined_key and geometry_store_path(joined_key, prefix='joined')
+        joined = None if force or not joined_key else _read_store_frame(joined_path)
+        if joined is not None:
+            print(f"✓ Statistics unchanged, loaded joined frame {joined_path}")
+            gdf = joined
+            stats_df = pd.DataFrame(gdf[['STUSPS', *stat_dtypes()]])
+        else:
+            stats_df = get_state_statistics_frame(stats_year, stats_dataset)
+            if state_stats:
+                stats_df = load_state_statistics(state_stats, stats_df)
+            gdf = join_statistics(gdf, stats_df)
+            if joined_key:
+                _write_store_frame(gdf, joined_path)
+
+        series_df = None
+        if time_series:
+            schema = load_stats_schema()
+            period = schema['period']
+            series_df = load_statistics(stats_dataset, schema)
+            current_year = int(series_df[period].max()) if stats_year is None else stats_year
+            # The year on screen keeps any --state-stats overrides
+            series_df = pd.concat([series_df[series_df[period] != current_year],
+                                   stats_df.assign(**{period: current_year})], ignore_index=True)
+            if series_df[period].nunique() < 2:
+                print(f"⚠️  {stats_dataset} has a single {period}, time series skipped")
+                series_df = None
+
+        # Calculate US averages for context
+        us_averages = statistics_averages(stats_df)
+
+    # Prepare data for Plotly
+    print("🎨 Creating interactive visualization with click-to-view statistics...")
+
+    # Geometry payload, kept out of the figure and attached to the trace in the
+    # browser (TopoJSON is decoded there first); depends on the geometry only
+    with report.stage('payload') as stage:
+        payload_path = geometry_key and geometry_store_path(
+            stage_key('payload', geometry_key, geometry_format, geometry_encoding, coord_precision),
+            prefix='payload', suffix='.bin' if geometry_format == 'binary' else '.json')
+        geometry_json = None
+        if payload_path and not force and os.path.exists(payload_path):
+            with open(payload_path, 'rb') as f:
+                geometry_json = f.read()
+        if geometry_json is None:
+            geometry_json = geometry_payload(gdf, geometry_format, coord_precision, encoding=geometry_encoding)
+            if payload_path:
+                _write_store_file(payload_path, geometry_json)
+
+        stage['bytes'] = len(geometry_json)
+
+        # Prepare state data as JSON for JavaScript
+        state_data_dict = state_records(gdf)
+
+    # Figure JSON, rebuilt when the joined frame, metric or renderer changes
+    with report.stage('figure') as stage:
+        figure_path = joined_key and geometry_store_path(
+            stage_key('figure', joined_key, color_column, time_series, inputs['renderer']),
+            prefix='figure', suffix='.json')
+        figure_json = None
+        if figure_path and not force and os.path.exists(figure_path):
+            with open(figure_path, 'rb') as f:
+                figure_json = f.read()
+        if figure_json is None:
+            # One color range for every year, so colors compare across the slider
+            zrange = None if series_df is None else (series_df[color_column].min(),
+                                                     series_df[color_column].max())
+            figure_json = build_figure(gdf, color_column, us_averages, zrange).to_json().encode('utf-8')
+            if figure_path:
+                _write_store_file(figure_path, figure_json)
+        stage['bytes'] = len(figure_json)
+
+    print("✨ Generating interactive map with click-to-view functionality...")
     
+    # Per-state statistics for the click panel. The split output ships each
+    # state's record as its own shard, so the initial payload only carries what
+    # the choropleth needs to color the map.
+    with report.stage('views') as stage:
+        stats_payload = {
+            'usAverages': us_averages,
+            'views': views_payload(compute_views(gdf)),
+        }
+        stage['bytes'] = len(dumps_json(stats_payload['views']))
+
+    if output_mode == 'split':
+        sublevel = None
+        if level != 'state':
+            print(f"🏘️  Building {level} drill-down shards...")
+            with report.stage('subareas'):
+                sublevel = write_subarea_shards(
+                    output_dir, level, gdf, stats_df,
+                    load_subarea_statistics(subarea_stats) if subarea_stats else None,
+                )
+            # Same column and color range as the state trace, so areas match their state
+            sublevel.update(column=color_column, zmin=float(gdf[color_column].min()),
+                            zmax=float(gdf[color_column].max()))
+        series = None
+        if series_df is not None:
+            years = sorted(int(year) for year in series_df[period].unique())
+            series = {
+                'frames': timeseries_frames(series_df, gdf['STUSPS'].tolist(), color_column, period=period),
+                'years': years,
+                'keyframes': years[::TIMESERIES_KEYFRAME_INTERVAL],
+                'current': current_year,
+            }
+        with report.stage('write') as stage:
+            # The figure JSON is spliced into the stats payload, not parsed and re-serialized
+            stats_json = json_object(stats_payload, raw={'figure': figure_json})
+            assets = write_split_assets(output_dir, geometry_json, stats_json,
+                                        state_records=state_data_dict, precompress=precompress,
+                                        detail_levels=detail_levels, sublevel=sublevel, time_series=series,
+                                        detail_geometries=geometry['detail'], geometry_format=geometry_format)
+            with open(assets['manifest'], encoding='utf-8') as f:
+                report.manifest = json.load(f)
+            write_build_state(target, fingerprint()[1], assets, root_dir, report.manifest)
+            stage['bytes'] = sum(os.path.getsize(path) for path in _build_files(root_dir, assets, report.manifest))
+        print(f"\n✅ Interactive map written to '{assets['index']}' with hashed assets:")
+        for name, path in assets.items():
+            if name != 'index':
+                print(f"    {path}")
+        print(f"💡 Serve '{output_dir}' over HTTP: python main.py serve --dir {output_dir}")
+        return assets
+
+    with report.stage('write') as stage:
+        # Stream the page to disk around the serialized payloads
+        stats_payload['stateData'] = state_data_dict
+        if geometry_format == 'binary':
+            geometry_json = b'"' + base64.b64encode(geometry_json) + b'"'
+        with report.stage('page'):
+            write_inline_html(output_file, figure_json, geometry_json, json_object(stats_payload))
+        # The manifest only matters for uploads, so a plain inline build doesn't leave one behind
+        artifacts = {'index': output_file}
+        cache_controls = {output_file: HTML_CACHE_CONTROL}
+        with report.stage('manifest'):
+            if manifest_path:
+                artifacts['manifest'], report.manifest = write_manifest(root_dir, cache_controls, precompress,
+                                                                        manifest_path)
+            else:
+                report.manifest = artifact_manifest(root_dir, cache_controls, precompress)
+        write_build_state(target, fingerprint()[1], artifacts, root_dir, report.manifest)
+        stage['bytes'] = sum(os.path.getsize(path) for path in _build_files(root_dir, artifacts, report.manifest))
+
     print(f"\n✅ Interactive map saved as '{output_file}'")
-    print("💡 Open the HTML file in any modern browser!")
-    print("📊 Click any state to zoom in and see detailed statistics!")
-    
-    # Open in browser
-    import webbrowser
-    webbrowser.open('file://' + os.path.abspath(output_file))
+    if open_browser:
+        print("💡 Open the HTML file in any modern browser!")
+        print("📊 Click any state to zoom in and see detailed statistics!")
+        import webbrowser
+        webbrowser.open('file://' + os.path.abspath(output_file))
+    return artifacts
+
+
+def build_map(log=None, report=None, **options):
+    """
+    Build the map without a browser or console output and describe the result.
+
+    Meant for CI jobs and automation running many builds: ``options`` are
+    ``create_interactive_map`` arguments, and the progress lines that would be
+    printed are discarded, or sent to ``log`` (a text stream, or a ``JsonLog``
+    that also receives a ``stage`` record per stage). Pass a ``report`` to
+    profile the stages or export them afterwards (see ``BuildReport``).
+
+    Returns:
+        Dict with ``artifacts`` (name -> path, ``index`` first), ``up_to_date``,
+        ``seconds`` (wall time), ``cpu_seconds``, ``peak_rss_bytes``,
+        ``stages`` (``BuildReport`` records), ``files`` (path -> bytes for
+        every file the build wrote, precompressed siblings and any manifest
+        included) and ``bytes`` (total raw size of the artifacts and, per
+        encoding, of their siblings).
+    """
+    if report is None:
+        report = BuildReport()
+    if report.log is None and isinstance(log, JsonLog):
+        report.log = log
+    start, cpu = time.perf_counter(), time.process_time()
+    with contextlib.ExitStack() as stack:
+        stream = log if log is not None else stack.enter_context(open(os.devnull, 'w', encoding='utf-8'))
+        stack.enter_context(contextlib.redirect_stdout(stream))
+        artifacts = create_interactive_map(**options, open_browser=False, report=report)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu
+
+    root_dir = os.path.dirname(os.path.abspath(artifacts['index']))
+    manifest = report.manifest
+    sizes = {'raw': sum(entry['size'] for entry in manifest.values())}
+    for entry in manifest.values():
+        for encoding, sibling in entry.get('encodings', {}).items():
+            sizes[encoding] = sizes.get(encoding, 0) + sibling['size']
+    return {
+        'artifacts': {'index': artifacts['index'], **artifacts},
+        'up_to_date': report.up_to_date,
+        'seconds': round(seconds, 4),
+        'cpu_seconds': round(cpu_seconds, 4),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'stages': report.stages,
+        'files': {path: os.path.getsize(path) for path in _build_files(root_dir, artifacts, manifest)},
+        'bytes': sizes,
+    }
+
+
+# Build context shared with the batch workers (set by the pool initializer)
+_BATCH_CONTEXT = {}
+
+
+def _init_batch_worker(context):
+    """Pool initializer; under ``fork`` the context is inherited, not pickled."""
+    _BATCH_CONTEXT.update(context)
+
+
+def _render_variant(variant):
+    """Render one ``(metric, year, level)`` variant and return its timing record."""
+    metric, year, level = variant
+    context = _BATCH_CONTEXT
+    output_dir = os.path.join(context['output_dir'], f"{metric}-{year}-{level}")
+    record = {'metric': metric, 'year': year, 'level': level, 'output_dir': output_dir, 'pid': os.getpid()}
+    wall, cpu = time.perf_counter(), time.process_time()
+    report = BuildReport()
+    try:
+        # Worker logs would interleave; the batch prints one line per variant
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_interactive_map(context['simplify_tolerance'], context['coord_precision'],
+                                   output_mode='split', output_dir=output_dir,
+                                   precompress=context['precompress'], detail_levels=context['detail_levels'],
+                                   level=level, subarea_stats=context['subarea_stats'],
+                                   stats_dataset=context['stats_dataset'], stats_year=year,
+                                   color_column=metric, geometry=context['geometry'],
+                                   force=context['force'], report=report)
+    except Exception as exc:
+        record['error'] = f"{type(exc).__name__}: {exc}"
+    record['seconds'] = round(time.perf_counter() - wall, 3)
+    record['cpu_seconds'] = round(time.process_time() - cpu, 3)
+    record['up_to_date'] = report.up_to_date
+    record['stages'] = report.stages
+    return record
+
+
+def render_batch(metrics=BATCH_METRICS, years=None, levels=('state',), output_dir=BATCH_OUTPUT_DIR,
+                 workers=None, simplify_tolerance=SIMPLIFY_TOLERANCE, coord_precision=COORD_PRECISION,
+                 precompress=True, detail_levels=DETAIL_LEVELS, subarea_stats=None,
+                 stats_dataset=STATS_DATASET_PATH, force=False):
+    """
+    Render every metric x year x level map variant in a process pool.
+
+    The simplified state geometry and level-of-detail frames are loaded once
+    here and handed to the workers: with the ``fork`` start method they share
+    the parent's memory copy-on-write, elsewhere the context is pickled once
+    per worker (not per variant). Each variant is a split build colored by
+    its metric in ``<output_dir>/<metric>-<year>-<level>/``.
+
+    Args:
+        metrics: ``color_metrics()`` columns to color by.
+        years: Dataset years (defaults to every year in the dataset).
+        levels: ``LEVELS`` to build.
+        workers: Pool size (defaults to the CPU count; 1 renders in-process).
+        force: Rebuild variants whose inputs are unchanged (see
+            ``create_interactive_map``).
+
+    Returns:
+        Per-variant records (``metric``, ``year``, ``level``, ``output_dir``,
+        ``pid``, ``seconds``, ``cpu_seconds``, ``up_to_date``, ``stages`` as
+        in ``BuildReport`` and ``error`` on failure), also
+        written with the totals to ``<output_dir>/batch-report.json``.
+    """
+    unknown = sorted(set(metrics) - set(color_metrics()))
+    if unknown:
+        raise ValueError(f"unknown metric(s) {', '.join(unknown)}; choose from {', '.join(color_metrics())}")
+    unknown = sorted(set(levels) - set(LEVELS))
+    if unknown:
+        raise ValueError(f"unknown level(s) {', '.join(unknown)}; choose from {', '.join(LEVELS)}")
+    period = load_stats_schema()['period']
+    available = sorted(int(year) for year in load_statistics(stats_dataset)[period].unique())
+    years = available if not years else [int(year) for year in years]
+    missing = sorted(set(years) - set(available))
+    if missing:
+        raise ValueError(f"{stats_dataset} has no rows for {period} {', '.join(map(str, missing))}")
+
+    variants = [(metric, year, level) for metric in metrics for year in years for level in levels]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(variants)))
+    context = {
+        'geometry': prepare_geometry(simplify_tolerance, coord_precision, detail_levels, force),
+        'output_dir': output_dir,
+        'simplify_tolerance': simplify_tolerance,
+        'coord_precision': coord_precision,
+        'precompress': precompress,
+        'detail_levels': detail_levels,
+        'subarea_stats': subarea_stats,
+        'stats_dataset': stats_dataset,
+        'force': force,
+    }
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    print(f"🏭 Rendering {len(variants)} variant(s) with {workers} worker(s)"
+          f"{f' ({start_method})' if workers > 1 and start_method else ''}...")
+    started = time.perf_counter()
+    if workers == 1:
+        _init_batch_worker(context)
+        results = map(_render_variant, variants)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method),
+                                   initializer=_init_batch_worker, initargs=(context,))
+        results = pool.map(_render_variant, variants)
+    records = []
+    try:
+        for record in results:
+            records.append(record)
+            status = f"❌ {record['error']}" if 'error' in record else f"→ {record['output_dir']}"
+            print(f"   {record['metric']:<22} {record['year']} {record['level']:<7} "
+                  f"{record['seconds']:7.2f} s (cpu {record['cpu_seconds']:.2f} s) {status}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    wall = time.perf_counter() - started
+
+    failed = sum('error' in record for record in records)
+    print(f"✓ {len(records) - failed}/{len(records)} variant(s) in {wall:.2f} s wall; per variant "
+          f"{sum(record['seconds'] for record in records):.2f} s wall / "
+          f"{sum(record['cpu_seconds'] for record in records):.2f} s CPU in total")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with open(os.path.join(output_dir, BATCH_REPORT_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'workers': workers, 'start_method': start_method if workers > 1 else None,
+                   'wall_seconds': round(wall, 3), 'variants': records}, f, indent=2)
+    return records
+
+
+def _split_list(value):
+    return [name for name in value.split(',') if name]
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line options.
+
+    The first argument selects a ``CLI_COMMANDS`` subcommand; without one the
+    arguments are parsed as ``build`` options, so ``python main.py
+    --output-mode split`` keeps working.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate the US law severity map.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    build = commands.add_parser('build', help="Build the map (default command)",
+                                description="Build the map, or one of the --batch/--vector-tiles/"
+                                            "--webapp-* exports.")
+    build.add_argument('--geometry-format', choices=GEOMETRY_FORMATS, default='topojson',
+                       help="Geometry encoding embedded in the page (default: topojson)")
+    build.add_argument('--geometry-encoding', choices=BINARY_ENCODINGS, default='int32',
+                       help="Coordinate type of --geometry-format binary: quantized int32 deltas "
+                            "or float32 lon/lat (default: int32)")
+    build.add_argument('--simplify-tolerance', type=float, default=SIMPLIFY_TOLERANCE,
+                       help=f"Border simplification tolerance in degrees (default: {SIMPLIFY_TOLERANCE})")
+    build.add_argument('--precision', type=int, default=COORD_PRECISION,
+                       help=f"Coordinate decimals kept in the output (default: {COORD_PRECISION})")
+    build.add_argument('--output-mode', choices=OUTPUT_MODES, default='inline',
+                       help="Single HTML file, or HTML shell + content-hashed assets (default: inline)")
+    build.add_argument('--output-dir', default=SPLIT_OUTPUT_DIR,
+                       help=f"Directory for --output-mode split (default: {SPLIT_OUTPUT_DIR})")
+    build.add_argument('--no-precompress', dest='precompress', action='store_false',
+                       help="Skip writing .gz/.br siblings of the output files")
+    build.add_argument('--manifest', metavar='PATH',
+                       help="Also write the inline page's asset manifest (Content-Type, Cache-Control, "
+                            "encodings) here; split output always writes one")
+    build.add_argument('--detail-levels', default=','.join(DETAIL_LEVELS),
+                       help="Comma-separated zoom detail resolutions for split output "
+                            f"(default: {','.join(DETAIL_LEVELS)}; empty to disable)")
+    build.add_argument('--level', choices=LEVELS, default='state',
+                       help="Drill down into counties or tracts on click (split output only; default: state)")
+    build.add_argument('--subarea-stats', metavar='CSV',
+                       help="County/tract statistics keyed by GEOID for --level county/tract")
+    build.add_argument('--stats-dataset', default=STATS_DATASET_PATH, metavar='PATH',
+                       help="Statistics dataset (CSV or Parquet, typed by statistics/schema.json; "
+                            "default: statistics/states.csv)")
+    build.add_argument('--stats-year', type=int,
+                       help="Dataset year to show (default: the latest)")
+    build.add_argument('--color-by', choices=color_metrics(), default='severity',
+                       help="Statistic the map is colored by (default: severity)")
+    build.add_argument('--batch', action='store_true',
+                       help="Only render every --metrics x --years x --levels variant in parallel "
+                            f"(split output under {BATCH_OUTPUT_DIR})")
+    build.add_argument('--metrics', default=','.join(BATCH_METRICS),
+                       help=f"Comma-separated metrics for --batch (default: {','.join(BATCH_METRICS)})")
+    build.add_argument('--years', default='',
+                       help="Comma-separated years for --batch (default: every dataset year)")
+    build.add_argument('--levels', default='state',
+                       help=f"Comma-separated levels for --batch (from: {', '.join(LEVELS)}; default: state)")
+    build.add_argument('--workers', type=int,
+                       help="Worker processes for --batch (default: CPU count)")
+    build.add_argument('--force', action='store_true',
+                       help="Rebuild every stage even if its inputs are unchanged")
+    build.add_argument('--no-browser', dest='browser', action='store_false',
+                       help="Don't open the inline output in a browser")
+    build.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                       help="Progress as text, or as JSON records (one per line, ending with a "
+                            "'result' record; implies --no-browser; default: text)")
+    build.add_argument('--profile', choices=PROFILERS,
+                       help="Profile each build stage (pyinstrument must be installed for pyinstrument)")
+    build.add_argument('--profile-dir', default=PROFILE_DIR,
+                       help=f"Where --profile writes <stage>.prof / <stage>.html (default: {PROFILE_DIR})")
+    build.add_argument('--metrics-file', metavar='PATH',
+                       help="Write per-stage wall/CPU time, peak memory and bytes: Prometheus text "
+                            "for a .prom path, JSON otherwise")
+    build.add_argument('--time-series', action='store_true',
+                       help="Add a year slider over every dataset year (split output only)")
+    build.add_argument('--state-stats', metavar='CSV',
+                       help="State statistics keyed by STUSPS overriding the dataset values "
+                            "(e.g. ingest output)")
+    build.add_argument('--vector-tiles', metavar='PATH',
+                       help="Only export vector tiles to a .pmtiles or .mbtiles archive")
+    build.add_argument('--tile-layers', default='states',
+                       help=f"Comma-separated layers for --vector-tiles (from: {', '.join(TILE_LAYERS)}; "
+                            "default: states)")
+    build.add_argument('--webapp-topojson', nargs='?', const=WEBAPP_TOPOJSON_PATH, metavar='PATH',
+                       help="Only write the webapp TopoJSON and state views "
+                            f"(default path: {WEBAPP_TOPOJSON_PATH})")
+    build.add_argument('--webapp-data', action='store_true',
+                       help=f"Only generate {WEBAPP_STATS_TS_PATH} and {WEBAPP_STATES_DIR}/<ABBR>.json "
+                            "from the statistics dataset")
+
+    ingest = commands.add_parser('ingest', help="Aggregate incident extracts into per-100k rates",
+                                 description="Aggregate incident CSV/Parquet files into per-100k rates.")
+    ingest.add_argument('files', nargs='+', metavar='FILE')
+    ingest.add_argument('--level', choices=INCIDENT_KEY_COLUMNS, default='state',
+                        help="Areas to count incidents in (county needs --subarea-stats; default: state)")
+    ingest.add_argument('--subarea-stats', metavar='CSV',
+                        help="County statistics keyed by GEOID with a population column")
+    ingest.add_argument('--output', metavar='CSV',
+                        help=f"Output CSV (default: {INCIDENT_OUTPUT_TEMPLATE.format(level='<level>')})")
+    ingest.add_argument('--years', type=float, default=1,
+                        help="Years covered by the incident files, to annualize rates (default: 1)")
+    ingest.add_argument('--workers', type=int,
+                        help="Threads locating incident coordinates (default: CPU count)")
+
+    serve = commands.add_parser('serve', help="Serve a split build and render map variants on demand",
+                                description="Serve a split build directory over HTTP, and render "
+                                            f"{SERVE_MAP_PREFIX}<metric>/<year>/<level>/ on first request.")
+    serve.add_argument('--dir', default=SPLIT_OUTPUT_DIR,
+                       help=f"Directory to serve (default: {SPLIT_OUTPUT_DIR})")
+    serve.add_argument('--host', default=SERVE_HOST, help=f"Bind address (default: {SERVE_HOST})")
+    serve.add_argument('--port', type=int, default=SERVE_PORT, help=f"Port (default: {SERVE_PORT})")
+    serve.add_argument('--cache-dir', default=SERVE_CACHE_DIR,
+                       help=f"Where rendered variants are kept (default: {SERVE_CACHE_DIR})")
+    serve.add_argument('--memory-cache-mb', type=float, default=SERVE_MEMORY_CACHE_MB,
+                       help=f"In-memory response cache size (default: {SERVE_MEMORY_CACHE_MB})")
+    serve.add_argument('--disk-cache-mb', type=float, default=SERVE_DISK_CACHE_MB,
+                       help=f"Rendered variants kept on disk (default: {SERVE_DISK_CACHE_MB})")
+    serve.add_argument('--workers', type=int, help="Render processes (default: CPU count)")
+    serve.add_argument('--geometry-format', choices=GEOMETRY_FORMATS, default='topojson',
+                       help="Geometry encoding of rendered variants (default: topojson)")
+    serve.add_argument('--detail-levels', default=','.join(DETAIL_LEVELS),
+                       help=f"Zoom detail resolutions of rendered variants (default: {','.join(DETAIL_LEVELS)})")
+    serve.add_argument('--subarea-stats', metavar='CSV',
+                       help="County/tract statistics keyed by GEOID for county/tract variants")
+    serve.add_argument('--stats-dataset', default=STATS_DATASET_PATH, metavar='PATH',
+                       help="Statistics dataset (default: statistics/states.csv)")
+    serve.add_argument('--no-precompress', dest='precompress', action='store_false',
+                       help="Skip the .gz/.br siblings (served when the client accepts them)")
+
+    bench = commands.add_parser('bench', help="Run a benchmark from benchmarks/",
+                                description="Run benchmarks/bench_<NAME>.py; remaining arguments "
+                                            "are passed to it.")
+    bench.add_argument('name', choices=benchmark_names(), metavar='NAME',
+                       help=f"Benchmark to run ({', '.join(benchmark_names())})")
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER, metavar='...')
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in (*CLI_COMMANDS, '-h', '--help'):
+        argv = ['build', *argv]
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        if args.level == 'county' and not args.subarea_stats:
+            ingest.error("--level county requires --subarea-stats with a population column")
+        if args.years <= 0:
+            ingest.error("--years must be positive")
+        if args.workers is not None and args.workers < 1:
+            ingest.error("--workers must be at least 1")
+    if args.command == 'serve':
+        levels = _split_list(args.detail_levels)
+        unknown = sorted(set(levels) - set(DETAIL_LEVELS))
+        if unknown:
+            serve.error(f"unknown detail level(s) {', '.join(unknown)}; choose from {', '.join(DETAIL_LEVELS)}")
+        args.detail_levels = {name: DETAIL_LEVELS[name] for name in levels}
+        if args.workers is not None and args.workers < 1:
+            serve.error("--workers must be at least 1")
+    if args.command != 'build':
+        return args
+
+    levels = _split_list(args.detail_levels)
+    unknown = sorted(set(levels) - set(DETAIL_LEVELS))
+    if unknown:
+        build.error(f"unknown detail level(s) {', '.join(unknown)}; choose from {', '.join(DETAIL_LEVELS)}")
+    args.detail_levels = {name: DETAIL_LEVELS[name] for name in levels}
+    if args.level != 'state' and args.output_mode != 'split':
+        build.error(f"--level {args.level} requires --output-mode split")
+    if args.time_series and args.output_mode != 'split':
+        build.error("--time-series requires --output-mode split")
+    if args.subarea_stats and args.level == 'state':
+        build.error("--subarea-stats requires --level county or tract")
+    args.metrics = _split_list(args.metrics)
+    unknown = sorted(set(args.metrics) - set(color_metrics()))
+    if unknown:
+        build.error(f"unknown metric(s) {', '.join(unknown)}; choose from {', '.join(color_metrics())}")
+    args.levels = _split_list(args.levels)
+    unknown = sorted(set(args.levels) - set(LEVELS))
+    if unknown:
+        build.error(f"unknown level(s) {', '.join(unknown)}; choose from {', '.join(LEVELS)}")
+    try:
+        args.years = [int(year) for year in _split_list(args.years)]
+    except ValueError:
+        build.error(f"--years must be comma-separated years, got {args.years!r}")
+    if args.workers is not None and args.workers < 1:
+        build.error("--workers must be at least 1")
+    args.tile_layers = _split_list(args.tile_layers)
+    unknown = sorted(set(args.tile_layers) - set(TILE_LAYERS))
+    if unknown:
+        build.error(f"unknown tile layer(s) {', '.join(unknown)}; choose from {', '.join(TILE_LAYERS)}")
+    if args.vector_tiles and not args.vector_tiles.endswith(TILE_FORMATS):
+        build.error(f"--vector-tiles must end in {' or '.join(TILE_FORMATS)}")
+    if args.profile == 'pyinstrument':
+        import importlib.util
+        if importlib.util.find_spec('pyinstrument') is None:
+            build.error("--profile pyinstrument requires the pyinstrument package (pip install pyinstrument)")
+    return args
+
+
+def benchmark_names(bench_dir=BENCH_DIR):
+    """Names of the ``bench_<name>.py`` scripts in ``bench_dir``."""
+    return sorted(path.stem[len('bench_'):] for path in Path(bench_dir).glob('bench_*.py'))
+
+
+class ResponseCache:
+    """
+    Byte-bounded LRU of file responses for ``MapServer``.
+
+    Entries are keyed by file path and carry the file's ``(mtime_ns, size)``
+    signature, so a file rewritten or deleted on disk is never served stale.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, signature):
+        entry = self._entries.get(key)
+        if entry is None or entry['signature'] != signature:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if len(entry['body']) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous['body'])
+        self._entries[key] = entry
+        self.size += len(entry['body'])
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted['body'])
+
+
+class MapServer:
+    """
+    asyncio HTTP server for a split build plus map variants rendered on demand.
+
+    ``/map/<metric>/<year>/<level>/`` is rendered on its first request by
+    ``build_map`` (split output in ``<cache_dir>/<metric>-<year>-<level>/``)
+    in a process pool, so renders neither block the event loop nor share
+    stdout with it. Concurrent requests for a variant that is still rendering
+    wait on the same render. Rendered variants are kept on disk up to
+    ``disk_cache_mb``, least recently used first out; variants found on disk
+    at startup are checked with an (incremental, usually no-op) build on
+    first use. Every other path is a file of ``directory``.
+
+    File responses are held in a ``ResponseCache`` of ``memory_cache_mb``
+    and carry a strong ``ETag`` (SHA-256 of the body), answered with ``304``
+    on ``If-None-Match``. ``Content-Type``, ``Cache-Control`` and the
+    precompressed siblings come from each build's ``asset-manifest.json``.
+    """
+
+    def __init__(self, directory=SPLIT_OUTPUT_DIR, cache_dir=SERVE_CACHE_DIR,
+                 memory_cache_mb=SERVE_MEMORY_CACHE_MB, disk_cache_mb=SERVE_DISK_CACHE_MB, workers=None,
+                 **build_options):
+        self.directory = os.path.abspath(directory)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.responses = ResponseCache(int(memory_cache_mb * 1024 * 1024))
+        self.disk_budget = int(disk_cache_mb * 1024 * 1024)
+        self.workers = workers or os.cpu_count() or 1
+        self.build_options = build_options
+        self.variants = collections.OrderedDict()  # name -> bytes on disk, least recently used first
+        self.fresh = set()  # variants built or checked by this server
+        self.pending = {}  # name -> future of the render in flight
+        self.years = ()
+        self.executor = None
+        self._manifests = {}
+
+    def _scan_cache(self):
+        """Account for variants left in ``cache_dir`` by earlier runs, oldest first."""
+        found = []
+        for path in Path(self.cache_dir).glob(f"*/{MANIFEST_NAME}"):
+            found.append((path.stat().st_mtime, path.parent.name,
+                          sum(os.path.getsize(p) for p in _manifest_files(str(path.parent)))))
+        for _, name, size in sorted(found):
+            self.variants[name] = size
+
+    def _new_executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: forking a process that runs an event loop (and its threads) is unsafe
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def serve(self, host=SERVE_HOST, port=SERVE_PORT):
+        """Listen on ``host``:``port`` until cancelled."""
+        period = load_stats_schema()['period']
+        dataset = self.build_options.get('stats_dataset', STATS_DATASET_PATH)
+        self.years = tuple(sorted(int(year) for year in load_statistics(dataset)[period].unique()))
+        self._scan_cache()
+        self.executor = self._new_executor()
+        try:
+            server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                bound = server.sockets[0].getsockname()[1]
+                print(f"🌐 Serving '{self.directory}' at http://{host}:{bound}/ and on-demand maps at "
+                      f"http://{host}:{bound}{SERVE_MAP_PREFIX}<metric>/<year>/<level>/ (Ctrl+C to stop)")
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """Answer HTTP/1.1 requests on one connection (keep-alive aware)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 'GET', 400, {}, b"Bad request\n", keep_alive=False)
+                    break
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                if method not in ('GET', 'HEAD'):
+                    await self._send(writer, method, 405, {'Allow': 'GET, HEAD'}, b"Method not allowed\n",
+                                     keep_alive=False)
+                    break
+                status, response_headers, body = await self.respond(target, headers)
+                await self._send(writer, method, status, response_headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, method, status, headers, body, keep_alive):
+        from http import HTTPStatus
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status >= 400:
+            lines.append("Content-Type: text/plain; charset=utf-8")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD' and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+    async def respond(self, target, headers):
+        """Return ``(status, headers, body)`` for a GET of ``target``."""
+        from urllib.parse import unquote, urlsplit
+        path = unquote(urlsplit(target).path)
+        if not path.startswith(SERVE_MAP_PREFIX):
+            return await self.file_response(self.directory, path, headers)
+
+        parts = path[len(SERVE_MAP_PREFIX):].split('/', 3)
+        if len(parts) == 3 and all(parts):
+            return 301, {'Location': path + '/'}, b""
+        metric, year, level = (parts + ['', '', ''])[:3]
+        if len(parts) < 4 or metric not in color_metrics() or level not in LEVELS \
+                or not year.isdigit() or int(year) not in self.years:
+            usage = (f"Maps are served at {SERVE_MAP_PREFIX}<metric>/<year>/<level>/\n"
+                     f"  metrics: {', '.join(color_metrics())}\n"
+                     f"  years: {', '.join(map(str, self.years))}\n"
+                     f"  levels: {', '.join(LEVELS)}\n")
+            return 404, {}, usage.encode('utf-8')
+        try:
+            root = await self.variant_dir(metric, int(year), level)
+        except Exception as exc:
+            return 500, {}, f"Rendering failed: {type(exc).__name__}: {exc}\n".encode('utf-8')
+        return await self.file_response(root, parts[3], headers)
+
+    async def variant_dir(self, metric, year, level):
+        """Directory of a rendered variant, rendering it (once) if needed."""
+        name = f"{metric}-{year}-{level}"
+        if name not in self.fresh:
+            future = self.pending.get(name)
+            if future is None:
+                future = asyncio.ensure_future(self._render(name, metric, year, level))
+                self.pending[name] = future
+                future.add_done_callback(lambda _: self.pending.pop(name, None))
+            # A client hanging up must not cancel the render other requests wait on
+            await asyncio.shield(future)
+        if name in self.variants:
+            self.variants.move_to_end(name)
+        return os.path.join(self.cache_dir, name)
+
+    async def _render(self, name, metric, year, level):
+        from concurrent.futures.process import BrokenProcessPool
+        start = time.perf_counter()
+        executor = self.executor
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, functools.partial(
+                build_map, output_mode='split', output_dir=os.path.join(self.cache_dir, name),
+                color_column=metric, stats_year=year, level=level, **self.build_options))
+        except Exception as exc:
+            print(f"❌ Rendering {name} failed: {type(exc).__name__}: {exc}")
+            if isinstance(exc, BrokenProcessPool) and self.executor is executor:
+                # A worker died (e.g. killed for memory); later renders get a new pool
+                self.executor = self._new_executor()
+            raise
+        self.fresh.add(name)
+        self.variants[name] = sum(result['files'].values())
+        self.variants.move_to_end(name)
+        status = "up to date" if result['up_to_date'] else f"{self.variants[name]:,} bytes"
+        print(f"🗺️  {name}: {status} in {time.perf_counter() - start:.2f} s")
+        self._evict(keep=name)
+
+    def _evict(self, keep):
+        """Delete least recently used variants until the disk cache fits its budget."""
+        total = sum(self.variants.values())
+        for name in list(self.variants):
+            if total <= self.disk_budget:
+                break
+            if name == keep or name in self.pending:
+                continue
+            total -= self.variants.pop(name)
+            self.fresh.discard(name)
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            print(f"🧹 Evicted {name} ({total:,} bytes cached)")
+
+    def _manifest(self, root):
+        """``asset-manifest.json`` of ``root`` (re-read when it changes), or an empty dict."""
+        path = os.path.join(root, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        cached = self._manifests.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, encoding='utf-8') as f:
+                cached = self._manifests[path] = (mtime, json.load(f))
+        return cached[1]
+
+    async def file_response(self, root, rel_path, headers):
+        """Serve ``rel_path`` under ``root`` (a directory serves its ``index.html``)."""
+        rel_path = posixpath.normpath('/' + rel_path).lstrip('/')
+        if not rel_path or os.path.isdir(os.path.join(root, rel_path)):
+            rel_path = posixpath.join(rel_path, 'index.html')
+        entry = self._manifest(root).get(rel_path, {})
+        accepted = {value.split(';')[0].strip() for value in headers.get('accept-encoding', '').split(',')}
+        encoding = next((name for name in ('br', 'gzip')
+                         if name in accepted and name in entry.get('encodings', {})), None)
+        path = os.path.join(root, entry['encodings'][encoding]['file'] if encoding else rel_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 404, {}, b"Not found\n"
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self.responses.get(path, signature)
+        if cached is None:
+            body = await asyncio.to_thread(Path(path).read_bytes)
+            response_headers = {
+                'Content-Type': entry.get('content_type') or mimetypes.guess_type(rel_path)[0]
+                or 'application/octet-stream',
+                'Cache-Control': entry.get('cache_control', 'no-cache'),
+                'ETag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            }
+            if entry.get('encodings'):
+                response_headers['Vary'] = 'Accept-Encoding'
+            if encoding:
+                response_headers['Content-Encoding'] = encoding
+            cached = {'signature': signature, 'body': body, 'headers': response_headers}
+            self.responses.put(path, cached)
+        etag = cached['headers']['ETag']
+        if etag in (tag.strip().removeprefix('W/') for tag in headers.get('if-none-match', '').split(',')):
+            return 304, {name: value for name, value in cached['headers'].items()
+                         if name in ('ETag', 'Cache-Control', 'Vary')}, b""
+        return 200, cached['headers'], cached['body']
+
+
+def serve_maps(directory=SPLIT_OUTPUT_DIR, host=SERVE_HOST, port=SERVE_PORT, **options):
+    """Run a ``MapServer`` (``options`` are its arguments) until interrupted."""
+    try:
+        asyncio.run(MapServer(directory, **options).serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_build(args, log=None):
+    """
+    The ``build`` command: the map, or one of its --batch/--vector-tiles/--webapp-* exports.
+
+    With a ``JsonLog`` (``--log-format json``) the map is built with
+    ``build_map`` and its result written as a ``result`` record.
+    """
+    if args.webapp_topojson:
+        states, _ = simplify_states(load_states(download_shapefile()),
+                                    args.simplify_tolerance, args.precision)
+        write_webapp_topojson(states, args.webapp_topojson, args.precision)
+        write_webapp_views(states, os.path.join(os.path.dirname(args.webapp_topojson) or ".",
+                                                os.path.basename(WEBAPP_VIEWS_PATH)))
+        return 0
+    if args.webapp_data:
+        write_webapp_data(load_states(download_shapefile()),
+                          get_state_statistics_frame(args.stats_year, args.stats_dataset),
+                          dataset=args.stats_dataset, year=args.stats_year)
+        return 0
+    if args.vector_tiles:
+        build_vector_tiles(args.vector_tiles, args.tile_layers)
+        return 0
+    if args.batch:
+        output_dir = args.output_dir if args.output_dir != SPLIT_OUTPUT_DIR else BATCH_OUTPUT_DIR
+        records = render_batch(args.metrics, args.years, args.levels, output_dir, args.workers,
+                               args.simplify_tolerance, args.precision, args.precompress,
+                               args.detail_levels, args.subarea_stats, args.stats_dataset, args.force)
+        return 1 if any('error' in record for record in records) else 0
+
+    options = dict(simplify_tolerance=args.simplify_tolerance, coord_precision=args.precision,
+                   geometry_format=args.geometry_format, geometry_encoding=args.geometry_encoding,
+                   output_mode=args.output_mode,
+                   output_dir=args.output_dir, precompress=args.precompress, manifest_path=args.manifest,
+                   detail_levels=args.detail_levels, level=args.level, subarea_stats=args.subarea_stats,
+                   state_stats=args.state_stats, stats_dataset=args.stats_dataset,
+                   stats_year=args.stats_year, time_series=args.time_series, color_column=args.color_by,
+                   force=args.force)
+    report = BuildReport(profile=args.profile, profile_dir=args.profile_dir)
+    labels = {'output_mode': args.output_mode, 'level': args.level, 'color_by': args.color_by}
+    if log is not None:
+        log.event('result', **build_map(log=log, report=report, **options))
+        if args.metrics_file:
+            report.write_metrics(args.metrics_file, labels)
+        return 0
 
-if __name__ == "__main__":
     print("=" * 70)
     print("  🇺🇸 US LAW SEVERITY & CRIME STATISTICS MAP")
     print("  Click-to-View Edition with Interactive Statistics")
     print("=" * 70)
     print()
-    create_interactive_map()
+    create_interactive_map(**options, open_browser=args.browser, report=report)
     print()
+    report.print_stages()
+    if args.metrics_file:
+        print(f"📈 Build metrics written to {report.write_metrics(args.metrics_file, labels)}")
+    if args.profile:
+        print(f"🔬 Stage profiles written to {args.profile_dir}/")
     print("=" * 70)
     print("  ✨ Visualization complete! Click states to explore data.")
     print("=" * 70)
+    return 0
+
+
+def cli(argv=None):
+    """
+    Command-line entry point; returns the process exit code.
+
+    Heavy modules (``_LazyModule``) are only imported by the stages that use
+    them, so ``--help``, ``bench`` and up-to-date builds start fast.
+    """
+    args = parse_args(argv)
+    if args.command == 'ingest':
+        ingest_incidents(args.files, args.level, args.output, args.subarea_stats, args.years,
+                         workers=args.workers or os.cpu_count() or 1)
+        return 0
+    if args.command == 'serve':
+        serve_maps(args.dir, args.host, args.port, cache_dir=args.cache_dir,
+                   memory_cache_mb=args.memory_cache_mb, disk_cache_mb=args.disk_cache_mb,
+                   workers=args.workers, geometry_format=args.geometry_format,
+                   detail_levels=args.detail_levels, subarea_stats=args.subarea_stats,
+                   stats_dataset=args.stats_dataset, precompress=args.precompress)
+        return 0
+    if args.command == 'bench':
+        import subprocess
+        script = os.path.join(BENCH_DIR, f"bench_{args.name}.py")
+        return subprocess.run([sys.executable, script, *args.bench_args]).returncode
+    if args.log_format == 'json':
+        log = JsonLog(sys.stdout)
+        with contextlib.redirect_stdout(log):
+            try:
+                return run_build(args, log)
+            except Exception as exc:
+                import traceback
+                traceback.print_exc()
+                log.event('error', error=f"{type(exc).__name__}: {exc}")
+                return 1
+    return run_build(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -121,6 +121,28 @@ resource "aws_cloudfront_distribution" "website" {
     compress               = true
   }
 
+  # Content-hashed assets from `python main.py --output-mode split` never
+  # change under the same name, so let the origin's immutable Cache-Control win.
+  ordered_cache_behavior {
+    path_pattern     = "assets/*"
+    allowed_methods  = ["GET", "HEAD", "OPTIONS"]
+    cached_methods   = ["GET", "HEAD"]
+    target_origin_id = "S3-${var.bucket_name}"
+
+    forwarded_values {
+      query_string = false
+      cookies {
+        forward = "none"
+      }
+    }
+
+    viewer_protocol_policy = "redirect-to-https"
+    min_ttl                = 0
+    default_ttl            = 86400
+    max_ttl                = 31536000
+    compress               = true
+  }
+
   restrictions {
     geo_restriction {
       restriction_type = "none"
@@ -0,0 +1,179 @@
+"""
+Offline tests of the shared download cache (``fetch_cached``).
+
+A local ``http.server`` stands in for the Census site and serves a small zip
+archive, honouring ``Range`` requests unless told not to.
+"""
+
+import hashlib
+import http.server
+import io
+import os
+import sys
+import threading
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+
+def make_archive():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for ext in main.SHAPEFILE_PARTS:
+            archive.writestr(f"{main.SHAPEFILE_NAME}{ext}", os.urandom(20_000))
+    return buffer.getvalue()
+
+
+ARCHIVE = make_archive()
+ARCHIVE_SHA = hashlib.sha256(ARCHIVE).hexdigest()
+
+
+class ArchiveHandler(http.server.BaseHTTPRequestHandler):
+    """Serves ``server.data``; ``server.honor_range`` False answers Range requests with a 200."""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        data = self.server.data
+        start = None
+        if self.server.honor_range and self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+        if start is not None and start >= len(data):
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{len(data)}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = data if start is None else data[start:]
+        self.send_response(200 if start is None else 206)
+        if start is not None:
+            self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+    httpd.data = ARCHIVE
+    httpd.honor_range = True
+    httpd.requests = []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/cb_2022_us_state_20m.zip"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def part_path(cache_dir, url):
+    return os.path.join(cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".part")
+
+
+def test_cache_hit_skips_the_network(server, tmp_path):
+    path, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert sha == ARCHIVE_SHA
+    assert path == os.path.join(str(tmp_path), "blobs", f"{ARCHIVE_SHA}.zip")
+
+    assert main.fetch_cached(server.url, cache_dir=str(tmp_path)) == (path, sha)
+    assert len(server.requests) == 1
+
+
+def test_corrupt_blob_is_downloaded_again(server, tmp_path):
+    path, _ = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    with open(path, 'r+b') as f:
+        f.write(b'corrupt')
+
+    _, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert sha == ARCHIVE_SHA
+    assert main.sha256_file(path) == ARCHIVE_SHA
+    assert len(server.requests) == 2
+
+
+def test_partial_download_is_resumed_with_range(server, tmp_path):
+    with open(part_path(str(tmp_path), server.url), 'wb') as f:
+        f.write(ARCHIVE[:1000])
+
+    path, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert server.requests[0]['Range'] == "bytes=1000-"
+    assert sha == ARCHIVE_SHA
+    assert main.sha256_file(path) == ARCHIVE_SHA
+    assert not os.path.exists(part_path(str(tmp_path), server.url))
+
+
+def test_full_reply_to_range_request_starts_over(server, tmp_path):
+    server.honor_range = False
+    with open(part_path(str(tmp_path), server.url), 'wb') as f:
+        f.write(ARCHIVE[:1000])
+
+    path, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert sha == ARCHIVE_SHA
+    assert os.path.getsize(path) == len(ARCHIVE)
+
+
+def test_unsatisfiable_range_discards_the_partial_file(server, tmp_path):
+    # Longer than the remote file: stale, must not be promoted to a blob
+    with open(part_path(str(tmp_path), server.url), 'wb') as f:
+        f.write(ARCHIVE + b'stale')
+
+    path, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert [request.get('Range') for request in server.requests] == [f"bytes={len(ARCHIVE) + 5}-", None]
+    assert sha == ARCHIVE_SHA
+    assert main.sha256_file(path) == ARCHIVE_SHA
+
+
+def test_checksum_mismatch_is_rejected(server, tmp_path):
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        main.fetch_cached(server.url, cache_dir=str(tmp_path), expected_sha256="0" * 64)
+    assert os.listdir(tmp_path / "blobs") == []
+    assert not os.path.exists(part_path(str(tmp_path), server.url))
+    assert main._read_cache_index(str(tmp_path)) == {}
+
+
+@pytest.mark.skipif(main.fcntl is None, reason="download lock needs fcntl")
+def test_concurrent_fetches_download_once(server, tmp_path):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(main.fetch_cached(server.url, cache_dir=str(tmp_path))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(server.requests) == 1
+    assert {sha for _, sha in results} == {ARCHIVE_SHA}
+    assert main.sha256_file(results[0][0]) == ARCHIVE_SHA
+
+
+def test_without_fcntl_downloads_to_a_private_file(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'fcntl', None)
+    shared_part = part_path(str(tmp_path), server.url)
+    with open(shared_part, 'wb') as f:
+        f.write(b'another runner')
+
+    path, sha = main.fetch_cached(server.url, cache_dir=str(tmp_path))
+    assert 'Range' not in server.requests[0]
+    assert sha == ARCHIVE_SHA
+    with open(shared_part, 'rb') as f:
+        assert f.read() == b'another runner'
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.part')] == [os.path.basename(shared_part)]
+
+
+def test_download_shapefile_extracts_from_the_cache(server, tmp_path):
+    shapefile_dir = str(tmp_path / "data")
+    path = main.download_shapefile(url=server.url, shapefile_dir=shapefile_dir,
+                                   cache_dir=str(tmp_path / "cache"), expected_sha256=ARCHIVE_SHA)
+    assert path == os.path.join(shapefile_dir, f"{main.SHAPEFILE_NAME}.shp")
+    assert all(os.path.exists(os.path.join(shapefile_dir, main.SHAPEFILE_NAME + ext))
+               for ext in main.SHAPEFILE_PARTS)
+
+    main.download_shapefile(url=server.url, shapefile_dir=shapefile_dir,
+                            cache_dir=str(tmp_path / "cache"), expected_sha256=ARCHIVE_SHA)
+    assert len(server.requests) == 1
@@ -0,0 +1,105 @@
+"""
+Tests of the streamed incident aggregation (``aggregate_incidents``,
+``incident_rates``): counting chunk by chunk matches one groupby over all rows.
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+TYPES = [*main.INCIDENT_METRICS, 'burglary']
+
+
+def incidents(rows, seed=0):
+    """Incidents keyed by state code, with stray case/whitespace, unknown codes and other types."""
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(['AA', 'bb', ' CC ', 'DD'], rows)
+    return pd.DataFrame({'STUSPS': codes, 'type': rng.choice(TYPES, rows)})
+
+
+def single_pass(frame, key='STUSPS'):
+    """Reference counts: one groupby over every row."""
+    frame = frame[frame['type'].isin(main.INCIDENT_METRICS)]
+    counts = frame.groupby([key, 'type']).size().unstack(fill_value=0)
+    return counts.reindex(columns=list(main.INCIDENT_METRICS), fill_value=0).astype('int64').sort_index()
+
+
+@pytest.fixture
+def locator():
+    gdf = gpd.GeoDataFrame({'STUSPS': ['AA', 'BB']},
+                           geometry=[shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1)],
+                           crs=main.GEOMETRY_CRS)
+    return main.GeometryLocator(gdf, grid_size=8)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1_000])
+def test_chunked_counts_equal_a_single_groupby(tmp_path, chunk_size):
+    first, second = incidents(300, seed=0), incidents(200, seed=1)
+    paths = []
+    for i, frame in enumerate((first, second)):
+        paths.append(str(tmp_path / f"incidents-{i}.csv"))
+        frame.to_csv(paths[-1], index=False)
+
+    counts = main.aggregate_incidents(paths, chunk_size=chunk_size)
+
+    combined = pd.concat([first, second])
+    combined['STUSPS'] = combined['STUSPS'].str.strip().str.upper()
+    pd.testing.assert_frame_equal(counts, single_pass(combined), check_names=False, check_index_type=False)
+
+
+def test_coordinates_are_located_and_counted(tmp_path, locator):
+    rng = np.random.default_rng(2)
+    frame = pd.DataFrame({'lon': rng.uniform(-0.5, 2.5, 500), 'lat': rng.uniform(-0.2, 1.2, 500),
+                          'type': rng.choice(TYPES, 500)})
+    path = str(tmp_path / "points.csv")
+    frame.to_csv(path, index=False)
+
+    counts = main.aggregate_incidents([path], chunk_size=64, workers=2, locator=locator)
+
+    frame['STUSPS'] = locator.locate(frame['lon'], frame['lat'])
+    pd.testing.assert_frame_equal(counts, single_pass(frame.dropna(subset=['STUSPS'])),
+                                  check_names=False, check_index_type=False)
+
+
+def test_county_codes_are_zero_padded(tmp_path):
+    path = str(tmp_path / "county.csv")
+    pd.DataFrame({'GEOID': ['1001', '01001', '6037'], 'type': ['murder', 'murder', 'gun_death']}).to_csv(
+        path, index=False)
+
+    counts = main.aggregate_incidents([path], level='county', chunk_size=2)
+    assert counts.to_dict('index') == {
+        '01001': {'murder': 2, 'gun_death': 0, 'traffic_fatality': 0},
+        '06037': {'murder': 0, 'gun_death': 1, 'traffic_fatality': 0},
+    }
+
+
+def test_files_without_a_key_or_coordinates_are_rejected(tmp_path):
+    path = str(tmp_path / "bad.csv")
+    pd.DataFrame({'type': ['murder'], 'city': ['X']}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="needs a 'STUSPS' column or lon and lat columns"):
+        main.aggregate_incidents([path])
+
+
+def test_rates_are_annual_per_100k():
+    counts = pd.DataFrame({'murder': [10, 4], 'gun_death': [0, 2], 'traffic_fatality': [5, 0]},
+                          index=pd.Index(['AA', 'ZZ'], name='STUSPS'))
+    population = pd.Series([200_000, 100_000, 0], index=pd.Index(['AA', 'BB', 'CC'], name='STUSPS'))
+
+    rates = main.incident_rates(counts, population, years=2).set_index('STUSPS')
+
+    assert rates.loc['AA', 'murder_rate'] == 2.5
+    assert rates.loc['AA', 'traffic_fatality_rate'] == 1.25
+    assert rates.loc['BB', 'murder_rate'] == 0
+    assert rates.loc['BB', 'murder_count'] == 0
+    assert np.isnan(rates.loc['CC', 'murder_rate'])
+    assert 'ZZ' not in rates.index
+    assert list(rates.columns) == ['population', *main.INCIDENT_METRICS.values(),
+                                   *(f"{t}_count" for t in main.INCIDENT_METRICS)]
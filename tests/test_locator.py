@@ -0,0 +1,53 @@
+"""
+Tests of the batched point-in-polygon lookup (``GeometryLocator``).
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+
+@pytest.fixture
+def locator():
+    # Two unit squares side by side; the extent's east edge is x=2, north edge y=1
+    gdf = gpd.GeoDataFrame({'STUSPS': ['AA', 'BB']},
+                           geometry=[shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1)],
+                           crs=main.GEOMETRY_CRS)
+    return main.GeometryLocator(gdf, grid_size=8)
+
+
+def test_points_on_the_east_and_north_edges_are_located(locator):
+    lons = [2.0, 0.5, 2.0, 0.0, 1.5]
+    lats = [0.5, 1.0, 1.0, 0.0, 1.0]
+    assert locator.locate(lons, lats).tolist() == ['BB', 'AA', 'BB', 'AA', 'BB']
+
+
+def test_points_outside_the_extent_are_none(locator):
+    lons = [2.000001, 0.5, -0.000001, np.nan, 0.5]
+    lats = [0.5, 1.000001, 0.5, 0.5, np.nan]
+    assert locator.locate(lons, lats).tolist() == [None] * 5
+
+
+def test_shared_border_goes_to_the_first_row(locator):
+    assert locator.locate([1.0, 1.0], [0.0, 0.5]).tolist() == ['AA', 'AA']
+
+
+def test_matches_a_point_in_polygon_test():
+    gdf = gpd.GeoDataFrame({'STUSPS': ['AA', 'BB']},
+                           geometry=[shapely.Point(0, 0).buffer(1), shapely.Point(1.5, 0).buffer(1)],
+                           crs=main.GEOMETRY_CRS)
+    rng = np.random.default_rng(0)
+    lons, lats = rng.uniform(-1.2, 2.7, 5_000), rng.uniform(-1.2, 1.2, 5_000)
+    expected = np.full(len(lons), None, dtype=object)
+    for key, geom in zip(gdf['STUSPS'][::-1], gdf.geometry[::-1]):
+        expected[shapely.intersects_xy(geom, lons, lats)] = key
+
+    codes = main.GeometryLocator(gdf, grid_size=16).locate(lons, lats, chunk_size=1_000, workers=2)
+    assert codes.tolist() == expected.tolist()
@@ -0,0 +1,83 @@
+"""
+Round trips of PMTiles archives: tiles written by ``write_pmtiles`` read back
+with ``read_pmtiles_tile``, from the root directory and from leaf directories.
+"""
+
+import gzip
+import os
+import sys
+
+import geopandas as gpd
+import pytest
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+METADATA = {'name': 'test', 'bounds': [-180, -85, 180, 85], 'minzoom': 0, 'maxzoom': 4}
+
+
+def pyramid(max_zoom=4):
+    """Every tile up to ``max_zoom``, in tile id order; the west half of each zoom repeats one tile."""
+    tiles = []
+    for z in range(max_zoom + 1):
+        for x in range(1 << z):
+            for y in range(1 << z):
+                data = f"{z}/{x}/{y}" if x >= (1 << z) // 2 else f"{z}/west"
+                tiles.append((z, x, y, gzip.compress(data.encode('utf-8'), mtime=0)))
+    return sorted(tiles, key=lambda tile: main.zxy_to_tileid(*tile[:3]))
+
+
+def test_every_tile_reads_back(tmp_path):
+    path = str(tmp_path / "tiles.pmtiles")
+    tiles = pyramid()
+    result = main.write_pmtiles(path, iter(tiles), METADATA)
+    assert result['tiles'] == len(tiles)
+    assert result['contents'] < len(tiles)
+
+    for z, x, y, data in tiles:
+        assert main.read_pmtiles_tile(path, z, x, y) == data
+
+
+def test_missing_tiles_read_as_none(tmp_path):
+    path = str(tmp_path / "tiles.pmtiles")
+    main.write_pmtiles(path, iter([(2, 1, 1, b'only')]), METADATA)
+    assert main.read_pmtiles_tile(path, 2, 1, 1) == b'only'
+    assert main.read_pmtiles_tile(path, 2, 1, 2) is None
+    assert main.read_pmtiles_tile(path, 0, 0, 0) is None
+    assert main.read_pmtiles_tile(path, 5, 3, 3) is None
+
+
+def test_tiles_read_back_through_leaf_directories(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'PMTILES_ROOT_MAX', 64)
+    path = str(tmp_path / "tiles.pmtiles")
+    tiles = pyramid(max_zoom=6)
+    main.write_pmtiles(path, iter(tiles), METADATA)
+    with open(path, 'rb') as f:
+        header = f.read(main.PMTILES_HEADER_SIZE)
+    _, _, _, _, _, leaf_length = main.struct.unpack_from('<6Q', header, 8)
+    assert leaf_length > 0
+
+    for z, x, y, data in tiles[::97] + tiles[-1:]:
+        assert main.read_pmtiles_tile(path, z, x, y) == data
+
+
+def test_exported_vector_tiles_read_back(tmp_path):
+    gdf = gpd.GeoDataFrame({'id': [1, 2], 'STUSPS': ['AA', 'BB']},
+                           geometry=[shapely.box(-100, 30, -90, 40), shapely.box(-90, 30, -80, 40)],
+                           crs=main.GEOMETRY_CRS)
+    layers = {'states': {'gdf': gdf, 'id_column': 'id', 'properties': {'STUSPS': 'abbr'},
+                         'min_zoom': 0, 'max_zoom': 2}}
+    path = str(tmp_path / "states.pmtiles")
+    main.export_vector_tiles(path, layers)
+
+    tile = main.read_pmtiles_tile(path, 0, 0, 0)
+    assert tile == next(main.iter_vector_tiles(layers))[3]
+    assert b'states' in gzip.decompress(tile)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "tiles.pmtiles"
+    path.write_bytes(b'\0' * main.PMTILES_HEADER_SIZE)
+    with pytest.raises(ValueError, match="not a PMTiles v3 archive"):
+        main.read_pmtiles_tile(str(path), 0, 0, 0)
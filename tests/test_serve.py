@@ -0,0 +1,150 @@
+"""
+Tests of the on-demand map server (``MapServer``): conditional requests and
+render coalescing.
+
+The server's connection handler runs on an event loop in a background thread.
+Renders go to a thread pool instead of the spawn process pool, and
+``build_map`` is replaced by a stand-in that counts its calls.
+"""
+
+import asyncio
+import http.client
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+MAP_PATH = f"{main.SERVE_MAP_PREFIX}severity/2023/state/"
+
+
+class FakeBuild:
+    """Stands in for ``build_map``: writes a one-file variant after ``delay`` seconds."""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.calls = []
+        self.fail = False
+        self.lock = threading.Lock()
+
+    def __call__(self, output_dir, color_column, stats_year, level, **options):
+        with self.lock:
+            self.calls.append((color_column, stats_year, level))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("no shapefile")
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "index.html")
+        with open(path, 'w') as f:
+            f.write(f"{color_column} {stats_year} {level}")
+        return {'files': {path: os.path.getsize(path)}, 'up_to_date': False}
+
+
+@pytest.fixture
+def build(monkeypatch):
+    fake = FakeBuild()
+    monkeypatch.setattr(main, 'build_map', fake)
+    return fake
+
+
+@pytest.fixture
+def server(tmp_path, build):
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "index.html").write_text("<h1>map</h1>")
+    map_server = main.MapServer(str(site), cache_dir=str(tmp_path / "cache"))
+    map_server.years = (2023,)
+    map_server.executor = ThreadPoolExecutor(4)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(
+        asyncio.start_server(map_server.handle, '127.0.0.1', 0), loop).result()
+    map_server.port = listener.sockets[0].getsockname()[1]
+    yield map_server
+    listener.close()
+    asyncio.run_coroutine_threadsafe(listener.wait_closed(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    map_server.executor.shutdown()
+
+
+def get(server, path, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=10)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_repeat_request_with_the_etag_gets_304(server):
+    status, headers, body = get(server, "/index.html")
+    assert status == 200
+    assert body == b"<h1>map</h1>"
+    etag = headers['ETag']
+
+    status, headers, body = get(server, "/index.html", {'If-None-Match': etag})
+    assert status == 304
+    assert body == b""
+    assert headers['ETag'] == etag
+    assert get(server, "/", {'If-None-Match': f'"other", W/{etag}'})[0] == 304
+    assert get(server, "/index.html", {'If-None-Match': '"other"'})[0] == 200
+
+
+def test_changed_file_gets_a_new_etag(server):
+    _, headers, _ = get(server, "/index.html")
+    with open(os.path.join(server.directory, "index.html"), 'w') as f:
+        f.write("<h1>new map</h1>")
+
+    status, new_headers, body = get(server, "/index.html", {'If-None-Match': headers['ETag']})
+    assert status == 200
+    assert body == b"<h1>new map</h1>"
+    assert new_headers['ETag'] != headers['ETag']
+
+
+def test_concurrent_requests_for_a_variant_render_once(server, build):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get(server, MAP_PATH))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [status for status, _, _ in results] == [200] * 6
+    assert {body for _, _, body in results} == {b"severity 2023 state"}
+    assert build.calls == [('severity', 2023, 'state')]
+
+    status, headers, _ = get(server, MAP_PATH)
+    assert status == 200
+    assert get(server, MAP_PATH, {'If-None-Match': headers['ETag']})[0] == 304
+    assert len(build.calls) == 1
+    assert server.pending == {}
+
+
+def test_failed_render_is_retried_by_the_next_request(server, build):
+    build.fail = True
+    status, _, body = get(server, MAP_PATH)
+    assert status == 500
+    assert b"RuntimeError: no shapefile" in body
+    assert server.pending == {}
+
+    build.fail = False
+    status, _, body = get(server, MAP_PATH)
+    assert status == 200
+    assert body == b"severity 2023 state"
+    assert len(build.calls) == 2
+
+
+def test_unknown_variants_are_not_rendered(server, build):
+    assert get(server, f"{main.SERVE_MAP_PREFIX}severity/1999/state/")[0] == 404
+    assert get(server, f"{main.SERVE_MAP_PREFIX}nope/2023/state/")[0] == 404
+    assert build.calls == []
@@ -0,0 +1,100 @@
+"""
+Tests of the delta-encoded year frames (``timeseries_frames``): replaying
+them the way the page does reproduces every year in full.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+YEARS = list(range(2015, 2024))
+KEYS = ['CC', 'AA', 'DD', 'BB']  # trace order; DD has no statistics at all
+
+
+def series(seed=0):
+    """Statistics for AA, BB and CC over ``YEARS``, with values that change, repeat and go missing."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in YEARS:
+        for key in ('AA', 'BB', 'CC'):
+            if key == 'BB' and year == 2018:
+                continue  # a year without BB's row
+            rows.append({
+                'STUSPS': key, 'year': year,
+                'severity': int(rng.integers(20, 23)),
+                'category': rng.choice(['Lenient', 'Severe']),
+                'death_penalty': 'Active',
+                'murder_rate': float(rng.choice([1.5, 2.5, np.nan])),
+                'gun_death_rate': 10.0,
+                'traffic_fatality_rate': float(rng.uniform(5, 25)),
+                'population': 1_000_000 + year,
+                'incarceration_rate': 400,
+                'notes': None if year % 2 else 'note',
+            })
+    # Rows out of year order, as in a concatenated dataset
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed)
+
+
+def expected_year(series_df, year, color_column='severity'):
+    frame = series_df[series_df['year'] == year].set_index('STUSPS').reindex(KEYS)[list(main.stat_dtypes())]
+    frame = frame.astype(object).where(frame.notna(), None)
+    return json.loads(main.dumps_json({'z': frame[color_column].tolist(), 'records': frame.to_dict('index')}))
+
+
+def replay(frames):
+    """Apply frames in order like the page's ``getYearState``; yields ``(year, state)``."""
+    state = None
+    for name, data in frames:
+        frame = json.loads(data)
+        assert frame['year'] == int(name)
+        if 'zIndex' not in frame:
+            state = {'z': list(frame['z']), 'records': dict(frame['records'])}
+        else:
+            assert state is not None, "delta frame before the first keyframe"
+            for index, value in zip(frame['zIndex'], frame['z']):
+                state['z'][index] = value
+            for area, fields in frame['records'].items():
+                state['records'][area] = {**state['records'][area], **fields}
+        yield frame['year'], {'z': list(state['z']), 'records': {k: dict(v) for k, v in state['records'].items()}}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_replayed_deltas_reproduce_every_year(use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(main, 'orjson', None)
+    elif main.orjson is None:
+        pytest.skip("orjson not installed")
+    series_df = series()
+    frames = list(main.timeseries_frames(series_df, KEYS, keyframe_interval=4))
+
+    assert [name for name, _ in frames] == [str(year) for year in YEARS]
+    for year, state in replay(frames):
+        assert state == expected_year(series_df, year), year
+
+
+def test_keyframes_are_full_and_deltas_only_carry_changes():
+    series_df = series()
+    frames = [json.loads(data) for _, data in main.timeseries_frames(series_df, KEYS, keyframe_interval=4)]
+
+    assert [('zIndex' not in frame) for frame in frames] == [i % 4 == 0 for i in range(len(YEARS))]
+    for previous, frame in zip(frames, frames[1:]):
+        if 'zIndex' in frame:
+            assert frame['base'] == previous['year']
+            assert 'DD' not in frame['records']
+            # AA and CC have a row every year; their constant fields never reappear
+            for area in ('AA', 'CC'):
+                fields = frame['records'].get(area, {})
+                assert 'death_penalty' not in fields and 'incarceration_rate' not in fields
+
+
+def test_color_column_selects_z():
+    series_df = series()
+    for year, state in replay(main.timeseries_frames(series_df, KEYS, color_column='murder_rate')):
+        assert state['z'] == expected_year(series_df, year, 'murder_rate')['z']
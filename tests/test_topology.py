@@ -0,0 +1,66 @@
+"""
+Tests of the shared-arc topology (``build_topology``, ``topology_to_shapes``,
+``simplify_states``) on polygons that collapse when snapped to the grid.
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main  # noqa: E402
+
+SQUARE = shapely.box(0, 0, 1, 1)
+# Well under one grid step (10 ** -COORD_PRECISION) across
+ISLAND = shapely.box(5, 5, 5 + 1e-7, 5 + 1e-7)
+HOLED = shapely.Polygon([(2, 0), (3, 0), (3, 1), (2, 1)], [[(2.25, 0.25), (2.75, 0.25), (2.75, 0.75), (2.25, 0.75)]])
+
+
+def frame(*geometries):
+    keys = [f"K{i}" for i in range(len(geometries))]
+    return gpd.GeoDataFrame({'STUSPS': keys}, geometry=list(geometries), crs=main.GEOMETRY_CRS)
+
+
+def test_sub_grid_island_is_dropped_from_a_multipolygon():
+    topology = main.build_topology([shapely.MultiPolygon([SQUARE, ISLAND])])
+    assert len(topology['geometries'][0]) == 1
+
+    shape, = main.topology_to_shapes(topology)
+    assert shape.geom_type == 'Polygon'
+    assert shape.equals(SQUARE)
+
+
+def test_geometry_of_only_sub_grid_islands_falls_back_to_the_input():
+    simplified, report = main.simplify_states(frame(SQUARE, ISLAND, HOLED), tolerance=0.01)
+    assert simplified.geometry.iloc[0].equals(SQUARE)
+    assert simplified.geometry.iloc[1].equals(ISLAND)
+    assert set(report) == {'K0', 'K1', 'K2'}
+
+
+def test_without_fallback_a_collapsed_geometry_is_empty():
+    topology = main.build_topology([SQUARE, ISLAND])
+    assert topology['geometries'][1] == []
+    assert main.topology_to_shapes(topology)[1].is_empty
+
+
+def test_collapsed_exterior_does_not_promote_a_hole():
+    # The exterior is thinner than a grid step; its hole is not
+    sliver = shapely.Polygon([(0, 0), (1, 0), (1, 1e-7), (0, 1e-7)],
+                             [[(0.2, 0.2), (0.4, 0.2), (0.4, 0.4), (0.2, 0.4)]])
+    topology = main.build_topology([shapely.MultiPolygon([sliver, HOLED]), sliver])
+    assert len(topology['geometries'][0]) == 1
+    assert topology['geometries'][1] == []
+
+    holed, fallback = main.topology_to_shapes(topology, fallback=[None, sliver])
+    assert holed.equals(HOLED)
+    assert fallback is sliver
+
+
+def test_holes_survive_simplification():
+    simplified, _ = main.simplify_states(frame(SQUARE, HOLED), tolerance=0.01)
+    holed = simplified.geometry.iloc[1]
+    assert len(holed.interiors) == 1
+    assert holed.area == HOLED.area
+    assert shapely.Polygon(holed.exterior).equals(shapely.Polygon(HOLED.exterior))
@@ -4,9 +4,15 @@ import { useEffect, useRef, useState } from "react";
 import mapboxgl from "mapbox-gl";
 import "mapbox-gl/dist/mapbox-gl.css";
 import { motion, AnimatePresence } from "framer-motion";
-import { StateData, STATES_DATA } from "@/data/states";
+import {
+  StateData,
+  STATES_INDEX,
+  fetchStateData,
+  fetchStateView,
+} from "@/data/states";
 import StatePopup from "./StatePopup";
 import { getSeverityColor } from "@/lib/utils";
+import { Topology, topojsonFeatures } from "@/lib/topojson";
 import { X } from "lucide-react";
 
 // Mapbox token - você vai precisar adicionar o seu!
@@ -14,6 +20,12 @@ mapboxgl.accessToken =
   process.env.NEXT_PUBLIC_MAPBOX_TOKEN ||
   "pk.eyJ1IjoibWFwYm94IiwiYSI6ImNpejY4NXVycTA2emYycXBndHRqcmZ3N3gifQ.rJcFIG214AriISLbB6B5aw";
 
+// Optional vector tiles: a {z}/{x}/{y} URL serving the archive written by
+// `main.py --vector-tiles` (e.g. `pmtiles serve`). Only the tiles in view are
+// fetched; without it the bundled TopoJSON is used.
+const TILES_URL = process.env.NEXT_PUBLIC_STATES_TILES_URL;
+const SOURCE_LAYER = TILES_URL ? "states" : undefined;
+
 export default function InteractiveMap() {
   const mapContainer = useRef<HTMLDivElement>(null);
   const map = useRef<mapboxgl.Map | null>(null);
@@ -37,17 +49,38 @@ export default function InteractiveMap() {
     map.current.on("load", () => {
       setIsLoading(false);
 
-      // Add US states layer (using local GeoJSON to avoid 403 errors)
-      map.current?.addSource("states", {
-        type: "geojson",
-        data: "/us-states.json",
-      });
+      // Add US states layer: vector tiles when configured, otherwise the
+      // local TopoJSON generated by main.py, decoded client-side (shared
+      // borders are only shipped once)
+      if (TILES_URL) {
+        map.current?.addSource("states", {
+          type: "vector",
+          tiles: [TILES_URL],
+          minzoom: 0,
+          maxzoom: 8,
+        });
+      } else {
+        map.current?.addSource("states", {
+          type: "geojson",
+          data: { type: "FeatureCollection", features: [] },
+        });
+        fetch("/us-states.topo.json")
+          .then((res) => res.json())
+          .then((topology: Topology) => {
+            const source = map.current?.getSource("states") as
+              | mapboxgl.GeoJSONSource
+              | undefined;
+            source?.setData(topojsonFeatures(topology, "states"));
+          })
+          .catch((err) => console.error("Failed to load state boundaries:", err));
+      }
 
       // Add fill layer with severity colors
       map.current?.addLayer({
         id: "states-fill",
         type: "fill",
         source: "states",
+        ...(SOURCE_LAYER && { "source-layer": SOURCE_LAYER }),
         paint: {
           "fill-color": [
             "match",
@@ -88,6 +121,7 @@ export default function InteractiveMap() {
         id: "states-border",
         type: "line",
         source: "states",
+        ...(SOURCE_LAYER && { "source-layer": SOURCE_LAYER }),
         paint: {
           "line-color": "#ffffff",
           "line-width": [
@@ -107,14 +141,14 @@ export default function InteractiveMap() {
         if (e.features && e.features.length > 0) {
           if (hoveredStateId !== null) {
             map.current?.setFeatureState(
-              { source: "states", id: hoveredStateId },
+              { source: "states", sourceLayer: SOURCE_LAYER, id: hoveredStateId },
               { hover: false }
             );
           }
           hoveredStateId = e.features[0].id || null;
           if (hoveredStateId !== null) {
             map.current?.setFeatureState(
-              { source: "states", id: hoveredStateId },
+              { source: "states", sourceLayer: SOURCE_LAYER, id: hoveredStateId },
               { hover: true }
             );
           }
@@ -127,7 +161,7 @@ export default function InteractiveMap() {
       map.current?.on("mouseleave", "states-fill", () => {
         if (hoveredStateId !== null) {
           map.current?.setFeatureState(
-            { source: "states", id: hoveredStateId },
+            { source: "states", sourceLayer: SOURCE_LAYER, id: hoveredStateId },
             { hover: false }
           );
         }
@@ -145,26 +179,31 @@ export default function InteractiveMap() {
 
           console.log("Clicked state:", stateName); // Debug log
 
-          // Find state data
-          const stateData = Object.values(STATES_DATA).find(
+          // Find the state in the bundled index; the full record is fetched
+          const summary = Object.values(STATES_INDEX).find(
             (s) => s.name === stateName
           );
 
-          if (stateData) {
-            console.log("State data found:", stateData); // Debug log
-            setSelectedState(stateData);
+          if (summary) {
+            fetchStateData(summary.abbr).then((stateData) => {
+              console.log("State data found:", stateData); // Debug log
+              if (stateData) setSelectedState(stateData);
+            });
 
-            // Smooth fly to state
-            map.current?.flyTo({
-              center: [stateData.center.lng, stateData.center.lat],
-              zoom: stateData.center.zoom,
-              duration: 2000,
-              essential: true,
-              curve: 1.42,
-              easing: (t) =>
-                t < 0.5
-                  ? 4 * t * t * t
-                  : (t - 1) * (2 * t - 2) * (2 * t - 2) + 1,
+            // Smooth fly to state (camera fitted to its geometry)
+            fetchStateView(summary.abbr).then((view) => {
+              if (!view) return;
+              map.current?.flyTo({
+                center: [view.lng, view.lat],
+                zoom: view.zoom,
+                duration: 2000,
+                essential: true,
+                curve: 1.42,
+                easing: (t) =>
+                  t < 0.5
+                    ? 4 * t * t * t
+                    : (t - 1) * (2 * t - 2) * (2 * t - 2) + 1,
+              });
             });
           } else {
             // Show alert for states without data
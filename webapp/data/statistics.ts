@@ -0,0 +1,332 @@
+// Generated by `python main.py --webapp-data` from statistics/states.csv (sha256
+// 1e9d8608078567fa). Do not edit: change the dataset and regenerate.
+// Per-state records are written alongside to public/states/<ABBR>.json.
+
+export interface StateSummary {
+  abbr: string
+  name: string
+  severity: number
+  category: string
+}
+
+export interface StateData extends StateSummary {
+  deathPenalty: string
+  murderRate: number
+  gunDeathRate: number
+  trafficFatalityRate: number
+  population: number
+  incarcerationRate: number
+  notes: string
+}
+
+export const STATS_YEAR = 2023
+
+export const US_AVERAGES = {
+  murder: 6.9,
+  gun: 15.4,
+  traffic: 12.8,
+  incarceration: 655.4
+}
+
+export const STATES_INDEX: Record<string, StateSummary> = {
+  AK: {
+    abbr: 'AK',
+    name: 'Alaska',
+    severity: 30,
+    category: 'Lenient'
+  },
+  AL: {
+    abbr: 'AL',
+    name: 'Alabama',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  AR: {
+    abbr: 'AR',
+    name: 'Arkansas',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  AZ: {
+    abbr: 'AZ',
+    name: 'Arizona',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  CA: {
+    abbr: 'CA',
+    name: 'California',
+    severity: 38,
+    category: 'Lenient'
+  },
+  CO: {
+    abbr: 'CO',
+    name: 'Colorado',
+    severity: 52,
+    category: 'Moderate'
+  },
+  CT: {
+    abbr: 'CT',
+    name: 'Connecticut',
+    severity: 30,
+    category: 'Lenient'
+  },
+  DE: {
+    abbr: 'DE',
+    name: 'Delaware',
+    severity: 58,
+    category: 'Moderate'
+  },
+  FL: {
+    abbr: 'FL',
+    name: 'Florida',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  GA: {
+    abbr: 'GA',
+    name: 'Georgia',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  HI: {
+    abbr: 'HI',
+    name: 'Hawaii',
+    severity: 20,
+    category: 'Lenient'
+  },
+  IA: {
+    abbr: 'IA',
+    name: 'Iowa',
+    severity: 80,
+    category: 'Severe'
+  },
+  ID: {
+    abbr: 'ID',
+    name: 'Idaho',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  IL: {
+    abbr: 'IL',
+    name: 'Illinois',
+    severity: 38,
+    category: 'Lenient'
+  },
+  IN: {
+    abbr: 'IN',
+    name: 'Indiana',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  KS: {
+    abbr: 'KS',
+    name: 'Kansas',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  KY: {
+    abbr: 'KY',
+    name: 'Kentucky',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  LA: {
+    abbr: 'LA',
+    name: 'Louisiana',
+    severity: 95,
+    category: 'Severe'
+  },
+  MA: {
+    abbr: 'MA',
+    name: 'Massachusetts',
+    severity: 28,
+    category: 'Lenient'
+  },
+  MD: {
+    abbr: 'MD',
+    name: 'Maryland',
+    severity: 55,
+    category: 'Moderate'
+  },
+  ME: {
+    abbr: 'ME',
+    name: 'Maine',
+    severity: 25,
+    category: 'Lenient'
+  },
+  MI: {
+    abbr: 'MI',
+    name: 'Michigan',
+    severity: 55,
+    category: 'Moderate'
+  },
+  MN: {
+    abbr: 'MN',
+    name: 'Minnesota',
+    severity: 45,
+    category: 'Moderate'
+  },
+  MO: {
+    abbr: 'MO',
+    name: 'Missouri',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  MS: {
+    abbr: 'MS',
+    name: 'Mississippi',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  MT: {
+    abbr: 'MT',
+    name: 'Montana',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  NC: {
+    abbr: 'NC',
+    name: 'North Carolina',
+    severity: 88,
+    category: 'Severe'
+  },
+  ND: {
+    abbr: 'ND',
+    name: 'North Dakota',
+    severity: 85,
+    category: 'Severe'
+  },
+  NE: {
+    abbr: 'NE',
+    name: 'Nebraska',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  NH: {
+    abbr: 'NH',
+    name: 'New Hampshire',
+    severity: 50,
+    category: 'Moderate'
+  },
+  NJ: {
+    abbr: 'NJ',
+    name: 'New Jersey',
+    severity: 32,
+    category: 'Lenient'
+  },
+  NM: {
+    abbr: 'NM',
+    name: 'New Mexico',
+    severity: 48,
+    category: 'Moderate'
+  },
+  NV: {
+    abbr: 'NV',
+    name: 'Nevada',
+    severity: 85,
+    category: 'Severe'
+  },
+  NY: {
+    abbr: 'NY',
+    name: 'New York',
+    severity: 35,
+    category: 'Lenient'
+  },
+  OH: {
+    abbr: 'OH',
+    name: 'Ohio',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  OK: {
+    abbr: 'OK',
+    name: 'Oklahoma',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  OR: {
+    abbr: 'OR',
+    name: 'Oregon',
+    severity: 32,
+    category: 'Lenient'
+  },
+  PA: {
+    abbr: 'PA',
+    name: 'Pennsylvania',
+    severity: 58,
+    category: 'Moderate'
+  },
+  RI: {
+    abbr: 'RI',
+    name: 'Rhode Island',
+    severity: 25,
+    category: 'Lenient'
+  },
+  SC: {
+    abbr: 'SC',
+    name: 'South Carolina',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  SD: {
+    abbr: 'SD',
+    name: 'South Dakota',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  TN: {
+    abbr: 'TN',
+    name: 'Tennessee',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  TX: {
+    abbr: 'TX',
+    name: 'Texas',
+    severity: 100,
+    category: 'Very Severe'
+  },
+  UT: {
+    abbr: 'UT',
+    name: 'Utah',
+    severity: 90,
+    category: 'Severe'
+  },
+  VA: {
+    abbr: 'VA',
+    name: 'Virginia',
+    severity: 92,
+    category: 'Severe'
+  },
+  VT: {
+    abbr: 'VT',
+    name: 'Vermont',
+    severity: 22,
+    category: 'Lenient'
+  },
+  WA: {
+    abbr: 'WA',
+    name: 'Washington',
+    severity: 35,
+    category: 'Lenient'
+  },
+  WI: {
+    abbr: 'WI',
+    name: 'Wisconsin',
+    severity: 50,
+    category: 'Moderate'
+  },
+  WV: {
+    abbr: 'WV',
+    name: 'West Virginia',
+    severity: 60,
+    category: 'Moderate'
+  },
+  WY: {
+    abbr: 'WY',
+    name: 'Wyoming',
+    severity: 100,
+    category: 'Very Severe'
+  }
+}
@@ -0,0 +1,52 @@
+import type { Feature, FeatureCollection, Geometry, Position } from "geojson"
+
+export interface Topology {
+  type: "Topology"
+  transform: { scale: [number, number]; translate: [number, number] }
+  arcs: Position[][]
+  objects: Record<string, { type: "GeometryCollection"; geometries: TopoGeometry[] }>
+}
+
+interface TopoGeometry {
+  type: "Polygon" | "MultiPolygon"
+  id?: string | number
+  properties?: Record<string, unknown>
+  arcs: number[][] | number[][][]
+}
+
+// Decode a quantized, delta-encoded TopoJSON object (as written by main.py)
+// into a GeoJSON FeatureCollection for Mapbox.
+export function topojsonFeatures(topology: Topology, name: string): FeatureCollection {
+  const [sx, sy] = topology.transform.scale
+  const [tx, ty] = topology.transform.translate
+
+  const arcs = topology.arcs.map((arc) => {
+    let x = 0
+    let y = 0
+    return arc.map(([dx, dy]) => {
+      x += dx
+      y += dy
+      return [x * sx + tx, y * sy + ty]
+    })
+  })
+
+  const ring = (refs: number[]): Position[] => {
+    const coords: Position[] = []
+    for (const ref of refs) {
+      const arc = ref >= 0 ? arcs[ref] : arcs[~ref].slice().reverse()
+      coords.push(...(coords.length ? arc.slice(1) : arc))
+    }
+    return coords
+  }
+  const polygon = (rings: number[][]) => rings.map(ring)
+
+  const features: Feature[] = topology.objects[name].geometries.map((g) => {
+    const geometry: Geometry =
+      g.type === "Polygon"
+        ? { type: "Polygon", coordinates: polygon(g.arcs as number[][]) }
+        : { type: "MultiPolygon", coordinates: (g.arcs as number[][][]).map(polygon) }
+    return { type: "Feature", id: g.id, properties: g.properties ?? {}, geometry }
+  })
+
+  return { type: "FeatureCollection", features }
+}